@@ -0,0 +1,46 @@
+"""Run the load test against a throwaway database.
+
+    python -m src.loadtest --tables 8 --players 7 --cycles 10 --output results.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the game API and WebSocket events in-process')
+    parser.add_argument('--tables', type=int, default=4, help='concurrent tables (one thread each)')
+    parser.add_argument('--players', type=int, default=7, help='players per table, host included (5-15)')
+    parser.add_argument('--cycles', type=int, default=5, help='games each table plays')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Point the app at a scratch database before it is imported
+        os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+        os.environ['LIVE_GAME_JOURNAL'] = os.path.join(workdir, 'live_games.journal')
+
+        # Server logging goes to stderr so stdout only carries the report
+        with contextlib.redirect_stdout(sys.stderr):
+            from src.main import app, socketio, init_database
+            from src.services.live_game import live_games
+            from src.loadtest.harness import run_load_test
+
+            init_database()
+            report = run_load_test(app, socketio, args.tables, args.players, args.cycles)
+            with app.app_context():
+                live_games.flush()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
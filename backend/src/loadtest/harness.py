@@ -0,0 +1,212 @@
+"""In-process load generator for the game API and WebSocket events.
+
+Each virtual table is a host plus players, every one with its own Flask
+test client and a Flask-SocketIO test client sharing its session. Tables
+run in their own threads and repeat a create -> join -> ready -> start ->
+advance to day -> nominate -> vote -> tally -> finish cycle against the
+real app, so the numbers include routing, auth, the ORM, the live game
+engine and the broadcaster, but no network.
+"""
+import threading
+import time
+from datetime import datetime
+
+# Latency histogram bucket upper bounds, in milliseconds
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class LatencyRecorder:
+    """Thread-safe latency samples and error counts per operation name"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, ok=True):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds * 1000)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self):
+        """Get count, error count, percentiles and a histogram per operation"""
+        result = {}
+        with self._lock:
+            items = {name: sorted(values) for name, values in self.samples.items()}
+            errors = dict(self.errors)
+        for name, values in sorted(items.items()):
+            histogram = {}
+            for bound in HISTOGRAM_BUCKETS_MS:
+                histogram[f'le_{bound}ms'] = sum(1 for value in values if value <= bound)
+            histogram['inf'] = len(values)
+            result[name] = {
+                'count': len(values),
+                'errors': errors.get(name, 0),
+                'mean_ms': round(sum(values) / len(values), 3),
+                'p50_ms': round(percentile(values, 50), 3),
+                'p95_ms': round(percentile(values, 95), 3),
+                'p99_ms': round(percentile(values, 99), 3),
+                'max_ms': round(values[-1], 3),
+                'histogram': histogram,
+            }
+        return result
+
+
+class VirtualUser:
+    """A registered user with an HTTP client and a WebSocket client"""
+
+    def __init__(self, app, socketio, recorder, username):
+        self.recorder = recorder
+        self.http = app.test_client()
+        response = self.call('POST /api/auth/register', 'post', '/api/auth/register', json={
+            'username': username,
+            'email': f'{username}@loadtest.invalid',
+            'password': 'loadtest1'
+        })
+        self.user_id = response.get_json()['user']['id']
+        self.socket = socketio.test_client(app, flask_test_client=self.http)
+
+    def call(self, name, method, url, **kwargs):
+        """Make an HTTP request and record its latency under ``name``"""
+        started = time.perf_counter()
+        response = getattr(self.http, method)(url, **kwargs)
+        self.recorder.record(name, time.perf_counter() - started, ok=response.status_code < 400)
+        return response
+
+    def emit(self, event, data):
+        """Emit a Socket.IO event and record how long the server took to handle it"""
+        started = time.perf_counter()
+        self.socket.emit(event, data)
+        self.recorder.record(f'emit {event}', time.perf_counter() - started)
+
+    def drain(self):
+        """Record delivery lag for the timestamped server events received so far"""
+        now = datetime.utcnow()
+        for message in self.socket.get_received():
+            payload = message['args'][0] if message['args'] else {}
+            sent_at = payload.get('timestamp') if isinstance(payload, dict) else None
+            if sent_at:
+                lag = (now - datetime.fromisoformat(sent_at)).total_seconds()
+                self.recorder.record(f"recv {message['name']}", max(lag, 0.0))
+
+
+class VirtualTable:
+    """One host and their players playing repeated cycles"""
+
+    def __init__(self, app, socketio, recorder, table_id, players, script_id):
+        self.app = app
+        self.recorder = recorder
+        self.script_id = script_id
+        self.users = [
+            VirtualUser(app, socketio, recorder, f'lt{table_id}_{seat}')
+            for seat in range(players)
+        ]
+        self.cycles = 0
+        self.failures = 0
+
+    def call(self, user, name, method, url, **kwargs):
+        """Make a request as ``user``, then collect the events it caused"""
+        response = user.call(name, method, url, **kwargs)
+        for other in self.users:
+            other.drain()
+        return response
+
+    def run_cycle(self):
+        """Play one game from creation to finish. Returns False on failure"""
+        host, players = self.users[0], self.users[1:]
+        response = self.call(host, 'POST /api/games', 'post', '/api/games', json={'script_id': self.script_id})
+        if response.status_code != 201:
+            return False
+        game = response.get_json()['game']
+        game_id = game['id']
+
+        for user in self.users:
+            user.emit('join_game', {'game_id': game_id})
+        for user in players:
+            self.call(user, 'POST /api/games/join', 'post', '/api/games/join', json={'join_code': game['join_code']})
+        for user in players:
+            self.call(user, 'POST /api/games/<id>/ready', 'post', f'/api/games/{game_id}/ready')
+
+        response = self.call(host, 'POST /api/games/<id>/start', 'post', f'/api/games/{game_id}/start')
+        if response.status_code != 200:
+            return False
+        seats = {p['user_id']: p['id'] for p in response.get_json()['game']['players']}
+
+        response = self.call(host, 'POST /api/games/<id>/actions', 'post', f'/api/games/{game_id}/actions',
+                             json={'action_type': 'advance_phase'})
+        if response.status_code != 201:
+            return False
+
+        nominee = seats[players[0].user_id]
+        self.call(players[-1], 'POST /api/games/<id>/nominate', 'post', f'/api/games/{game_id}/nominate',
+                  json={'target_id': nominee})
+        for user in self.users:
+            self.call(user, 'POST /api/games/<id>/vote', 'post', f'/api/games/{game_id}/vote',
+                      json={'target_id': nominee, 'vote_type': 'execution'})
+        self.call(host, 'GET /api/games/<id>/tally', 'get', f'/api/games/{game_id}/tally')
+        self.call(players[0], 'GET /api/games/<id>', 'get', f'/api/games/{game_id}')
+
+        response = self.call(host, 'POST /api/games/<id>/finish', 'post', f'/api/games/{game_id}/finish',
+                             json={'winner_team': 'good'})
+        for user in self.users:
+            user.emit('leave_game', {'game_id': game_id})
+            user.drain()
+        return response.status_code == 200
+
+    def run(self, cycles):
+        for _ in range(cycles):
+            try:
+                ok = self.run_cycle()
+            except Exception as e:
+                print(f'Load test cycle failed: {e}')
+                ok = False
+            self.cycles += 1
+            if not ok:
+                self.failures += 1
+
+
+def run_load_test(app, socketio, tables=4, players=7, cycles=5):
+    """Run ``tables`` concurrent tables for ``cycles`` games each and report"""
+    from src.models.script import Script
+
+    with app.app_context():
+        script_id = Script.query.filter_by(name='Trouble Brewing').first().id
+
+    recorder = LatencyRecorder()
+    # Registration hashes passwords, so it happens before the clock starts
+    virtual_tables = [VirtualTable(app, socketio, recorder, i, players, script_id) for i in range(tables)]
+    recorder.samples.clear()
+    recorder.errors.clear()
+
+    threads = [threading.Thread(target=table.run, args=(cycles,)) for table in virtual_tables]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    completed = sum(table.cycles - table.failures for table in virtual_tables)
+    operations = recorder.summary()
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'config': {'tables': tables, 'players': players, 'cycles': cycles},
+        'elapsed_seconds': round(elapsed, 3),
+        'cycles_completed': completed,
+        'cycles_failed': sum(table.failures for table in virtual_tables),
+        'cycles_per_second': round(completed / elapsed, 2) if elapsed else None,
+        'requests_per_second': round(
+            sum(op['count'] for name, op in operations.items() if name.split(' ')[0] in ('GET', 'POST')) / elapsed, 1
+        ) if elapsed else None,
+        'endpoints': {name: op for name, op in operations.items() if not name.startswith(('emit ', 'recv '))},
+        'socket_events': {name: op for name, op in operations.items() if name.startswith(('emit ', 'recv '))},
+    }
@@ -9,16 +9,28 @@ from flask_socketio import SocketIO, emit, join_room, leave_room
 from datetime import datetime
 from src.models.user import db
 from src.models.game import Game
-from src.models.player import Player
+from src.models.player import Player, PlayerStatusEffect, PlayerAbilityUse
 from src.models.role import Role
 from src.models.script import Script, ScriptRole
-from src.models.vote import Vote, PlayerAction, GameLog
-from src.models.game_state import GameState, GameAction, GameHistory
+from src.models.vote import Vote, Nomination, PlayerAction, GameLog
+from src.models.game_state import GameState, GameAction, GameHistory, UserGameSummary
+from src.models.schema import upgrade_schema, seed_default_data
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.game import game_bp
 from src.routes.role import role_bp
 from src.routes.game_state import game_state_bp
+from src.services.live_game import live_games
+from src.services.broadcast import broadcaster
+from src.services.message_queue import socketio_queue_options
+from src.services.role_catalog import role_catalog
+from src.services.script_index import script_indexes
+from src.services.metrics import request_metrics
+from src.services.auto_save import auto_saver
+from src.services.action_log import action_log
+from src.services.night_order import night_orders
+from src.services.user_cache import user_cache
+from src.services.password_hasher import password_hasher
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -26,8 +38,11 @@ app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 # Enable CORS for all routes
 CORS(app, origins=['*'])
 
-# Initialize SocketIO with CORS support
-socketio = SocketIO(app, cors_allowed_origins=['http://localhost:5173', 'http://localhost:3000', '*'])
+# Initialize SocketIO with CORS support. A message queue (Redis in production,
+# memory:// in tests) lets rooms span every backend worker.
+message_queue = os.environ.get('SOCKETIO_MESSAGE_QUEUE', os.environ.get('REDIS_URL'))
+socketio = SocketIO(app, cors_allowed_origins=['http://localhost:5173', 'http://localhost:3000', '*'],
+                    **socketio_queue_options(message_queue))
 
 # Register blueprints
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -37,10 +52,55 @@ app.register_blueprint(role_bp, url_prefix='/api')
 app.register_blueprint(game_state_bp, url_prefix='/api')
 
 # Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'FLASK_SQLALCHEMY_DATABASE_URI',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# Per-request query/timing metrics at /metrics (opt-in)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'false').lower() in ['true', '1', 'yes']
+if 'METRICS_DEBUG_HEADERS' in os.environ:
+    app.config['METRICS_DEBUG_HEADERS'] = os.environ['METRICS_DEBUG_HEADERS'].lower() in ['true', '1', 'yes']
+request_metrics.init_app(app)
+
+# Live game engine (write-behind persistence for active games)
+app.config['LIVE_GAME_JOURNAL'] = os.environ.get(
+    'LIVE_GAME_JOURNAL',
+    os.path.join(os.path.dirname(__file__), 'database', 'live_games.journal')
+)
+live_games.init_app(app)
+
+# Sequenced game change broadcasts, numbered in a store every worker shares
+app.config['BROADCAST_STORE_URL'] = os.environ.get('BROADCAST_STORE_URL', message_queue)
+broadcaster.init_app(app, socketio)
+live_games.on_flush(broadcaster.emit_operations)
+
+# Incremental auto-saves written off the request path
+auto_saver.init_app(app)
+
+# Host actions with replay-based undo/redo
+action_log.init_app(app)
+
+# Short-lived cache of the identities require_auth checks
+if 'USER_CACHE_TTL' in os.environ:
+    app.config['USER_CACHE_TTL'] = float(os.environ['USER_CACHE_TTL'])
+app.config['USER_CACHE_REDIS_URL'] = os.environ.get('USER_CACHE_REDIS_URL', os.environ.get('REDIS_URL'))
+user_cache.init_app(app)
+
+# Password hashing on a bounded worker pool
+for key, cast in (('PASSWORD_HASH_METHOD', str), ('PASSWORD_HASH_POOL', str),
+                  ('PASSWORD_HASH_WORKERS', int), ('PASSWORD_HASH_MAX_PENDING', int)):
+    if key in os.environ:
+        app.config[key] = cast(os.environ[key])
+password_hasher.init_app(app)
+
+# Cached role reference data
+role_catalog.init_app(app)
+script_indexes.init_app(app)
+night_orders.init_app(app)
+
 # WebSocket event handlers
 @socketio.on('connect')
 def handle_connect():
@@ -67,6 +127,35 @@ def handle_leave_game(data):
         emit('left_game', {'game_id': game_id}, room=f'game_{game_id}')
         print(f'Client {request.sid} left game {game_id}')
 
+@socketio.on('resync')
+def handle_resync(data):
+    """Send a client the deltas it missed, or a snapshot if they are gone"""
+    game_id = data.get('game_id')
+    if not game_id:
+        return
+    
+    # Read the sequence number before building any snapshot so that a change
+    # landing in between is re-sent rather than lost
+    seq = broadcaster.current_seq(game_id)
+    deltas = None
+    if data.get('epoch') == broadcaster.epoch:
+        deltas = broadcaster.since(game_id, data.get('since_seq', 0))
+    
+    payload = {'game_id': game_id, 'epoch': broadcaster.epoch, 'seq': seq}
+    if deltas is not None:
+        payload['deltas'] = deltas
+    else:
+        game = Game.load_with_roster(game_id)
+        if not game:
+            return
+        snapshot = game.to_dict()
+        live_game = live_games.peek(game_id)
+        if live_game:
+            live_game.overlay(snapshot)
+        payload['snapshot'] = snapshot
+    
+    emit('game_resync', payload)
+
 @socketio.on('game_update')
 def handle_game_update(data):
     game_id = data.get('game_id')
@@ -142,62 +231,21 @@ app.socketio = socketio
 def init_database():
     """Initialize database with default data"""
     with app.app_context():
-        db.create_all()
+        upgrade_schema()
+        
+        # Replay live game operations that were not flushed before shutdown
+        recovered = live_games.recover()
+        if recovered:
+            print(f"Recovered {recovered} live game operations from journal")
         
-        # Check if roles already exist
-        if Role.query.count() == 0:
-            from src.models.role import DEFAULT_ROLES
-            print("Initializing default roles...")
-            
-            for role_data in DEFAULT_ROLES:
-                role = Role(
-                    character_id=role_data['character_id'],
-                    name=role_data['name'],
-                    edition=role_data['edition'],
-                    team=role_data['team'],
-                    ability=role_data['ability'],
-                    first_night=role_data['first_night'],
-                    first_night_reminder=role_data['first_night_reminder'],
-                    other_night=role_data['other_night'],
-                    other_night_reminder=role_data['other_night_reminder'],
-                    setup=role_data['setup']
-                )
-                role.set_reminders(role_data.get('reminders', []))
-                role.set_reminders_global(role_data.get('reminders_global', []))
-                role.set_image(role_data.get('image', []))
-                role.set_special(role_data.get('special', []))
-                role.set_jinxes(role_data.get('jinxes', []))
-                db.session.add(role)
-            
-            db.session.commit()
-            print(f"Added {len(DEFAULT_ROLES)} default roles")
+        seed_default_data()
         
-        # Check if Trouble Brewing script exists
-        if Script.query.filter_by(name='Trouble Brewing').first() is None:
-            from src.models.script import TROUBLE_BREWING_SCRIPT
-            print("Initializing Trouble Brewing script...")
-            
-            script = Script(
-                name=TROUBLE_BREWING_SCRIPT['name'],
-                author=TROUBLE_BREWING_SCRIPT['author'],
-                description=TROUBLE_BREWING_SCRIPT['description'],
-                is_official=TROUBLE_BREWING_SCRIPT['is_official'],
-                player_count_min=TROUBLE_BREWING_SCRIPT['player_count_min'],
-                player_count_max=TROUBLE_BREWING_SCRIPT['player_count_max'],
-                version=TROUBLE_BREWING_SCRIPT['version']
-            )
-            db.session.add(script)
-            db.session.commit()
-            
-            # Add roles to script
-            for role_name in TROUBLE_BREWING_SCRIPT['roles']:
-                role = Role.query.filter_by(name=role_name).first()
-                if role:
-                    script_role = ScriptRole(script_id=script.id, role_id=role.id)
-                    db.session.add(script_role)
-            
-            db.session.commit()
-            print("Added Trouble Brewing script with roles")
+        print(f"Loaded {role_catalog.load()} roles into the role catalog")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create or upgrade the database schema and seed default data"""
+    init_database()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
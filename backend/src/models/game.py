@@ -1,12 +1,36 @@
 from src.models.user import db
+from src.models.seating import SeatingRing
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
 from datetime import datetime
 import json
 import secrets
 import string
 
+JOIN_CODE_ALPHABET = string.ascii_uppercase + string.digits
+JOIN_CODE_LENGTH = 6
+JOIN_CODE_ATTEMPTS = 8  # a collision needs ~1M open games to be even 0.05% likely
+
+ENDED_STATUSES = ('ended', 'completed')
+
+
+def retired_join_code(game_id):
+    """Get the placeholder code an ended game keeps so its join code can be reused.
+
+    Live codes are six letters and digits; placeholders start with '-'
+    followed by the game id in base 36, so the two never collide.
+    """
+    digits = ''
+    while True:
+        game_id, remainder = divmod(game_id, 36)
+        digits = (string.digits + string.ascii_uppercase)[remainder] + digits
+        if not game_id:
+            return '-' + digits
+
 class Game(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    host_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    host_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     join_code = db.Column(db.String(8), unique=True, nullable=False)
     script_id = db.Column(db.Integer, db.ForeignKey('script.id'), nullable=True)
     status = db.Column(db.String(20), default='lobby')  # lobby, night, day, ended
@@ -17,12 +41,17 @@ class Game(db.Model):
     ended_at = db.Column(db.DateTime, nullable=True)
     winner = db.Column(db.String(20), nullable=True)  # good, evil, or null
     settings = db.Column(db.Text, default='{}')  # JSON string for game settings
-    current_nominations = db.Column(db.Text, default='[]')  # JSON array of current nominations
     
     # Relationships
     players = db.relationship('Player', backref='game', lazy=True, cascade='all, delete-orphan')
     game_logs = db.relationship('GameLog', backref='game', lazy=True, cascade='all, delete-orphan')
     votes = db.relationship('Vote', backref='game', lazy=True, cascade='all, delete-orphan')
+    nominations = db.relationship('Nomination', backref='game', lazy=True, cascade='all, delete-orphan')
+    
+    # Active games using a script (delete_script)
+    __table_args__ = (db.Index('ix_game_script_status', 'script_id', 'status'),)
+    
+    _seating = None  # SeatingRing built from the loaded players, see seating
     
     def __init__(self, **kwargs):
         super(Game, self).__init__(**kwargs)
@@ -31,13 +60,60 @@ class Game(db.Model):
         if not self.settings:
             self.settings = json.dumps(self.get_default_settings())
 
+    @staticmethod
+    def roster_options():
+        """Loader options that fetch players with their users and roles in one query"""
+        from src.models.player import Player
+
+        return [
+            selectinload(Game.players).options(
+                joinedload(Player.user),
+                joinedload(Player.role),
+                selectinload(Player.effects),
+                selectinload(Player.ability_uses)
+            )
+        ]
+
+    @staticmethod
+    def load_with_roster(game_id):
+        """Get a game with its full roster eager-loaded for serialization"""
+        return Game.query.options(*Game.roster_options()).filter_by(id=game_id).first()
+
     @staticmethod
     def generate_join_code():
-        """Generate a unique 6-character join code"""
-        while True:
-            code = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-            if not Game.query.filter_by(join_code=code).first():
-                return code
+        """Draw a random 6-character join code (uniqueness is checked on insert)"""
+        return ''.join(secrets.choice(JOIN_CODE_ALPHABET) for _ in range(JOIN_CODE_LENGTH))
+
+    def add_with_join_code(self, attempts=JOIN_CODE_ATTEMPTS):
+        """Insert the game, drawing a new join code whenever the unique constraint rejects it.
+
+        A collision costs one failed insert rather than a lookup per
+        candidate. When the session holds no other changes the insert is
+        flushed directly and a collision rolls back the transaction;
+        otherwise each attempt runs in a savepoint so those changes survive.
+        """
+        session = db.session
+        for attempt in range(attempts):
+            clean = not (session.new or session.dirty or session.deleted)
+            try:
+                if clean:
+                    session.add(self)
+                    session.flush()
+                else:
+                    with session.begin_nested():
+                        session.add(self)
+                return
+            except IntegrityError as e:
+                if clean:
+                    session.rollback()
+                if 'join_code' not in str(e.orig) or attempt == attempts - 1:
+                    raise
+                self.join_code = Game.generate_join_code()
+
+    def release_join_code(self):
+        """Give up the game's join code so new games can draw it again"""
+        if self.id is not None and not self.join_code.startswith('-'):
+            self.join_code = retired_join_code(self.id)
 
     def get_default_settings(self):
         """Get default game settings"""
@@ -66,30 +142,49 @@ class Game(db.Model):
         self.settings = json.dumps(settings_dict)
 
     def get_nominations(self):
-        """Get current nominations as list"""
-        try:
-            return json.loads(self.current_nominations)
-        except:
+        """Get today's nominations as list (empty outside the day phase)"""
+        from src.models.vote import Nomination
+        
+        if self.status != 'day':
             return []
+        nominations = Nomination.query.filter_by(
+            game_id=self.id,
+            day_number=self.day_number
+        ).order_by(Nomination.id).all()
+        return [n.to_dict() for n in nominations]
 
-    def set_nominations(self, nominations_list):
-        """Set current nominations from list"""
-        self.current_nominations = json.dumps(nominations_list)
+    def has_nominated_today(self, player_id):
+        """Check if a player has already nominated today"""
+        from src.models.vote import Nomination
+        
+        return Nomination.query.filter_by(
+            game_id=self.id,
+            day_number=self.day_number,
+            nominator_id=player_id
+        ).first() is not None
 
     def add_nomination(self, nominator_id, nominee_id):
-        """Add a nomination"""
-        nominations = self.get_nominations()
-        nomination = {
-            'nominator_id': nominator_id,
-            'nominee_id': nominee_id,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        nominations.append(nomination)
-        self.set_nominations(nominations)
+        """Add a nomination for the current day"""
+        from src.models.vote import Nomination
+        
+        nomination = Nomination(
+            game_id=self.id,
+            day_number=self.day_number,
+            nominator_id=nominator_id,
+            nominee_id=nominee_id
+        )
+        db.session.add(nomination)
+        return nomination
 
-    def clear_nominations(self):
-        """Clear all current nominations"""
-        self.set_nominations([])
+    @property
+    def seating(self):
+        """Get the seating ring of the loaded players, building it on first use"""
+        ring = self._seating
+        if ring is None or ring.stale:
+            ring = self._seating = SeatingRing(self.players)
+            for player in ring.seats:
+                player._seating = ring
+        return ring
 
     def get_alive_players(self):
         """Get list of alive players"""
@@ -105,7 +200,7 @@ class Game(db.Model):
 
     def get_alive_count(self):
         """Get number of alive players"""
-        return len(self.get_alive_players())
+        return self.seating.alive_count
 
     def can_start(self):
         """Check if game can be started"""
@@ -133,13 +228,13 @@ class Game(db.Model):
         elif self.status == 'day':
             self.status = 'night'
             self.phase += 1
-        self.clear_nominations()
 
     def end_game(self, winner):
         """End the game with specified winner"""
         self.status = 'ended'
         self.winner = winner
         self.ended_at = datetime.utcnow()
+        self.release_join_code()
         
         # Update player statistics
         for player in self.players:
@@ -172,7 +267,7 @@ class Game(db.Model):
         data = {
             'id': self.id,
             'host_id': self.host_id,
-            'join_code': self.join_code,
+            'join_code': None if self.join_code.startswith('-') else self.join_code,
             'script_id': self.script_id,
             'status': self.status,
             'phase': self.phase,
@@ -194,3 +289,38 @@ class Game(db.Model):
         
         return data
 
+
+@event.listens_for(Game.players, 'append')
+@event.listens_for(Game.players, 'remove')
+def _roster_changed(game, player, initiator):
+    if game._seating is not None:
+        game._seating.stale = True
+
+
+@event.listens_for(Game, 'expire')
+def _drop_seating_on_expire(game, attrs):
+    # game is None when the instance was already garbage collected
+    if game is not None and (attrs is None or 'players' in attrs):
+        game._seating = None
+
+
+@event.listens_for(Game, 'refresh')
+def _drop_seating_on_refresh(game, context, attrs):
+    if game is not None and (attrs is None or 'players' in attrs):
+        game._seating = None
+
+
+def release_ended_join_codes(batch_size=1000):
+    """Retire the join codes ended games were still holding"""
+    released = 0
+    while True:
+        games = Game.query.filter(
+            Game.status.in_(ENDED_STATUSES),
+            ~Game.join_code.startswith('-')
+        ).limit(batch_size).all()
+        for game in games:
+            game.release_join_code()
+        db.session.commit()
+        released += len(games)
+        if len(games) < batch_size:
+            return released
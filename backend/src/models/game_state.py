@@ -1,32 +1,135 @@
 from src.models.user import db
+from src.models.state_codec import encode_blob, decode_blob, read_header
+from sqlalchemy.orm import load_only
 from datetime import datetime
 import json
 
+
+def decode_text_state(text):
+    """Parse state data stored as JSON text, before the blob columns"""
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+
+
+def players_summary(data):
+    """Get the player counts shown in previews of a saved state"""
+    players = data.get('players', [])
+    return {
+        'player_count': len(players),
+        'alive_count': len([p for p in players if p.get('is_alive', True)])
+    }
+
+
+def diff_snapshots(base, current):
+    """Get the changes that turn snapshot ``base`` into ``current``"""
+    delta = {'players': [], 'removed': []}
+    if current.get('game_info') != base.get('game_info'):
+        delta['game_info'] = current.get('game_info')
+    if current.get('script_id') != base.get('script_id'):
+        delta['script_id'] = current.get('script_id')
+
+    before = {p['id']: p for p in base.get('players', [])}
+    for player in current.get('players', []):
+        old = before.pop(player['id'], None)
+        if old is None:
+            delta['players'].append(player)
+            continue
+        changed = {key: value for key, value in player.items() if old.get(key) != value}
+        if changed:
+            changed['id'] = player['id']
+            delta['players'].append(changed)
+    delta['removed'] = sorted(before)
+    return delta
+
+
+def apply_snapshot_delta(base, delta):
+    """Apply a delta from diff_snapshots to a snapshot, returning a new one"""
+    state = dict(base)
+    for key in ('game_info', 'script_id', 'timestamp'):
+        if key in delta:
+            state[key] = delta[key]
+
+    removed = set(delta.get('removed', []))
+    players = {p['id']: p for p in base.get('players', []) if p['id'] not in removed}
+    for change in delta.get('players', []):
+        players[change['id']] = dict(players.get(change['id'], {}), **change)
+    state['players'] = sorted(players.values(), key=lambda p: p.get('position', 0))
+    return state
+
+
 class GameState(db.Model):
     """Model for saving and loading game states"""
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     state_name = db.Column(db.String(100), nullable=False)
-    state_data = db.Column(db.Text, nullable=False)  # JSON serialized game state
+    state_data = db.Column(db.Text, nullable=False)  # Legacy JSON text, empty when state_blob is set
+    state_blob = db.Column(db.LargeBinary, nullable=True)  # Compressed state, see state_codec
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_auto_save = db.Column(db.Boolean, default=False)  # Auto-saves vs manual saves
     phase = db.Column(db.String(20), nullable=False)  # day/night
     day_number = db.Column(db.Integer, default=1)
+    # Preview counts, so listing saves never decodes state data
+    player_count = db.Column(db.Integer, nullable=True)
+    alive_count = db.Column(db.Integer, nullable=True)
+    # Sequence of the last GameAction included, for snapshots the action log replays from
+    action_sequence = db.Column(db.Integer, nullable=True)
+    
+    __table_args__ = (
+        # Saved states for a game, newest first
+        db.Index('ix_game_state_game_created', 'game_id', 'created_at'),
+        # Paginated save lists (list_page)
+        db.Index('ix_game_state_game_id', 'game_id', 'id'),
+        # Nearest replay snapshot before an action
+        db.Index('ix_game_state_game_action_sequence', 'game_id', 'action_sequence'),
+    )
+    
+    # Columns needed by to_dict, everything but the state data
+    LISTED_COLUMNS = ('id', 'game_id', 'state_name', 'created_by', 'created_at', 'is_auto_save',
+                      'phase', 'day_number', 'player_count', 'alive_count')
     
     def __init__(self, **kwargs):
         super(GameState, self).__init__(**kwargs)
     
-    def set_state_data(self, data):
-        """Set state data from dictionary"""
-        self.state_data = json.dumps(data, default=str)
+    def set_state_data(self, data, summary=None):
+        """Set state data from dictionary, with the player counts for previews"""
+        summary = summary or players_summary(data)
+        self.state_blob = encode_blob(data, header=summary)
+        self.state_data = ''
+        self.player_count = summary['player_count']
+        self.alive_count = summary['alive_count']
+    
+    def get_raw_state_data(self):
+        """Get the stored data, which for incremental auto-saves is only a delta"""
+        if self.state_blob is not None:
+            return decode_blob(self.state_blob)
+        return decode_text_state(self.state_data)
     
     def get_state_data(self):
-        """Get state data as dictionary"""
-        try:
-            return json.loads(self.state_data)
-        except:
-            return {}
+        """Get state data as dictionary, rebuilding incremental auto-saves"""
+        data = self.get_raw_state_data()
+        if not data.get('delta'):
+            return data
+        
+        # Replay the chain of deltas from its checkpoint up to this save
+        checkpoint_id = data['checkpoint_id']
+        chain = GameState.query.filter(
+            GameState.game_id == self.game_id,
+            GameState.is_auto_save.is_(True),
+            GameState.id >= checkpoint_id,
+            GameState.id < self.id
+        ).order_by(GameState.id).all()
+        
+        state = None
+        for saved in chain + [self]:
+            saved_data = data if saved is self else saved.get_raw_state_data()
+            if saved.id == checkpoint_id:
+                state = saved_data
+            elif state is not None and saved_data.get('checkpoint_id') == checkpoint_id:
+                state = apply_snapshot_delta(state, saved_data)
+        return state or {}
     
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -44,13 +147,42 @@ class GameState(db.Model):
     
     def get_state_preview(self):
         """Get a preview of the game state for display"""
-        data = self.get_state_data()
-        return {
-            'player_count': len(data.get('players', [])),
-            'alive_count': len([p for p in data.get('players', []) if p.get('is_alive', True)]),
-            'phase': self.phase,
-            'day': self.day_number
-        }
+        if self.player_count is not None:
+            summary = {'player_count': self.player_count, 'alive_count': self.alive_count}
+        elif self.state_blob is not None:
+            summary = read_header(self.state_blob)
+        else:
+            data = decode_text_state(self.state_data)
+            summary = data.get('summary') or players_summary(data)
+        return dict(summary, phase=self.phase, day=self.day_number)
+    
+    @staticmethod
+    def list_page(game_id, before_id=None, limit=50):
+        """Get up to ``limit`` saves of a game older than ``before_id``, newest first.
+        
+        Only the listed columns are loaded, never the state data. Replay
+        snapshots of the action log are not saves and are left out.
+        """
+        query = GameState.query.options(
+            load_only(*[getattr(GameState, name) for name in GameState.LISTED_COLUMNS])
+        ).filter(GameState.game_id == game_id, GameState.action_sequence.is_(None))
+        if before_id is not None:
+            query = query.filter(GameState.id < before_id)
+        return query.order_by(GameState.id.desc()).limit(limit).all()
+
+def backfill_state_previews(batch_size=200):
+    """Fill in the preview counts of saves written before they were columns"""
+    filled = 0
+    while True:
+        states = GameState.query.filter(GameState.player_count.is_(None)).limit(batch_size).all()
+        for state in states:
+            preview = state.get_state_preview()
+            state.player_count = preview.get('player_count', 0)
+            state.alive_count = preview.get('alive_count', 0)
+        db.session.commit()
+        filled += len(states)
+        if len(states) < batch_size:
+            return filled
 
 class GameAction(db.Model):
     """Model for tracking individual game actions for undo/redo"""
@@ -64,6 +196,23 @@ class GameAction(db.Model):
     undo_reason = db.Column(db.String(200), nullable=True)
     phase = db.Column(db.String(20), nullable=False)
     day_number = db.Column(db.Integer, default=1)
+    sequence = db.Column(db.Integer, nullable=True)  # Order of the action within its game
+    changes = db.Column(db.Text, nullable=True)  # JSON field changes made, see services/action_log
+    
+    __table_args__ = (
+        # Recent actions that have not been undone (get_game_actions)
+        db.Index('ix_game_action_game_undone_performed', 'game_id', 'is_undone', 'performed_at'),
+        # Full action list in order (create_game_history)
+        db.Index('ix_game_action_game_performed', 'game_id', 'performed_at'),
+        # Replay after a snapshot
+        db.Index('ix_game_action_game_sequence', 'game_id', 'sequence'),
+    )
+    
+    @staticmethod
+    def next_sequence(game_id):
+        """Get the sequence number for the next action of a game"""
+        last = db.session.query(db.func.max(GameAction.sequence)).filter(GameAction.game_id == game_id).scalar()
+        return (last or 0) + 1
     
     def set_action_data(self, data):
         """Set action data from dictionary"""
@@ -76,6 +225,14 @@ class GameAction(db.Model):
         except:
             return {}
     
+    def set_changes(self, changes):
+        """Set the field changes made by the action"""
+        self.changes = json.dumps(changes, default=str)
+    
+    def get_changes(self):
+        """Get the field changes made by the action, [] for bookkeeping actions"""
+        return json.loads(self.changes) if self.changes else []
+    
     def to_dict(self):
         """Convert to dictionary for API responses"""
         return {
@@ -88,15 +245,18 @@ class GameAction(db.Model):
             'is_undone': self.is_undone,
             'undo_reason': self.undo_reason,
             'phase': self.phase,
-            'day_number': self.day_number
+            'day_number': self.day_number,
+            'sequence': self.sequence
         }
 
 class GameHistory(db.Model):
     """Model for storing complete game history and replay data"""
     id = db.Column(db.Integer, primary_key=True)
-    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
-    history_data = db.Column(db.Text, nullable=False)  # Complete game history
-    final_state = db.Column(db.Text, nullable=False)  # Final game state
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    history_data = db.Column(db.Text, nullable=False)  # Legacy JSON text, empty when history_blob is set
+    final_state = db.Column(db.Text, nullable=False)  # Legacy JSON text, empty when final_state_blob is set
+    history_blob = db.Column(db.LargeBinary, nullable=True)  # Compressed history, see state_codec
+    final_state_blob = db.Column(db.LargeBinary, nullable=True)  # Compressed final state
     winner_team = db.Column(db.String(20), nullable=True)  # good/evil
     game_duration = db.Column(db.Integer, nullable=True)  # Duration in seconds
     total_days = db.Column(db.Integer, default=1)
@@ -105,25 +265,25 @@ class GameHistory(db.Model):
     
     def set_history_data(self, data):
         """Set history data from dictionary"""
-        self.history_data = json.dumps(data, default=str)
+        self.history_blob = encode_blob(data, header={'total_actions': len(data.get('actions', []))})
+        self.history_data = ''
     
     def get_history_data(self):
         """Get history data as dictionary"""
-        try:
-            return json.loads(self.history_data)
-        except:
-            return {}
+        if self.history_blob is not None:
+            return decode_blob(self.history_blob)
+        return decode_text_state(self.history_data)
     
     def set_final_state(self, data):
         """Set final state data from dictionary"""
-        self.final_state = json.dumps(data, default=str)
+        self.final_state_blob = encode_blob(data, header=players_summary(data))
+        self.final_state = ''
     
     def get_final_state(self):
         """Get final state data as dictionary"""
-        try:
-            return json.loads(self.final_state)
-        except:
-            return {}
+        if self.final_state_blob is not None:
+            return decode_blob(self.final_state_blob)
+        return decode_text_state(self.final_state)
     
     def to_dict(self):
         """Convert to dictionary for API responses"""
@@ -140,16 +300,177 @@ class GameHistory(db.Model):
     
     def get_history_preview(self):
         """Get a preview of the game history"""
-        history = self.get_history_data()
-        final_state = self.get_final_state()
+        if self.history_blob is not None:
+            total_actions = read_header(self.history_blob).get('total_actions', 0)
+        else:
+            total_actions = len(self.get_history_data().get('actions', []))
+        if self.final_state_blob is not None:
+            final_player_count = read_header(self.final_state_blob).get('player_count', 0)
+        else:
+            final_player_count = len(self.get_final_state().get('players', []))
         
         return {
-            'total_actions': len(history.get('actions', [])),
-            'final_player_count': len(final_state.get('players', [])),
+            'total_actions': total_actions,
+            'final_player_count': final_player_count,
             'winner_team': self.winner_team,
             'duration_minutes': self.game_duration // 60 if self.game_duration else 0
         }
 
+# Teams that make up each alignment
+ALIGNMENTS = {'townsfolk': 'good', 'outsider': 'good', 'minion': 'evil', 'demon': 'evil'}
+
+class UserGameSummary(db.Model):
+    """One row per user per finished game, for history lists and win rates"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False, index=True)
+    history_id = db.Column(db.Integer, db.ForeignKey('game_history.id'), nullable=True)
+    is_host = db.Column(db.Boolean, default=False)  # Hosted without a seat
+    role_id = db.Column(db.Integer, db.ForeignKey('role.id'), nullable=True)
+    team = db.Column(db.String(20), nullable=True)  # townsfolk, outsider, minion, demon
+    alignment = db.Column(db.String(10), nullable=True)  # good/evil
+    winner_team = db.Column(db.String(20), nullable=True)
+    won = db.Column(db.Boolean, nullable=True)  # None when there was no winner or no seat
+    survived = db.Column(db.Boolean, nullable=True)
+    game_duration = db.Column(db.Integer, nullable=True)  # Duration in seconds
+    total_days = db.Column(db.Integer, default=1)
+    ended_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # A user's games, newest first
+        db.Index('ix_user_game_summary_user_ended', 'user_id', 'ended_at', 'id'),
+        db.UniqueConstraint('user_id', 'game_id', name='uq_user_game_summary_user_game'),
+    )
+    
+    @staticmethod
+    def for_history(history, game):
+        """Create the summaries of a finished game's players and host"""
+        summaries = []
+        for player in game.players:
+            alignment = ALIGNMENTS.get(player.role.team) if player.role else None
+            summaries.append(UserGameSummary(
+                user_id=player.user_id,
+                game_id=game.id,
+                history_id=history.id,
+                role_id=player.role_id,
+                team=player.role.team if player.role else None,
+                alignment=alignment,
+                winner_team=history.winner_team,
+                won=(alignment == history.winner_team) if alignment and history.winner_team in ('good', 'evil') else None,
+                survived=player.is_alive,
+                game_duration=history.game_duration,
+                total_days=history.total_days,
+                ended_at=game.ended_at or history.created_at
+            ))
+        if game.host_id not in {player.user_id for player in game.players}:
+            summaries.append(UserGameSummary(
+                user_id=game.host_id,
+                game_id=game.id,
+                history_id=history.id,
+                is_host=True,
+                winner_team=history.winner_team,
+                game_duration=history.game_duration,
+                total_days=history.total_days,
+                ended_at=game.ended_at or history.created_at
+            ))
+        return summaries
+    
+    @staticmethod
+    def page(user_id, before_id=None, limit=50):
+        """Get up to ``limit`` of a user's games older than summary ``before_id``, newest first"""
+        query = UserGameSummary.query.filter(UserGameSummary.user_id == user_id)
+        if before_id is not None:
+            before = db.session.get(UserGameSummary, before_id)
+            if before is not None:
+                query = query.filter(db.or_(
+                    UserGameSummary.ended_at < before.ended_at,
+                    db.and_(UserGameSummary.ended_at == before.ended_at, UserGameSummary.id < before.id)
+                ))
+        return query.order_by(UserGameSummary.ended_at.desc(), UserGameSummary.id.desc()).limit(limit).all()
+    
+    @staticmethod
+    def stats(user_id):
+        """Get a user's game counts and win rates overall, per alignment and per role"""
+        from src.models.role import Role
+        
+        wins = db.func.sum(db.case((UserGameSummary.won.is_(True), 1), else_=0))
+        decided = db.func.count(UserGameSummary.won)
+        mine = UserGameSummary.user_id == user_id
+        
+        def rates(games, won, decided_games):
+            return {
+                'games': games,
+                'wins': int(won or 0),
+                'win_rate': round((won or 0) / decided_games, 4) if decided_games else None
+            }
+        
+        played, hosted = db.session.query(
+            db.func.count(UserGameSummary.id).filter(UserGameSummary.is_host.is_(False)),
+            db.func.count(UserGameSummary.id).filter(UserGameSummary.is_host.is_(True))
+        ).filter(mine).one()
+        total = db.session.query(wins, decided).filter(mine).one()
+        
+        by_alignment = {
+            alignment: rates(games, won, decided_games)
+            for alignment, games, won, decided_games in db.session.query(
+                UserGameSummary.alignment, db.func.count(), wins, decided
+            ).filter(mine, UserGameSummary.alignment.isnot(None)).group_by(UserGameSummary.alignment)
+        }
+        by_team = {
+            team: rates(games, won, decided_games)
+            for team, games, won, decided_games in db.session.query(
+                UserGameSummary.team, db.func.count(), wins, decided
+            ).filter(mine, UserGameSummary.team.isnot(None)).group_by(UserGameSummary.team)
+        }
+        by_role = [
+            dict(rates(games, won, decided_games), role_id=role_id, role_name=name)
+            for role_id, name, games, won, decided_games in db.session.query(
+                UserGameSummary.role_id, Role.name, db.func.count(), wins, decided
+            ).join(Role, Role.id == UserGameSummary.role_id).filter(mine)
+            .group_by(UserGameSummary.role_id, Role.name).order_by(db.func.count().desc(), Role.name)
+        ]
+        
+        return dict(
+            rates(played, total[0], total[1]),
+            hosted=hosted,
+            by_alignment=by_alignment,
+            by_team=by_team,
+            by_role=by_role
+        )
+    
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            'id': self.id,
+            'game_id': self.game_id,
+            'history_id': self.history_id,
+            'is_host': self.is_host,
+            'role_id': self.role_id,
+            'team': self.team,
+            'alignment': self.alignment,
+            'winner_team': self.winner_team,
+            'won': self.won,
+            'survived': self.survived,
+            'game_duration': self.game_duration,
+            'total_days': self.total_days,
+            'ended_at': self.ended_at.isoformat() if self.ended_at else None
+        }
+
+def backfill_user_game_summaries():
+    """Create the summaries of games that finished before summaries existed"""
+    from src.models.game import Game
+    
+    histories = GameHistory.query.filter(
+        ~db.exists().where(UserGameSummary.game_id == GameHistory.game_id)
+    ).all()
+    for history in histories:
+        game = Game.load_with_roster(history.game_id)
+        if game is not None:
+            db.session.add_all(UserGameSummary.for_history(history, game))
+    if histories:
+        db.session.commit()
+    return len(histories)
+
 # Game state management utility functions
 class GameStateManager:
     """Utility class for managing game state operations"""
@@ -205,15 +526,11 @@ class GameStateManager:
         return game_state.get_state_data()
     
     @staticmethod
-    def auto_save_game(game):
-        """Create an automatic save point"""
-        state_name = f"Auto-save {game.phase} Day {game.day_number}"
-        return GameStateManager.save_game_state(
-            game, 
-            state_name, 
-            game.host_id, 
-            is_auto_save=True
-        )
+    def auto_save_game(game, wait=False):
+        """Create an automatic save point. Returns None if it was queued"""
+        from src.services.auto_save import auto_saver
+        
+        return auto_saver.save(game, wait=wait)
     
     @staticmethod
     def record_action(game, action_type, action_data, performed_by_id):
@@ -223,7 +540,8 @@ class GameStateManager:
             action_type=action_type,
             performed_by=performed_by_id,
             phase=game.phase,
-            day_number=game.day_number
+            day_number=game.day_number,
+            sequence=GameAction.next_sequence(game.id)
         )
         action.set_action_data(action_data)
         
@@ -234,13 +552,14 @@ class GameStateManager:
     
     @staticmethod
     def undo_action(action_id, undo_reason=""):
-        """Mark an action as undone"""
+        """Undo an action, reverting the changes it made"""
+        from src.models.game import Game
+        from src.services.action_log import action_log
+        
         action = GameAction.query.get(action_id)
         if action and not action.is_undone:
-            action.is_undone = True
-            action.undo_reason = undo_reason
-            db.session.commit()
-            return True
+            _, error = action_log.undo(Game.query.get(action.game_id), action, undo_reason)
+            return error is None
         return False
     
     @staticmethod
@@ -277,7 +596,7 @@ class GameStateManager:
         # Create history record
         history = GameHistory(
             game_id=game.id,
-            winner_team=game.winner_team,
+            winner_team=game.winner,
             game_duration=game_duration,
             total_days=game.day_number,
             total_executions=total_executions
@@ -293,6 +612,8 @@ class GameStateManager:
         history.set_final_state(final_state)
         
         db.session.add(history)
+        db.session.flush()
+        db.session.add_all(UserGameSummary.for_history(history, game))
         db.session.commit()
         
         return history
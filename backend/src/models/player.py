@@ -1,10 +1,12 @@
 from src.models.user import db
+from src.models.seating import first_free_seat
+from sqlalchemy import event
 from datetime import datetime
 import json
 
 class Player(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     role_id = db.Column(db.Integer, db.ForeignKey('role.id'), nullable=True)
     position = db.Column(db.Integer, nullable=False)  # Seating position (0-based)
@@ -13,41 +15,36 @@ class Player(db.Model):
     votes_remaining = db.Column(db.Integer, default=1)  # Dead players get 1 vote
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
     died_at = db.Column(db.DateTime, nullable=True)
-    abilities_used = db.Column(db.Text, default='[]')  # JSON array of used abilities
-    status_effects = db.Column(db.Text, default='[]')  # JSON array of status effects
     notes = db.Column(db.Text, default='')  # Host notes about this player
     
     # Relationships
     votes_cast = db.relationship('Vote', foreign_keys='Vote.voter_id', backref='voter', lazy=True)
     votes_received = db.relationship('Vote', foreign_keys='Vote.target_id', backref='target', lazy=True)
     actions_performed = db.relationship('PlayerAction', foreign_keys='PlayerAction.player_id', backref='player', lazy=True)
+    effects = db.relationship('PlayerStatusEffect', backref='player', lazy=True, cascade='all, delete-orphan',
+                              order_by='PlayerStatusEffect.id')
+    ability_uses = db.relationship('PlayerAbilityUse', backref='player', lazy=True, cascade='all, delete-orphan',
+                                   order_by='PlayerAbilityUse.id')
+    
+    # Membership checks filter_by(game_id=..., user_id=...) in nearly every route
+    __table_args__ = (db.Index('ix_player_game_user', 'game_id', 'user_id'),)
+    
+    _seating = None  # Ring of the game this seat was last placed in, see Game.seating
 
     @property
     def username(self):
         """Get the player's username"""
-        from src.models.user import User
-        user = User.query.get(self.user_id)
-        return user.username if user else 'Unknown'
+        return self.user.username if self.user else 'Unknown'
 
     @property
     def role_name(self):
         """Get the player's role name"""
-        from src.models.role import Role
-        role = Role.query.get(self.role_id) if self.role_id else None
-        return role.name if role else 'No Role'
+        return self.role.name if self.role else 'No Role'
 
     @property
     def team(self):
         """Get the player's team"""
-        from src.models.role import Role
-        role = Role.query.get(self.role_id) if self.role_id else None
-        return role.team if role else 'unknown'
-
-    @property
-    def role(self):
-        """Get the player's role object"""
-        from src.models.role import Role
-        return Role.query.get(self.role_id) if self.role_id else None
+        return self.role.team if self.role else 'unknown'
 
     def is_good(self):
         """Check if player is on good team"""
@@ -60,67 +57,71 @@ class Player(db.Model):
     def __init__(self, **kwargs):
         super(Player, self).__init__(**kwargs)
         if self.position is None:
-            # Auto-assign position based on existing players in game
-            existing_positions = [p.position for p in Player.query.filter_by(game_id=self.game_id).all()]
-            self.position = 0
-            while self.position in existing_positions:
-                self.position += 1
+            # Routes holding the game pass game.seating.first_free instead
+            positions = db.session.query(Player.position).filter_by(game_id=self.game_id)
+            self.position = first_free_seat(position for (position,) in positions)
 
     def get_abilities_used(self):
         """Get used abilities as list"""
-        try:
-            return json.loads(self.abilities_used)
-        except:
-            return []
+        return [use.to_dict() for use in self.ability_uses]
 
     def set_abilities_used(self, abilities_list):
-        """Set used abilities from list"""
-        self.abilities_used = json.dumps(abilities_list)
+        """Replace used abilities from list"""
+        self.ability_uses = [PlayerAbilityUse.from_dict(self, a) for a in abilities_list]
 
     def add_ability_used(self, ability_name, night_number=None):
         """Add an ability to the used list"""
-        abilities = self.get_abilities_used()
-        ability_record = {
-            'ability': ability_name,
-            'night': night_number or self.game.phase,
-            'timestamp': datetime.utcnow().isoformat()
-        }
-        abilities.append(ability_record)
-        self.set_abilities_used(abilities)
+        self.ability_uses.append(PlayerAbilityUse(
+            game_id=self.game_id,
+            ability=ability_name,
+            night=night_number or self.game.phase
+        ))
+
+    def has_used_ability(self, ability_name):
+        """Check if player has used a specific ability"""
+        return any(use.ability == ability_name for use in self.ability_uses)
 
     def get_status_effects(self):
         """Get status effects as list"""
-        try:
-            return json.loads(self.status_effects)
-        except:
-            return []
+        return [effect.to_dict() for effect in self.effects]
 
     def set_status_effects(self, effects_list):
-        """Set status effects from list"""
-        self.status_effects = json.dumps(effects_list)
+        """Replace status effects from list"""
+        self.effects = [PlayerStatusEffect.from_dict(self, e) for e in effects_list]
 
     def add_status_effect(self, effect_name, duration=None, source=None):
         """Add a status effect"""
-        effects = self.get_status_effects()
-        effect = {
-            'name': effect_name,
-            'duration': duration,
-            'source': source,
-            'applied_at': datetime.utcnow().isoformat()
-        }
-        effects.append(effect)
-        self.set_status_effects(effects)
+        self.effects.append(PlayerStatusEffect(
+            game_id=self.game_id,
+            name=effect_name,
+            duration=duration,
+            source=source
+        ))
 
     def remove_status_effect(self, effect_name):
         """Remove a status effect by name"""
-        effects = self.get_status_effects()
-        effects = [e for e in effects if e.get('name') != effect_name]
-        self.set_status_effects(effects)
+        self.effects = [e for e in self.effects if e.name != effect_name]
 
     def has_status_effect(self, effect_name):
         """Check if player has a specific status effect"""
-        effects = self.get_status_effects()
-        return any(e.get('name') == effect_name for e in effects)
+        return any(e.name == effect_name for e in self.effects)
+
+    @staticmethod
+    def with_status_effect(game_id, effect_name):
+        """Get all players in a game that have a specific status effect"""
+        return Player.query.join(PlayerStatusEffect).filter(
+            PlayerStatusEffect.game_id == game_id,
+            PlayerStatusEffect.name == effect_name
+        ).all()
+
+    @staticmethod
+    def status_effects_by_player(game_id):
+        """Get the names of every active status effect in a game, keyed by player id"""
+        rows = db.session.query(PlayerStatusEffect.player_id, PlayerStatusEffect.name).filter_by(game_id=game_id)
+        effects = {}
+        for player_id, name in rows:
+            effects.setdefault(player_id, set()).add(name)
+        return effects
 
     def kill(self, cause='execution'):
         """Kill the player"""
@@ -134,6 +135,10 @@ class Player(db.Model):
         self.died_at = None
         self.votes_remaining = 1
 
+    def set_died_at(self, died_at):
+        """Set the time of death from an ISO string, or clear it"""
+        self.died_at = datetime.fromisoformat(died_at) if died_at else None
+
     def can_vote(self):
         """Check if player can vote"""
         return self.votes_remaining > 0
@@ -156,38 +161,13 @@ class Player(db.Model):
 
     def get_neighbors(self):
         """Get neighboring players in seating order"""
-        all_players = sorted(self.game.players, key=lambda p: p.position)
-        player_count = len(all_players)
-        
-        if player_count <= 1:
-            return {'left': None, 'right': None}
-        
-        current_index = next(i for i, p in enumerate(all_players) if p.id == self.id)
-        
-        left_neighbor = all_players[(current_index - 1) % player_count]
-        right_neighbor = all_players[(current_index + 1) % player_count]
-        
-        return {'left': left_neighbor, 'right': right_neighbor}
+        left, right = self.game.seating.neighbors(self.id)
+        return {'left': left, 'right': right}
 
     def get_alive_neighbors(self):
         """Get alive neighboring players"""
-        neighbors = self.get_neighbors()
-        alive_neighbors = {}
-        
-        # Find closest alive neighbor to the left
-        all_players = sorted([p for p in self.game.players if p.is_alive], key=lambda p: p.position)
-        if not all_players:
-            return {'left': None, 'right': None}
-        
-        current_index = next((i for i, p in enumerate(all_players) if p.id == self.id), None)
-        if current_index is None:
-            return {'left': None, 'right': None}
-        
-        player_count = len(all_players)
-        alive_neighbors['left'] = all_players[(current_index - 1) % player_count]
-        alive_neighbors['right'] = all_players[(current_index + 1) % player_count]
-        
-        return alive_neighbors
+        left, right = self.game.seating.alive_neighbors(self.id)
+        return {'left': left, 'right': right}
 
     def __repr__(self):
         return f'<Player {self.user.username} in Game {self.game_id}>'
@@ -211,7 +191,8 @@ class Player(db.Model):
         if self.role:
             if include_sensitive or for_player_id == self.id:
                 # Full role info for the player themselves or host
-                data['role'] = self.role.to_dict()
+                from src.services.role_catalog import role_catalog
+                data['role'] = role_catalog.get(self.role_id) or self.role.to_dict()
             else:
                 # Limited role info for other players
                 data['role'] = {
@@ -230,3 +211,141 @@ class Player(db.Model):
         
         return data
 
+
+@event.listens_for(Player.is_alive, 'set')
+def _relink_seat(player, value, oldvalue, initiator):
+    if player._seating is not None:
+        player._seating.set_alive(player.id, value)
+
+
+@event.listens_for(Player.position, 'set')
+def _reseat(player, value, oldvalue, initiator):
+    if player._seating is not None and value != oldvalue:
+        player._seating.stale = True
+
+
+@event.listens_for(Player, 'expire')
+def _seat_expired(player, attrs):
+    # player is None when the instance was already garbage collected
+    ring = getattr(player, '_seating', None)
+    if ring is not None and (attrs is None or {'is_alive', 'position'} & set(attrs)):
+        ring.stale = True
+
+
+@event.listens_for(Player, 'refresh')
+def _seat_refreshed(player, context, attrs):
+    ring = getattr(player, '_seating', None)
+    if ring is not None:
+        ring.stale = True
+
+
+class PlayerStatusEffect(db.Model):
+    """A status effect (poisoned, drunk, safe, ...) currently on a player"""
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    name = db.Column(db.String(50), nullable=False)
+    duration = db.Column(db.Integer, nullable=True)  # Phases remaining, None if indefinite
+    source = db.Column(db.String(100), nullable=True)  # What applied the effect
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # "All poisoned players in game X"
+    __table_args__ = (db.Index('ix_player_status_effect_game_name', 'game_id', 'name'),)
+
+    @staticmethod
+    def from_dict(player, data):
+        """Create a status effect from its dictionary form"""
+        applied_at = data.get('applied_at')
+        return PlayerStatusEffect(
+            game_id=player.game_id,
+            name=data.get('name'),
+            duration=data.get('duration'),
+            source=data.get('source'),
+            applied_at=datetime.fromisoformat(applied_at) if applied_at else datetime.utcnow()
+        )
+
+    def __repr__(self):
+        return f'<PlayerStatusEffect {self.name} on Player {self.player_id}>'
+
+    def to_dict(self):
+        """Convert status effect to dictionary"""
+        return {
+            'name': self.name,
+            'duration': self.duration,
+            'source': self.source,
+            'applied_at': self.applied_at.isoformat() if self.applied_at else None
+        }
+
+
+class PlayerAbilityUse(db.Model):
+    """A record of a player using an ability"""
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    ability = db.Column(db.String(100), nullable=False)
+    night = db.Column(db.Integer, nullable=True)
+    used_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.Index('ix_player_ability_use_game_ability', 'game_id', 'ability'),)
+
+    @staticmethod
+    def from_dict(player, data):
+        """Create an ability use from its dictionary form"""
+        used_at = data.get('timestamp')
+        return PlayerAbilityUse(
+            game_id=player.game_id,
+            ability=data.get('ability'),
+            night=data.get('night'),
+            used_at=datetime.fromisoformat(used_at) if used_at else datetime.utcnow()
+        )
+
+    def __repr__(self):
+        return f'<PlayerAbilityUse {self.ability} by Player {self.player_id}>'
+
+    def to_dict(self):
+        """Convert ability use to dictionary"""
+        return {
+            'ability': self.ability,
+            'night': self.night,
+            'timestamp': self.used_at.isoformat() if self.used_at else None
+        }
+
+
+def migrate_legacy_player_json():
+    """Move status effects and used abilities out of the old JSON text columns.
+
+    Databases created before the side tables existed still carry
+    ``player.status_effects`` and ``player.abilities_used``. Their contents
+    are copied into rows once and the columns are reset to '[]'.
+    """
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns('player')}
+    if not {'status_effects', 'abilities_used'} <= columns:
+        return 0
+
+    rows = db.session.execute(db.text(
+        "SELECT id, status_effects, abilities_used FROM player "
+        "WHERE status_effects NOT IN ('', '[]') OR abilities_used NOT IN ('', '[]')"
+    )).all()
+
+    migrated = []
+    for player_id, status_effects, abilities_used in rows:
+        try:
+            effects = json.loads(status_effects or '[]')
+            abilities = json.loads(abilities_used or '[]')
+        except ValueError:
+            # Leave unreadable columns in place rather than lose them
+            print(f"Could not migrate status effects and abilities of player {player_id}")
+            continue
+        player = db.session.get(Player, player_id)
+        player.set_status_effects(effects)
+        player.set_abilities_used(abilities)
+        migrated.append(player_id)
+
+    if migrated:
+        db.session.execute(
+            db.text("UPDATE player SET status_effects = '[]', abilities_used = '[]' WHERE id IN :ids")
+            .bindparams(db.bindparam('ids', expanding=True)),
+            {'ids': migrated}
+        )
+        db.session.commit()
+    return len(migrated)
@@ -6,7 +6,7 @@ class Role(db.Model):
     character_id = db.Column(db.String(50), unique=True, nullable=False)  # Official character ID like "widow"
     name = db.Column(db.String(100), nullable=False)
     edition = db.Column(db.String(50), default='trouble-brewing')  # trouble-brewing, sects-and-violets, bad-moon-rising, experimental
-    team = db.Column(db.String(20), nullable=False)  # townsfolk, outsider, minion, demon, traveller, fabled
+    team = db.Column(db.String(20), nullable=False, index=True)  # townsfolk, outsider, minion, demon, traveller, fabled
     ability = db.Column(db.Text, nullable=False)  # Character ability description
     first_night = db.Column(db.Integer, nullable=True)  # Wake order on first night (0 if doesn't wake)
     first_night_reminder = db.Column(db.Text, default='')  # Reminder text for first night
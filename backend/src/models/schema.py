@@ -0,0 +1,151 @@
+from src.models.user import db
+
+
+def create_missing_indexes():
+    """Create indexes declared on the models that an existing database lacks.
+
+    ``db.create_all()`` only creates missing tables, so indexes added to
+    tables that already exist would otherwise never reach older SQLite or
+    Postgres databases. Returns the names of the indexes created.
+    """
+    inspector = db.inspect(db.engine)
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+
+    return created
+
+
+def create_missing_columns():
+    """Add nullable columns declared on the models to existing tables.
+
+    Like indexes, columns added to a model after its table was created are
+    not picked up by ``db.create_all()``. Only nullable columns without a
+    server default are added; anything else needs a real migration.
+    Returns the names of the columns created as ``table.column``.
+    """
+    inspector = db.inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    preparer = db.engine.dialect.identifier_preparer
+    created = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.server_default is not None:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(db.text(
+                    f'ALTER TABLE {preparer.format_table(table)} '
+                    f'ADD COLUMN {preparer.format_column(column)} {column_type}'
+                ))
+            created.append(f'{table.name}.{column.name}')
+
+    return created
+
+
+def upgrade_schema():
+    """Bring the database schema up to date with the models"""
+    from src.models.game import release_ended_join_codes
+    from src.models.player import migrate_legacy_player_json
+    from src.models.vote import migrate_legacy_nominations
+    from src.models.game_state import backfill_state_previews, backfill_user_game_summaries
+
+    db.create_all()
+
+    added = create_missing_columns()
+    if added:
+        print(f"Added {len(added)} columns: {', '.join(added)}")
+
+    created = create_missing_indexes()
+    if created:
+        print(f"Created {len(created)} indexes: {', '.join(created)}")
+
+    filled = backfill_state_previews()
+    if filled:
+        print(f"Filled in preview counts for {filled} saved states")
+
+    summarized = backfill_user_game_summaries()
+    if summarized:
+        print(f"Created player summaries for {summarized} finished games")
+
+    released = release_ended_join_codes()
+    if released:
+        print(f"Released the join codes of {released} ended games")
+
+    migrated = migrate_legacy_player_json()
+    if migrated:
+        print(f"Migrated status effects and abilities for {migrated} players")
+
+    migrated = migrate_legacy_nominations()
+    if migrated:
+        print(f"Migrated the current nominations of {migrated} games")
+
+
+def seed_default_data():
+    """Add the default roles and the Trouble Brewing script if they are missing"""
+    from src.models.role import Role
+    from src.models.script import Script, ScriptRole
+
+    # Check if roles already exist
+    if Role.query.count() == 0:
+        from src.models.role import DEFAULT_ROLES
+        print("Initializing default roles...")
+        
+        for role_data in DEFAULT_ROLES:
+            role = Role(
+                character_id=role_data['character_id'],
+                name=role_data['name'],
+                edition=role_data['edition'],
+                team=role_data['team'],
+                ability=role_data['ability'],
+                first_night=role_data['first_night'],
+                first_night_reminder=role_data['first_night_reminder'],
+                other_night=role_data['other_night'],
+                other_night_reminder=role_data['other_night_reminder'],
+                setup=role_data['setup']
+            )
+            role.set_reminders(role_data.get('reminders', []))
+            role.set_reminders_global(role_data.get('reminders_global', []))
+            role.set_image(role_data.get('image', []))
+            role.set_special(role_data.get('special', []))
+            role.set_jinxes(role_data.get('jinxes', []))
+            db.session.add(role)
+        
+        db.session.commit()
+        print(f"Added {len(DEFAULT_ROLES)} default roles")
+    
+    # Check if Trouble Brewing script exists
+    if Script.query.filter_by(name='Trouble Brewing').first() is None:
+        from src.models.script import TROUBLE_BREWING_SCRIPT
+        print("Initializing Trouble Brewing script...")
+        
+        script = Script(
+            name=TROUBLE_BREWING_SCRIPT['name'],
+            author=TROUBLE_BREWING_SCRIPT['author'],
+            description=TROUBLE_BREWING_SCRIPT['description'],
+            is_official=TROUBLE_BREWING_SCRIPT['is_official'],
+            player_count_min=TROUBLE_BREWING_SCRIPT['player_count_min'],
+            player_count_max=TROUBLE_BREWING_SCRIPT['player_count_max'],
+            version=TROUBLE_BREWING_SCRIPT['version']
+        )
+        db.session.add(script)
+        db.session.commit()
+        
+        # Add roles to script
+        for role_name in TROUBLE_BREWING_SCRIPT['roles']:
+            role = Role.query.filter_by(name=role_name).first()
+            if role:
+                script_role = ScriptRole(script_id=script.id, role_id=role.id)
+                db.session.add(script_role)
+        
+        db.session.commit()
+        print("Added Trouble Brewing script with roles")
@@ -2,6 +2,21 @@ from src.models.user import db
 from datetime import datetime
 import json
 
+# Standard Blood on the Clocktower distribution
+PLAYER_COUNT_DISTRIBUTIONS = {
+    5: {'townsfolk': 3, 'outsider': 0, 'minion': 1, 'demon': 1},
+    6: {'townsfolk': 3, 'outsider': 1, 'minion': 1, 'demon': 1},
+    7: {'townsfolk': 5, 'outsider': 0, 'minion': 1, 'demon': 1},
+    8: {'townsfolk': 5, 'outsider': 1, 'minion': 1, 'demon': 1},
+    9: {'townsfolk': 5, 'outsider': 2, 'minion': 1, 'demon': 1},
+    10: {'townsfolk': 7, 'outsider': 0, 'minion': 2, 'demon': 1},
+    11: {'townsfolk': 7, 'outsider': 1, 'minion': 2, 'demon': 1},
+    12: {'townsfolk': 7, 'outsider': 2, 'minion': 2, 'demon': 1},
+    13: {'townsfolk': 9, 'outsider': 0, 'minion': 3, 'demon': 1},
+    14: {'townsfolk': 9, 'outsider': 1, 'minion': 3, 'demon': 1},
+    15: {'townsfolk': 9, 'outsider': 2, 'minion': 3, 'demon': 1}
+}
+
 class Script(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -41,41 +56,19 @@ class Script(db.Model):
         """Get demon roles"""
         return self.get_roles_by_type('demon')
 
+    def role_index(self):
+        """Get the cached team index and feasibility table of this script"""
+        from src.services.script_index import script_indexes
+        return script_indexes.get(self)
+
     def calculate_distribution(self, player_count):
         """Calculate role distribution for given player count"""
-        if player_count < 5 or player_count > 15:
-            return None
-        
-        # Standard Blood on the Clocktower distribution
-        distributions = {
-            5: {'townsfolk': 3, 'outsider': 0, 'minion': 1, 'demon': 1},
-            6: {'townsfolk': 3, 'outsider': 1, 'minion': 1, 'demon': 1},
-            7: {'townsfolk': 5, 'outsider': 0, 'minion': 1, 'demon': 1},
-            8: {'townsfolk': 5, 'outsider': 1, 'minion': 1, 'demon': 1},
-            9: {'townsfolk': 5, 'outsider': 2, 'minion': 1, 'demon': 1},
-            10: {'townsfolk': 7, 'outsider': 0, 'minion': 2, 'demon': 1},
-            11: {'townsfolk': 7, 'outsider': 1, 'minion': 2, 'demon': 1},
-            12: {'townsfolk': 7, 'outsider': 2, 'minion': 2, 'demon': 1},
-            13: {'townsfolk': 9, 'outsider': 0, 'minion': 3, 'demon': 1},
-            14: {'townsfolk': 9, 'outsider': 1, 'minion': 3, 'demon': 1},
-            15: {'townsfolk': 9, 'outsider': 2, 'minion': 3, 'demon': 1}
-        }
-        
-        return distributions.get(player_count)
+        distribution = PLAYER_COUNT_DISTRIBUTIONS.get(player_count)
+        return dict(distribution) if distribution else None
 
     def can_support_player_count(self, player_count):
         """Check if script can support the given player count"""
-        distribution = self.calculate_distribution(player_count)
-        if not distribution:
-            return False
-        
-        # Check if we have enough roles of each type
-        for role_type, needed in distribution.items():
-            available = len(self.get_roles_by_type(role_type))
-            if available < needed:
-                return False
-        
-        return True
+        return self.role_index().can_support(player_count)
 
     def __repr__(self):
         return f'<Script {self.name}>'
@@ -96,12 +89,12 @@ class Script(db.Model):
         }
         
         if include_roles:
-            data['roles'] = [sr.role.to_dict() for sr in self.script_roles]
+            from src.services.role_catalog import role_catalog
+            roles = [role_catalog.get(sr.role_id) or sr.role.to_dict() for sr in self.script_roles]
+            data['roles'] = roles
             data['roles_by_type'] = {
-                'townsfolk': [r.to_dict() for r in self.get_townsfolk()],
-                'outsider': [r.to_dict() for r in self.get_outsiders()],
-                'minion': [r.to_dict() for r in self.get_minions()],
-                'demon': [r.to_dict() for r in self.get_demons()]
+                team: [role for role in roles if role['team'] == team]
+                for team in ('townsfolk', 'outsider', 'minion', 'demon')
             }
         
         return data
@@ -111,7 +104,7 @@ class ScriptRole(db.Model):
     """Many-to-many relationship between Scripts and Roles"""
     id = db.Column(db.Integer, primary_key=True)
     script_id = db.Column(db.Integer, db.ForeignKey('script.id'), nullable=False)
-    role_id = db.Column(db.Integer, db.ForeignKey('role.id'), nullable=False)
+    role_id = db.Column(db.Integer, db.ForeignKey('role.id'), nullable=False, index=True)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Unique constraint to prevent duplicate role assignments
@@ -0,0 +1,90 @@
+"""Circular seating of a game's players.
+
+A ``SeatingRing`` keeps the seats in position order with each seat's
+index, and threads the living seats into a doubly linked ring, so the
+neighbours and living neighbours of a seat and the first free position
+are answered without sorting or scanning the table.
+
+``Game.seating`` builds the ring from ``game.players`` on first use and
+keeps it for as long as the loaded players stay valid. Setting a player's
+``is_alive`` (``kill``, ``resurrect``, host actions, loading a save)
+relinks that seat in place; other changes to the roster or to positions
+mark the ring stale so it is rebuilt on the next use.
+"""
+
+
+def first_free_seat(positions):
+    """Get the lowest seat position not in ``positions``"""
+    taken = set(positions)
+    position = 0
+    while position in taken:
+        position += 1
+    return position
+
+
+class SeatingRing:
+    """Seats in position order with the living seats linked in a ring"""
+
+    def __init__(self, players):
+        self.seats = sorted(players, key=lambda p: p.position)
+        self.index = {player.id: i for i, player in enumerate(self.seats)}
+        self.first_free = first_free_seat(player.position for player in self.seats)
+        self.stale = False
+
+        self._alive = [bool(player.is_alive) for player in self.seats]
+        self._next = [None] * len(self.seats)
+        self._prev = [None] * len(self.seats)
+        alive = [i for i, is_alive in enumerate(self._alive) if is_alive]
+        for k, i in enumerate(alive):
+            self._next[i] = alive[(k + 1) % len(alive)]
+            self._prev[i] = alive[k - 1]
+        self.alive_count = len(alive)
+
+    def __len__(self):
+        return len(self.seats)
+
+    def neighbors(self, player_id):
+        """Get the (left, right) players either side of a seat"""
+        i = self.index.get(player_id)
+        if i is None or len(self.seats) <= 1:
+            return None, None
+        return self.seats[i - 1], self.seats[(i + 1) % len(self.seats)]
+
+    def alive_neighbors(self, player_id):
+        """Get the nearest living (left, right) players of a living seat"""
+        i = self.index.get(player_id)
+        if i is None or not self._alive[i]:
+            return None, None
+        return self.seats[self._prev[i]], self.seats[self._next[i]]
+
+    def set_alive(self, player_id, alive):
+        """Link a seat into or out of the living ring.
+
+        Unlinking is constant time; relinking walks to the next living
+        seat, which is never further than the run of dead seats after it.
+        """
+        i = self.index.get(player_id)
+        if i is None or self._alive[i] == bool(alive):
+            return
+
+        if not alive:
+            self._alive[i] = False
+            self.alive_count -= 1
+            prev, next_ = self._prev[i], self._next[i]
+            if prev != i:
+                self._next[prev] = next_
+                self._prev[next_] = prev
+            self._prev[i] = self._next[i] = None
+            return
+
+        self._alive[i] = True
+        self.alive_count += 1
+        if self.alive_count == 1:
+            self._prev[i] = self._next[i] = i
+            return
+        next_ = (i + 1) % len(self.seats)
+        while not self._alive[next_] or next_ == i:
+            next_ = (next_ + 1) % len(self.seats)
+        prev = self._prev[next_]
+        self._prev[i], self._next[i] = prev, next_
+        self._next[prev] = self._prev[next_] = i
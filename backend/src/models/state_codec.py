@@ -0,0 +1,88 @@
+"""Compact binary encoding for saved game states and histories.
+
+A blob is ``MAGIC``, a two byte header length, a small JSON header and
+the zlib-compressed JSON body. The header holds what lists and previews
+need (player counts and the like) so they can be shown without
+decompressing the body.
+
+Full role dictionaries in the body are replaced by ``{"$role": id}``
+references to one copy of each role stored alongside the body, so a save
+carries every role it uses once rather than once per player. Roles are
+stored as they were when the blob was written: editing or deleting a role
+later does not change old saves. A reference with no stored copy is
+filled in from the role catalog.
+"""
+import json
+import struct
+import zlib
+
+MAGIC = b'BSC1'
+HEADER_LENGTH = struct.Struct('>H')
+COMPRESSION_LEVEL = 6
+
+# Keys every serialized role has; dictionaries with all of them are roles
+ROLE_KEYS = frozenset(('id', 'character_id', 'name', 'team', 'ability'))
+
+
+def compact_roles(value, roles):
+    """Replace embedded role dictionaries with references, collecting them in ``roles``"""
+    if isinstance(value, dict):
+        if ROLE_KEYS <= value.keys():
+            roles.setdefault(str(value['id']), value)
+            return {'$role': value['id']}
+        return {key: compact_roles(item, roles) for key, item in value.items()}
+    if isinstance(value, list):
+        return [compact_roles(item, roles) for item in value]
+    return value
+
+
+def expand_roles(value, roles):
+    """Turn role references back into the role dictionaries stored in ``roles``"""
+    if isinstance(value, dict):
+        if len(value) == 1 and '$role' in value:
+            role = roles.get(str(value['$role']))
+            if role is None:
+                from src.services.role_catalog import role_catalog
+
+                role = role_catalog.get(value['$role'])
+            return dict(role) if role else {'id': value['$role']}
+        return {key: expand_roles(item, roles) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand_roles(item, roles) for item in value]
+    return value
+
+
+def encode_blob(data, header=None):
+    """Encode a dictionary, with an optional preview header"""
+    head = json.dumps(header or {}, separators=(',', ':')).encode('utf-8')
+    roles = {}
+    body = {'data': compact_roles(data, roles), 'roles': roles}
+    body = json.dumps(body, default=str, separators=(',', ':')).encode('utf-8')
+    return MAGIC + HEADER_LENGTH.pack(len(head)) + head + zlib.compress(body, COMPRESSION_LEVEL)
+
+
+def is_blob(blob):
+    """Check whether a value was written by encode_blob"""
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:len(MAGIC)]) == MAGIC
+
+
+def read_header(blob):
+    """Get the header of a blob without decompressing its body"""
+    if not is_blob(blob):
+        return {}
+    start = len(MAGIC) + HEADER_LENGTH.size
+    (length,) = HEADER_LENGTH.unpack_from(blob, len(MAGIC))
+    return json.loads(bytes(blob[start:start + length]))
+
+
+def decode_blob(blob):
+    """Decode a blob written by encode_blob, or {} if it is unreadable"""
+    if not is_blob(blob):
+        return {}
+    try:
+        start = len(MAGIC) + HEADER_LENGTH.size
+        (length,) = HEADER_LENGTH.unpack_from(blob, len(MAGIC))
+        body = json.loads(zlib.decompress(bytes(blob[start + length:])))
+        return expand_roles(body['data'], body['roles'])
+    except (KeyError, TypeError, ValueError, zlib.error):
+        return {}
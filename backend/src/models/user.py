@@ -1,5 +1,4 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import json
 
@@ -20,12 +19,14 @@ class User(db.Model):
     players = db.relationship('Player', backref='user', lazy=True)
 
     def set_password(self, password):
-        """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        """Set password hash on the password hasher's pool"""
+        from src.services.password_hasher import password_hasher
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        """Check password against hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check password against hash on the password hasher's pool"""
+        from src.services.password_hasher import password_hasher
+        return password_hasher.verify(self.password_hash, password)
 
     def get_preferences(self):
         """Get user preferences as dict"""
@@ -4,13 +4,16 @@ from datetime import datetime
 class Vote(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
-    voter_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
-    target_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)  # None for abstain
+    voter_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
+    target_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True, index=True)  # None for abstain
     vote_type = db.Column(db.String(20), default='execution')  # execution, nomination, etc.
     day_number = db.Column(db.Integer, nullable=False)
     is_valid = db.Column(db.Boolean, default=True)  # Can be invalidated by host
     cast_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # A day's votes (vote tally)
+    __table_args__ = (db.Index('ix_vote_game_day', 'game_id', 'day_number'),)
+    
     def __repr__(self):
         target_name = self.target.user.username if self.target else 'abstain'
         return f'<Vote {self.voter.user.username} -> {target_name}>'
@@ -31,10 +34,41 @@ class Vote(db.Model):
         }
 
 
+class Nomination(db.Model):
+    """A nomination for execution. Each player may nominate once per day"""
+    id = db.Column(db.Integer, primary_key=True)
+    game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
+    day_number = db.Column(db.Integer, nullable=False)
+    nominator_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    nominee_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    nominated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    nominator = db.relationship('Player', foreign_keys=[nominator_id])
+    nominee = db.relationship('Player', foreign_keys=[nominee_id])
+    
+    __table_args__ = (
+        db.UniqueConstraint('game_id', 'day_number', 'nominator_id', name='unique_daily_nomination'),
+        db.Index('ix_nomination_game_day_nominee', 'game_id', 'day_number', 'nominee_id'),
+    )
+
+    def __repr__(self):
+        return f'<Nomination {self.nominator_id} -> {self.nominee_id} (day {self.day_number})>'
+
+    def to_dict(self):
+        """Convert nomination to dictionary"""
+        return {
+            'id': self.id,
+            'nominator_id': self.nominator_id,
+            'nominee_id': self.nominee_id,
+            'day_number': self.day_number,
+            'timestamp': self.nominated_at.isoformat() if self.nominated_at else None
+        }
+
+
 class PlayerAction(db.Model):
     """Track player actions during night phases"""
     id = db.Column(db.Integer, primary_key=True)
-    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False)
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=False, index=True)
     game_id = db.Column(db.Integer, db.ForeignKey('game.id'), nullable=False)
     action_type = db.Column(db.String(50), nullable=False)  # ability name or action type
     target_id = db.Column(db.Integer, db.ForeignKey('player.id'), nullable=True)  # Target player if any
@@ -44,6 +78,8 @@ class PlayerAction(db.Model):
     performed_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_valid = db.Column(db.Boolean, default=True)
     
+    __table_args__ = (db.Index('ix_player_action_game_night', 'game_id', 'night_number'),)
+    
     def get_action_data(self):
         """Get action data as dict"""
         try:
@@ -89,6 +125,12 @@ class GameLog(db.Model):
     phase = db.Column(db.Integer, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Game history ordered by time, and paged by id
+    __table_args__ = (
+        db.Index('ix_game_log_game_timestamp', 'game_id', 'timestamp'),
+        db.Index('ix_game_log_game_id', 'game_id', 'id'),
+    )
+    
     def get_event_data(self):
         """Get event data as dict"""
         try:
@@ -105,6 +147,28 @@ class GameLog(db.Model):
     def __repr__(self):
         return f'<GameLog {self.game_id} {self.event_type}>'
 
+    @staticmethod
+    def page(game_id, after_id=None, limit=100):
+        """Get up to ``limit`` log entries for a game with ids after ``after_id``"""
+        query = GameLog.query.filter(GameLog.game_id == game_id)
+        if after_id is not None:
+            query = query.filter(GameLog.id > after_id)
+        return query.order_by(GameLog.id).limit(limit).all()
+
+    def to_json(self):
+        """Serialize log entry to a JSON string without re-parsing event data"""
+        import json
+        entry = json.dumps({
+            'id': self.id,
+            'game_id': self.game_id,
+            'event_type': self.event_type,
+            'day_number': self.day_number,
+            'phase': self.phase,
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+        })
+        # event_data is always written with json.dumps, so it can be spliced in as is
+        return f'{entry[:-1]}, "event_data": {self.event_data or "{}"}}}'
+
     def to_dict(self):
         """Convert log entry to dictionary"""
         return {
@@ -130,3 +194,57 @@ class GameLog(db.Model):
         db.session.add(log_entry)
         return log_entry
 
+
+
+def migrate_legacy_nominations():
+    """Move nominations out of the old ``game.current_nominations`` JSON column.
+
+    The column held the nominations of each game's current day. They are
+    copied into Nomination rows for that day, so a game upgraded mid-day
+    still knows who has nominated, and the column is reset to '[]'. A
+    second nomination by the same player, which the old column did not
+    prevent, is dropped in favour of the first.
+    """
+    import json
+
+    columns = {c['name'] for c in db.inspect(db.engine).get_columns('game')}
+    if 'current_nominations' not in columns:
+        return 0
+
+    rows = db.session.execute(db.text(
+        "SELECT id, day_number, current_nominations FROM game "
+        "WHERE current_nominations NOT IN ('', '[]')"
+    )).all()
+
+    migrated = []
+    for game_id, day_number, current_nominations in rows:
+        try:
+            nominations = json.loads(current_nominations)
+        except ValueError:
+            # Leave an unreadable column in place rather than lose it
+            print(f"Could not migrate the nominations of game {game_id}")
+            continue
+
+        nominators = {row.nominator_id for row in Nomination.query.filter_by(game_id=game_id, day_number=day_number)}
+        for nomination in nominations:
+            if nomination['nominator_id'] in nominators:
+                continue
+            nominators.add(nomination['nominator_id'])
+            timestamp = nomination.get('timestamp')
+            db.session.add(Nomination(
+                game_id=game_id,
+                day_number=day_number,
+                nominator_id=nomination['nominator_id'],
+                nominee_id=nomination['nominee_id'],
+                nominated_at=datetime.fromisoformat(timestamp) if timestamp else datetime.utcnow()
+            ))
+        migrated.append(game_id)
+
+    if migrated:
+        db.session.execute(
+            db.text("UPDATE game SET current_nominations = '[]' WHERE id IN :ids")
+            .bindparams(db.bindparam('ids', expanding=True)),
+            {'ids': migrated}
+        )
+        db.session.commit()
+    return len(migrated)
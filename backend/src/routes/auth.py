@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User
+from src.services.password_hasher import password_hasher, PasswordHasherBusy
+from src.services.user_cache import user_cache
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -64,6 +66,8 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Registration failed: {str(e)}'}), 500
@@ -96,6 +100,11 @@ def login():
         if not user.is_active:
             return jsonify({'error': 'Account is deactivated'}), 401
         
+        # Upgrade hashes made with older parameters while we have the password
+        if password_hasher.needs_rehash(user.password_hash):
+            user.set_password(password)
+            db.session.commit()
+        
         # Log in the user
         session['user_id'] = user.id
         session['username'] = user.username
@@ -105,7 +114,10 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': f'Login failed: {str(e)}'}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
@@ -216,12 +228,18 @@ def change_password():
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
+    except PasswordHasherBusy:
+        return jsonify({'error': 'Server busy, please try again'}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Password change failed: {str(e)}'}), 500
 
 def require_auth(f):
-    """Decorator to require authentication"""
+    """Decorator to require authentication.
+
+    ``request.current_user`` is the cached identity (id, username and
+    is_active), not a User row; load the User if a route needs more.
+    """
     from functools import wraps
     
     @wraps(f)
@@ -231,7 +249,7 @@ def require_auth(f):
         if not user_id:
             return jsonify({'error': 'Authentication required'}), 401
         
-        user = User.query.get(user_id)
+        user = user_cache.get(user_id)
         if not user or not user.is_active:
             session.clear()
             return jsonify({'error': 'User not found or inactive'}), 401
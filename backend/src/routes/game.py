@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app, Response, stream_with_context
 from src.models.user import db, User
 from src.models.game import Game
 from src.models.player import Player
@@ -6,6 +6,11 @@ from src.models.role import Role
 from src.models.script import Script
 from src.models.vote import Vote, PlayerAction, GameLog
 from src.routes.auth import require_auth
+from src.services.live_game import live_games
+from src.services.broadcast import broadcaster
+from src.services.night_order import night_orders
+from src.services.role_assignment import assign_roles, apply_assignments, get_strategy, recent_roles_by_player
+from src.services.vote_tally import show_vote_counts
 import random
 
 game_bp = Blueprint('game', __name__)
@@ -18,6 +23,7 @@ def create_game():
         data = request.get_json() or {}
         
         script_id = data.get('script_id')
+        script = None
         if script_id:
             script = Script.query.get(script_id)
             if not script:
@@ -35,7 +41,7 @@ def create_game():
             current_settings.update(data['settings'])
             game.set_settings(current_settings)
         
-        db.session.add(game)
+        game.add_with_join_code()
         db.session.commit()
         
         # Add host as first player
@@ -61,6 +67,8 @@ def create_game():
         )
         db.session.commit()
         
+        game = Game.load_with_roster(game.id)
+        
         return jsonify({
             'message': 'Game created successfully',
             'game': game.to_dict(include_sensitive=True)
@@ -74,7 +82,7 @@ def create_game():
 @require_auth
 def get_game(game_id):
     """Get game details"""
-    game = Game.query.get(game_id)
+    game = Game.load_with_roster(game_id)
     if not game:
         return jsonify({'error': 'Game not found'}), 404
     
@@ -86,9 +94,14 @@ def get_game(game_id):
     # Include sensitive information if user is host
     include_sensitive = (game.host_id == request.current_user.id)
     
-    return jsonify({
-        'game': game.to_dict(include_sensitive=include_sensitive)
-    }), 200
+    data = game.to_dict(include_sensitive=include_sensitive)
+    
+    # Votes and nominations may not have been flushed yet
+    live_game = live_games.peek(game_id)
+    if live_game:
+        live_game.overlay(data)
+    
+    return jsonify({'game': data}), 200
 
 @game_bp.route('/join', methods=['POST'])
 @require_auth
@@ -121,7 +134,8 @@ def join_game():
         # Add player to game
         player = Player(
             user_id=request.current_user.id,
-            game_id=game.id
+            game_id=game.id,
+            position=game.seating.first_free
         )
         db.session.add(player)
         db.session.commit()
@@ -139,10 +153,14 @@ def join_game():
         )
         db.session.commit()
         
+        game = Game.load_with_roster(game.id)
+        player_data = player.to_dict()
+        broadcaster.emit(game.id, 'player_joined', {'player': player_data})
+        
         return jsonify({
             'message': 'Joined game successfully',
             'game': game.to_dict(),
-            'player': player.to_dict()
+            'player': player_data
         }), 200
         
     except Exception as e:
@@ -166,6 +184,8 @@ def leave_game(game_id):
         if game.status != 'lobby' and game.host_id != request.current_user.id:
             return jsonify({'error': 'Cannot leave game after it has started'}), 400
         
+        live_games.release(game_id)
+        
         # If host is leaving, either transfer host or end game
         if game.host_id == request.current_user.id:
             other_players = [p for p in game.players if p.user_id != request.current_user.id]
@@ -189,6 +209,7 @@ def leave_game(game_id):
                 # End the game if no other players or game has started
                 game.status = 'ended'
                 game.winner = None
+                game.release_join_code()
                 
                 GameLog.log_event(
                     game.id,
@@ -214,8 +235,14 @@ def leave_game(game_id):
             }
         )
         
+        delta = {'player_id': player.id, 'host_id': game.host_id, 'status': game.status}
         db.session.commit()
         
+        broadcaster.emit(game_id, 'player_left', delta)
+        if delta['status'] == 'ended':
+            broadcaster.forget(game_id)
+            night_orders.forget(game_id)
+        
         return jsonify({'message': 'Left game successfully'}), 200
         
     except Exception as e:
@@ -254,6 +281,8 @@ def toggle_ready(game_id):
         )
         db.session.commit()
         
+        broadcaster.emit(game_id, 'player_ready', {'player_id': player.id, 'is_ready': player.is_ready})
+        
         return jsonify({
             'message': f'Ready status set to {player.is_ready}',
             'is_ready': player.is_ready
@@ -268,7 +297,7 @@ def toggle_ready(game_id):
 def start_game(game_id):
     """Start the game (host only)"""
     try:
-        game = Game.query.get(game_id)
+        game = Game.load_with_roster(game_id)
         if not game:
             return jsonify({'error': 'Game not found'}), 404
         
@@ -278,9 +307,20 @@ def start_game(game_id):
         if not game.can_start():
             return jsonify({'error': 'Game cannot be started. Check player count and ready status.'}), 400
         
-        # Assign roles
-        if not assign_roles(game):
-            return jsonify({'error': 'Failed to assign roles'}), 500
+        if game.script and not game.script.can_support_player_count(game.get_player_count()):
+            return jsonify({'error': 'The script does not have enough roles for this many players'}), 400
+        
+        # Assign roles; the seed is logged so the setup can be reproduced
+        data = request.get_json(silent=True) or {}
+        strategy_name = data.get('role_strategy', game.get_settings().get('role_strategy', 'random'))
+        seed = data.get('seed')
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        
+        assignments, error = assign_game_roles(game, seed, strategy_name)
+        if error:
+            return jsonify({'error': error}), 400
+        apply_assignments(assignments)
         
         # Start the game
         game.start_game()
@@ -294,12 +334,24 @@ def start_game(game_id):
                 'host_username': request.current_user.username,
                 'player_count': game.get_player_count(),
                 'script_id': game.script_id,
-                'script_name': game.script.name if game.script else None
+                'script_name': game.script.name if game.script else None,
+                'role_seed': seed,
+                'role_strategy': strategy_name
             }
         )
         
         db.session.commit()
         
+        game = Game.load_with_roster(game.id)
+        
+        # Roles stay private; players fetch their own seat
+        broadcaster.emit(game.id, 'phase_advanced', {
+            'status': game.status,
+            'phase': game.phase,
+            'day_number': game.day_number
+        })
+        night_orders.notify(game)
+        
         return jsonify({
             'message': 'Game started successfully',
             'game': game.to_dict(include_sensitive=True)
@@ -309,48 +361,47 @@ def start_game(game_id):
         db.session.rollback()
         return jsonify({'error': f'Failed to start game: {str(e)}'}), 500
 
-def assign_roles(game):
-    """Assign roles to players"""
-    try:
-        if not game.script:
-            return False
-        
-        player_count = game.get_player_count()
-        distribution = game.script.calculate_distribution(player_count)
-        
-        if not distribution:
-            return False
-        
-        # Get available roles by type
-        available_roles = {
-            'townsfolk': game.script.get_townsfolk(),
-            'outsider': game.script.get_outsiders(),
-            'minion': game.script.get_minions(),
-            'demon': game.script.get_demons()
-        }
-        
-        # Select random roles for each type
-        selected_roles = []
-        for role_type, count in distribution.items():
-            roles = available_roles[role_type]
-            if len(roles) < count:
-                return False
-            selected_roles.extend(random.sample(roles, count))
-        
-        # Shuffle roles and assign to players
-        random.shuffle(selected_roles)
-        players = list(game.players)
-        random.shuffle(players)
-        
-        for i, player in enumerate(players):
-            if i < len(selected_roles):
-                player.role_id = selected_roles[i].id
-        
-        return True
-        
-    except Exception as e:
-        print(f"Error assigning roles: {e}")
-        return False
+@game_bp.route('/<int:game_id>/night-order', methods=['GET'])
+@require_auth
+def get_night_order(game_id):
+    """Get the night sheet for the characters alive players hold (host only)"""
+    game = Game.query.get(game_id)
+    if not game:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    if game.host_id != request.current_user.id:
+        return jsonify({'error': 'Only the host can see the night order'}), 403
+    
+    sheet, etag = night_orders.for_game(game)
+    if sheet is None:
+        return jsonify({'error': 'The game has no script'}), 400
+    
+    response = jsonify(sheet)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def assign_game_roles(game, seed, strategy_name='random'):
+    """Deal roles to a game's players. Returns (assignments, error)"""
+    if not game.script:
+        return None, 'The game has no script'
+    
+    distribution = game.script.calculate_distribution(game.get_player_count())
+    if not distribution:
+        return None, 'Invalid player count for this script'
+    
+    options = {}
+    if strategy_name == 'weighted':
+        options['weights'] = game.get_settings().get('role_weights', {})
+    elif strategy_name == 'avoid_repeats':
+        options['recent_roles'] = recent_roles_by_player(game.players)
+    
+    strategy = get_strategy(strategy_name, **options)
+    if strategy is None:
+        return None, f'Unknown role strategy: {strategy_name}'
+    
+    seats = [player.id for player in game.seating.seats]
+    return assign_roles(game.script.role_index(), distribution, seats, seed=seed, strategy=strategy)
 
 @game_bp.route('/<int:game_id>/vote', methods=['POST'])
 @require_auth
@@ -361,69 +412,65 @@ def submit_vote(game_id):
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        game = Game.query.get(game_id)
-        if not game:
-            return jsonify({'error': 'Game not found'}), 404
+        live_game = live_games.get(game_id)
+        if not live_game:
+            if not Game.query.get(game_id):
+                return jsonify({'error': 'Game not found'}), 404
+            return jsonify({'error': 'Voting is only allowed during day phase'}), 400
         
-        if game.status != 'day':
+        if live_game.status != 'day':
             return jsonify({'error': 'Voting is only allowed during day phase'}), 400
         
-        player = Player.query.filter_by(game_id=game_id, user_id=request.current_user.id).first()
+        player = live_game.player_for_user(request.current_user.id)
         if not player:
             return jsonify({'error': 'You are not in this game'}), 404
         
-        if not player.can_vote():
-            return jsonify({'error': 'You have no votes remaining'}), 400
-        
         target_id = data.get('target_id')  # None for abstain
         vote_type = data.get('vote_type', 'execution')
         
         # Validate target if provided
-        if target_id:
-            target = Player.query.filter_by(game_id=game_id, id=target_id).first()
-            if not target:
-                return jsonify({'error': 'Invalid target player'}), 400
-        
-        # Create vote
-        vote = Vote(
-            game_id=game_id,
-            voter_id=player.id,
-            target_id=target_id,
-            vote_type=vote_type,
-            day_number=game.day_number
-        )
+        if target_id and not live_game.get_player(target_id):
+            return jsonify({'error': 'Invalid target player'}), 400
         
-        # Deduct vote from player
-        player.cast_vote(target_id)
+        # Apply the vote in memory; it is persisted by the next write-behind flush
+        vote, error = live_games.cast_vote(game_id, player.id, target_id, vote_type)
+        if error:
+            return jsonify({'error': error}), 400
         
-        db.session.add(vote)
-        
-        # Log vote
-        GameLog.log_event(
-            game.id,
-            'vote_cast',
-            {
-                'voter_id': player.id,
-                'voter_username': player.user.username,
-                'target_id': target_id,
-                'target_username': target.user.username if target_id else None,
-                'vote_type': vote_type,
-                'day_number': game.day_number
-            },
-            day_number=game.day_number
-        )
-        
-        db.session.commit()
+        # vote_cast and vote_tally are broadcast once the flush commits the vote
+        tally = live_game.get_tally(include_counts=show_vote_counts(live_game.settings))
         
         return jsonify({
             'message': 'Vote submitted successfully',
-            'vote': vote.to_dict()
+            'vote': vote,
+            'tally': tally
         }), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': f'Failed to submit vote: {str(e)}'}), 500
 
+@game_bp.route('/<int:game_id>/tally', methods=['GET'])
+@require_auth
+def get_vote_tally(game_id):
+    """Get the running vote tally for the current day"""
+    live_game = live_games.get(game_id)
+    if not live_game:
+        if not Game.query.get(game_id):
+            return jsonify({'error': 'Game not found'}), 404
+        return jsonify({'error': 'Game is not in progress'}), 400
+    
+    player = live_game.player_for_user(request.current_user.id)
+    if not player:
+        return jsonify({'error': 'You are not in this game'}), 403
+    
+    # The host always sees the counts
+    include_counts = live_game.host_id == request.current_user.id or show_vote_counts(live_game.settings)
+    
+    return jsonify({
+        'tally': live_game.get_tally(include_counts=include_counts)
+    }), 200
+
 @game_bp.route('/<int:game_id>/nominate', methods=['POST'])
 @require_auth
 def nominate_player(game_id):
@@ -433,58 +480,32 @@ def nominate_player(game_id):
         if not data or 'target_id' not in data:
             return jsonify({'error': 'Target player ID is required'}), 400
         
-        game = Game.query.get(game_id)
-        if not game:
-            return jsonify({'error': 'Game not found'}), 404
+        live_game = live_games.get(game_id)
+        if not live_game:
+            if not Game.query.get(game_id):
+                return jsonify({'error': 'Game not found'}), 404
+            return jsonify({'error': 'Nominations are only allowed during day phase'}), 400
         
-        if game.status != 'day':
+        if live_game.status != 'day':
             return jsonify({'error': 'Nominations are only allowed during day phase'}), 400
         
-        player = Player.query.filter_by(game_id=game_id, user_id=request.current_user.id).first()
+        player = live_game.player_for_user(request.current_user.id)
         if not player:
             return jsonify({'error': 'You are not in this game'}), 404
         
-        if not player.is_alive:
-            return jsonify({'error': 'Dead players cannot nominate'}), 400
-        
-        target_id = data['target_id']
-        target = Player.query.filter_by(game_id=game_id, id=target_id).first()
+        target = live_game.get_player(data['target_id'])
         if not target:
             return jsonify({'error': 'Invalid target player'}), 404
         
-        if not target.is_alive:
-            return jsonify({'error': 'Cannot nominate dead players'}), 400
-        
-        if target.id == player.id:
-            return jsonify({'error': 'Cannot nominate yourself'}), 400
-        
-        # Check if player already nominated today
-        existing_nominations = game.get_nominations()
-        if any(nom['nominator_id'] == player.id for nom in existing_nominations):
-            return jsonify({'error': 'You have already nominated someone today'}), 400
-        
-        # Add nomination
-        game.add_nomination(player.id, target.id)
-        
-        # Log nomination
-        GameLog.log_event(
-            game.id,
-            'player_nominated',
-            {
-                'nominator_id': player.id,
-                'nominator_username': player.user.username,
-                'nominee_id': target.id,
-                'nominee_username': target.user.username,
-                'day_number': game.day_number
-            },
-            day_number=game.day_number
-        )
-        
-        db.session.commit()
+        # Apply the nomination in memory; it is persisted by the next write-behind flush
+        nominations, error = live_games.nominate(game_id, player.id, target.id)
+        if error:
+            return jsonify({'error': error}), 400
         
+        # The nomination is broadcast once the flush commits it
         return jsonify({
-            'message': f'{target.user.username} has been nominated for execution',
-            'nominations': game.get_nominations()
+            'message': f'{target.username} has been nominated for execution',
+            'nominations': nominations
         }), 200
         
     except Exception as e:
@@ -494,7 +515,7 @@ def nominate_player(game_id):
 @game_bp.route('/<int:game_id>/history', methods=['GET'])
 @require_auth
 def get_game_history(game_id):
-    """Get game history/logs"""
+    """Get game history/logs, a page at a time or streamed as NDJSON"""
     game = Game.query.get(game_id)
     if not game:
         return jsonify({'error': 'Game not found'}), 404
@@ -504,10 +525,36 @@ def get_game_history(game_id):
     if not player:
         return jsonify({'error': 'You are not in this game'}), 403
     
-    # Get game logs
-    logs = GameLog.query.filter_by(game_id=game_id).order_by(GameLog.timestamp).all()
+    # Cursor is the id of the last log entry the client has seen
+    after_id = request.args.get('after', type=int)
+    stream = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+    
+    if stream:
+        batch_size = current_app.config.get('HISTORY_STREAM_BATCH', 500)
+        
+        def generate():
+            cursor = after_id
+            while True:
+                logs = GameLog.page(game_id, cursor, batch_size)
+                for log in logs:
+                    yield log.to_json() + '\n'
+                if len(logs) < batch_size:
+                    break
+                cursor = logs[-1].id
+                # Drop the yielded rows so memory stays bounded by one batch
+                db.session.expunge_all()
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    logs = GameLog.page(game_id, after_id, limit + 1)
+    has_more = len(logs) > limit
+    logs = logs[:limit]
     
     return jsonify({
-        'history': [log.to_dict() for log in logs]
+        'history': [log.to_dict() for log in logs],
+        'next_cursor': logs[-1].id if logs else after_id,
+        'has_more': has_more
     }), 200
 
@@ -2,7 +2,11 @@ from flask import Blueprint, request, jsonify, session
 from src.models.user import db
 from src.models.game import Game
 from src.models.player import Player
-from src.models.game_state import GameState, GameAction, GameHistory, GameStateManager
+from src.models.game_state import GameState, GameAction, GameHistory, GameStateManager, UserGameSummary
+from src.services.live_game import live_games
+from src.services.broadcast import broadcaster
+from src.services.action_log import action_log
+from src.services.night_order import night_orders
 from datetime import datetime
 
 game_state_bp = Blueprint('game_state', __name__)
@@ -28,6 +32,9 @@ def save_game_state(game_id):
         return jsonify({'error': 'Only the host can save game states'}), 403
     
     try:
+        # Persist queued votes and nominations so the snapshot is current
+        live_games.flush()
+        
         state_name = data['state_name']
         game_state = GameStateManager.save_game_state(game, state_name, user_id)
         
@@ -56,12 +63,18 @@ def get_game_states(game_id):
     if not player and game.host_id != user_id:
         return jsonify({'error': 'Access denied'}), 403
     
-    # Get saved states
-    states = GameState.query.filter_by(game_id=game_id).order_by(GameState.created_at.desc()).all()
+    # Newest first; the cursor is the id of the oldest save the client has
+    before_id = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    states = GameState.list_page(game_id, before_id, limit + 1)
+    has_more = len(states) > limit
+    states = states[:limit]
     
     return jsonify({
         'success': True,
-        'states': [state.to_dict() for state in states]
+        'states': [state.to_dict() for state in states],
+        'next_cursor': states[-1].id if states else before_id,
+        'has_more': has_more
     })
 
 @game_state_bp.route('/games/<int:game_id>/load/<int:state_id>', methods=['POST'])
@@ -81,11 +94,14 @@ def load_game_state(game_id, state_id):
         return jsonify({'error': 'Only the host can load game states'}), 403
     
     # Get game state
-    game_state = GameState.query.filter_by(id=state_id, game_id=game_id).first()
+    game_state = GameState.query.filter_by(id=state_id, game_id=game_id, action_sequence=None).first()
     if not game_state:
         return jsonify({'error': 'Game state not found'}), 404
     
     try:
+        # The loaded state replaces whatever the live engine holds
+        live_games.release(game_id)
+        
         state_data = game_state.get_state_data()
         
         # Create auto-save before loading
@@ -109,9 +125,13 @@ def load_game_state(game_id, state_id):
             ).first()
             
             if player:
-                player.role_id = player_data.get('role_id')
+                # Manual saves hold the full role, auto-saves just its id
+                role = player_data.get('role') or {}
+                player.role_id = player_data.get('role_id', role.get('id'))
                 player.is_alive = player_data.get('is_alive', True)
                 player.votes_remaining = player_data.get('votes_remaining', 1)
+                if 'died_at' in player_data:
+                    player.set_died_at(player_data['died_at'])
                 player.position = player_data.get('position', 0)
                 
                 if 'abilities_used' in player_data:
@@ -128,6 +148,12 @@ def load_game_state(game_id, state_id):
             {'state_id': state_id, 'state_name': game_state.state_name},
             user_id
         )
+        # Later undos replay from the loaded state, not from before it
+        action_log.checkpoint(game, user_id)
+        
+        # Too much changes at once to describe as a diff
+        broadcaster.emit(game_id, 'resync_required', {'state_id': state_id})
+        night_orders.notify(game)
         
         return jsonify({
             'success': True,
@@ -163,6 +189,47 @@ def get_game_actions(game_id):
         'actions': [action.to_dict() for action in actions]
     })
 
+@game_state_bp.route('/games/<int:game_id>/actions', methods=['POST'])
+def perform_action(game_id):
+    """Perform a host action such as killing a player or changing a role"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user_id = session['user_id']
+    data = request.get_json() or {}
+    
+    if not data.get('action_type'):
+        return jsonify({'error': 'Action type is required'}), 400
+    
+    # Get game and verify user is host
+    game = Game.query.get(game_id)
+    if not game:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    if game.host_id != user_id:
+        return jsonify({'error': 'Only the host can perform actions'}), 403
+    
+    try:
+        # The action changes players the live engine may hold
+        live_games.release(game_id)
+        
+        action_data = {key: value for key, value in data.items() if key != 'action_type'}
+        action, error = action_log.perform(game, data['action_type'], action_data, user_id)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        broadcaster.emit_changes(Game.load_with_roster(game_id), action.get_changes())
+        night_orders.notify(game)
+        
+        return jsonify({
+            'success': True,
+            'action': action.to_dict()
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @game_state_bp.route('/games/<int:game_id>/actions/<int:action_id>/undo', methods=['POST'])
 def undo_action(game_id, action_id):
     """Undo a game action"""
@@ -170,7 +237,7 @@ def undo_action(game_id, action_id):
         return jsonify({'error': 'Not authenticated'}), 401
     
     user_id = session['user_id']
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
     
     # Get game and verify user is host
     game = Game.query.get(game_id)
@@ -189,30 +256,83 @@ def undo_action(game_id, action_id):
         return jsonify({'error': 'Action already undone'}), 400
     
     try:
+        live_games.release(game_id)
+        
         undo_reason = data.get('reason', 'Undone by host')
-        success = GameStateManager.undo_action(action_id, undo_reason)
+        changes, error = action_log.undo(game, action, undo_reason)
+        if error:
+            return jsonify({'error': error}), 400
         
-        if success:
-            # Record the undo action
-            GameStateManager.record_action(
-                game,
-                'undo_action',
-                {
-                    'undone_action_id': action_id,
-                    'undone_action_type': action.action_type,
-                    'reason': undo_reason
-                },
-                user_id
-            )
-            
-            return jsonify({
-                'success': True,
-                'message': f'Action "{action.action_type}" undone successfully'
-            })
-        else:
-            return jsonify({'error': 'Failed to undo action'}), 500
+        # Record the undo action
+        GameStateManager.record_action(
+            game,
+            'undo_action',
+            {
+                'undone_action_id': action_id,
+                'undone_action_type': action.action_type,
+                'reason': undo_reason
+            },
+            user_id
+        )
+        
+        broadcaster.emit_changes(Game.load_with_roster(game_id), changes)
+        night_orders.notify(game)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Action "{action.action_type}" undone successfully'
+        })
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@game_state_bp.route('/games/<int:game_id>/actions/<int:action_id>/redo', methods=['POST'])
+def redo_action(game_id, action_id):
+    """Redo an undone game action"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    user_id = session['user_id']
+    
+    # Get game and verify user is host
+    game = Game.query.get(game_id)
+    if not game:
+        return jsonify({'error': 'Game not found'}), 404
+    
+    if game.host_id != user_id:
+        return jsonify({'error': 'Only the host can redo actions'}), 403
+    
+    action = GameAction.query.filter_by(id=action_id, game_id=game_id).first()
+    if not action:
+        return jsonify({'error': 'Action not found'}), 404
+    
+    if not action.is_undone:
+        return jsonify({'error': 'Action is not undone'}), 400
+    
+    try:
+        live_games.release(game_id)
+        
+        changes, error = action_log.redo(game, action)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        GameStateManager.record_action(
+            game,
+            'redo_action',
+            {'redone_action_id': action_id, 'redone_action_type': action.action_type},
+            user_id
+        )
+        broadcaster.emit_changes(Game.load_with_roster(game_id), changes)
+        night_orders.notify(game)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Action "{action.action_type}" redone successfully'
+        })
     
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @game_state_bp.route('/games/<int:game_id>/auto-save', methods=['POST'])
@@ -232,7 +352,9 @@ def create_auto_save(game_id):
         return jsonify({'error': 'Only the host can create saves'}), 403
     
     try:
-        game_state = GameStateManager.auto_save_game(game)
+        live_games.flush()
+        # The host asked for this save and lists it next, so write it now
+        game_state = GameStateManager.auto_save_game(game, wait=True)
         
         return jsonify({
             'success': True,
@@ -299,10 +421,13 @@ def finish_game(game_id):
         return jsonify({'error': 'Game already completed'}), 400
     
     try:
+        live_games.release(game_id)
+        
         # Update game status
         game.status = 'completed'
         game.ended_at = datetime.utcnow()
-        game.winner_team = data.get('winner_team')  # 'good' or 'evil'
+        game.winner = game.winner_team = data.get('winner_team')  # 'good' or 'evil'
+        game.release_join_code()
         
         db.session.commit()
         
@@ -320,6 +445,10 @@ def finish_game(game_id):
             user_id
         )
         
+        broadcaster.emit(game_id, 'game_ended', {'winner_team': game.winner_team})
+        broadcaster.forget(game_id)
+        night_orders.forget(game_id)
+        
         return jsonify({
             'success': True,
             'message': 'Game completed successfully',
@@ -342,28 +471,38 @@ def get_user_game_history(user_id):
     if session_user_id != user_id:
         return jsonify({'error': 'Access denied'}), 403
     
-    # Get games where user was a participant
-    player_games = db.session.query(Game.id).join(Player).filter(
-        Player.user_id == user_id,
-        Game.status == 'completed'
-    ).subquery()
-    
-    # Get games where user was host
-    host_games = db.session.query(Game.id).filter(
-        Game.host_id == user_id,
-        Game.status == 'completed'
-    ).subquery()
-    
-    # Get all game histories for these games
-    histories = GameHistory.query.filter(
-        db.or_(
-            GameHistory.game_id.in_(player_games),
-            GameHistory.game_id.in_(host_games)
-        )
-    ).order_by(GameHistory.created_at.desc()).all()
+    # Newest first; the cursor is the id of the oldest entry the client has
+    before_id = request.args.get('before', type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    summaries = UserGameSummary.page(user_id, before_id, limit + 1)
+    has_more = len(summaries) > limit
+    summaries = summaries[:limit]
+    
+    # 'histories' keeps the GameHistory shape older clients read, for the same page
+    history_ids = [summary.history_id for summary in summaries if summary.history_id is not None]
+    histories = {
+        history.id: history
+        for history in GameHistory.query.filter(GameHistory.id.in_(history_ids))
+    } if history_ids else {}
     
     return jsonify({
         'success': True,
-        'histories': [history.to_dict() for history in histories]
+        'games': [summary.to_dict() for summary in summaries],
+        'histories': [histories[history_id].to_dict() for history_id in history_ids if history_id in histories],
+        'next_cursor': summaries[-1].id if summaries else before_id,
+        'has_more': has_more
     })
 
+@game_state_bp.route('/users/<int:user_id>/game-stats', methods=['GET'])
+def get_user_game_stats(user_id):
+    """Get a user's win rates overall, per alignment, per team and per role"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+    
+    if session['user_id'] != user_id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify({
+        'success': True,
+        'stats': UserGameSummary.stats(user_id)
+    })
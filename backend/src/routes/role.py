@@ -1,48 +1,33 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from src.models.user import db
 from src.models.role import Role
 from src.models.script import Script, ScriptRole
 from src.routes.auth import require_auth
+from src.services.role_catalog import role_catalog
+from src.services.script_index import script_indexes
 
 role_bp = Blueprint('role', __name__)
 
+def cached_json(cached):
+    """Build a revalidatable response from a catalog ``(body, etag)`` pair"""
+    body, etag = cached
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
 @role_bp.route('/roles', methods=['GET'])
 def get_roles():
     """Get all available roles"""
     try:
         # Get query parameters
-        team = request.args.get('team')
+        team = request.args.get('team') or None
         is_official = request.args.get('official')
         
-        # Build query
-        query = Role.query
-        
-        if team:
-            query = query.filter(Role.team == team)
-        
         if is_official is not None:
-            is_official_bool = is_official.lower() in ['true', '1', 'yes']
-            query = query.filter(Role.is_official == is_official_bool)
-        
-        roles = query.order_by(Role.team, Role.name).all()
-        
-        # Group roles by team
-        roles_by_team = {
-            'townsfolk': [],
-            'outsider': [],
-            'minion': [],
-            'demon': []
-        }
-        
-        for role in roles:
-            if role.team in roles_by_team:
-                roles_by_team[role.team].append(role.to_dict())
+            is_official = is_official.lower() in ['true', '1', 'yes']
         
-        return jsonify({
-            'roles': [role.to_dict() for role in roles],
-            'roles_by_team': roles_by_team,
-            'total_count': len(roles)
-        }), 200
+        return cached_json(role_catalog.list_body(team, is_official))
         
     except Exception as e:
         return jsonify({'error': f'Failed to get roles: {str(e)}'}), 500
@@ -50,11 +35,11 @@ def get_roles():
 @role_bp.route('/roles/<int:role_id>', methods=['GET'])
 def get_role(role_id):
     """Get specific role details"""
-    role = Role.query.get(role_id)
-    if not role:
+    cached = role_catalog.role_body(role_id)
+    if not cached:
         return jsonify({'error': 'Role not found'}), 404
     
-    return jsonify({'role': role.to_dict()}), 200
+    return cached_json(cached)
 
 @role_bp.route('/scripts', methods=['GET'])
 def get_scripts():
@@ -228,6 +213,8 @@ def update_script(script_id):
                 db.session.add(script_role)
         
         db.session.commit()
+        # The bulk ScriptRole delete above bypasses the commit hook
+        script_indexes.invalidate(script.id)
         
         return jsonify({
             'message': 'Script updated successfully',
@@ -269,6 +256,15 @@ def delete_script(script_id):
         db.session.rollback()
         return jsonify({'error': f'Failed to delete script: {str(e)}'}), 500
 
+@role_bp.route('/scripts/<int:script_id>/night-order', methods=['GET'])
+def get_script_night_order(script_id):
+    """Get a script's first-night and other-night wake order"""
+    script = Script.query.get(script_id)
+    if not script:
+        return jsonify({'error': 'Script not found'}), 404
+    
+    return cached_json(script.role_index().night_order().body())
+
 @role_bp.route('/scripts/<int:script_id>/distribution/<int:player_count>', methods=['GET'])
 def get_role_distribution(script_id, player_count):
     """Get role distribution for a script and player count"""
@@ -283,17 +279,12 @@ def get_role_distribution(script_id, player_count):
     if not distribution:
         return jsonify({'error': 'Invalid player count for this script'}), 400
     
-    can_support = script.can_support_player_count(player_count)
+    index = script.role_index()
     
     return jsonify({
         'player_count': player_count,
         'distribution': distribution,
-        'can_support': can_support,
-        'available_roles': {
-            'townsfolk': len(script.get_townsfolk()),
-            'outsider': len(script.get_outsiders()),
-            'minion': len(script.get_minions()),
-            'demon': len(script.get_demons())
-        }
+        'can_support': index.can_support(player_count),
+        'available_roles': dict(index.counts)
     }), 200
 
@@ -0,0 +1,382 @@
+"""Event-sourced host actions with replay-based undo and redo.
+
+Host actions such as killing a player or changing a role are recorded as
+GameAction rows that carry the request that made them and the field
+changes it caused. Every ``ACTION_SNAPSHOT_INTERVAL`` actions a compact
+snapshot of the game is saved with the number of the last action it
+includes, so the state after any action can be rebuilt from the nearest
+snapshot plus the actions recorded since.
+
+Replay re-runs each action's builder on the rebuilt state rather than
+reapplying its recorded values, so undoing an action also removes its
+effect from later actions on the same field (a later status effect no
+longer carries an undone earlier one along). Actions that no longer
+apply on the rebuilt state, such as reviving a player whose death was
+undone, are skipped.
+
+Undoing or redoing an action flips its ``is_undone`` flag, replays from
+the nearest snapshot before it while skipping undone actions, and writes
+back the fields the replayed actions touch. Fields no logged action
+touches (votes cast through the live engine, say) are left alone.
+"""
+from datetime import datetime
+
+from src.models.user import db
+from src.services.auto_save import build_snapshot
+
+# Action builders by type: builder(state, data) -> (changes, error)
+ACTION_TYPES = {}
+
+# Player fields written through a setter rather than assigned directly
+PLAYER_SETTERS = {
+    'status_effects': 'set_status_effects',
+    'abilities_used': 'set_abilities_used',
+    'died_at': 'set_died_at',
+}
+
+
+def register_action_type(name, builder):
+    """Make an action type available by name"""
+    ACTION_TYPES[name] = builder
+
+
+def action_type(name):
+    """Decorator form of register_action_type"""
+    def decorator(builder):
+        register_action_type(name, builder)
+        return builder
+    return decorator
+
+
+def find_player(state, player_id):
+    """Get a player's dictionary from a snapshot, or None"""
+    return next((p for p in state['players'] if p['id'] == player_id), None)
+
+
+def player_change(player, field, value):
+    return {'target': 'player', 'id': player['id'], 'field': field, 'before': player.get(field), 'after': value}
+
+
+def game_change(state, field, value):
+    info = state['game_info']
+    return {'target': 'game', 'id': info['id'], 'field': field, 'before': info.get(field), 'after': value}
+
+
+def dead_votes(state):
+    """Votes a dead player holds under the game's house rules, as in Player.kill"""
+    house_rules = state['game_info'].get('settings', {}).get('house_rules', {})
+    return 1 if house_rules.get('allow_dead_vote', True) else 0
+
+
+@action_type('kill_player')
+def kill_player(state, data):
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    if not player['is_alive']:
+        return None, 'Player is already dead'
+    # Stored with the action so replays record the same time of death
+    data.setdefault('died_at', datetime.utcnow().isoformat())
+    return [
+        player_change(player, 'is_alive', False),
+        player_change(player, 'died_at', data['died_at']),
+        player_change(player, 'votes_remaining', dead_votes(state))
+    ], None
+
+
+@action_type('revive_player')
+def revive_player(state, data):
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    if player['is_alive']:
+        return None, 'Player is alive'
+    return [
+        player_change(player, 'is_alive', True),
+        player_change(player, 'died_at', None),
+        player_change(player, 'votes_remaining', 1)
+    ], None
+
+
+@action_type('set_role')
+def set_role(state, data):
+    from src.services.role_catalog import role_catalog
+
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    if role_catalog.get(data.get('role_id')) is None:
+        return None, 'Role not found'
+    return [player_change(player, 'role_id', data['role_id'])], None
+
+
+@action_type('set_votes')
+def set_votes(state, data):
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    votes = data.get('votes_remaining')
+    if not isinstance(votes, int) or votes < 0:
+        return None, 'votes_remaining must be a non-negative integer'
+    return [player_change(player, 'votes_remaining', votes)], None
+
+
+@action_type('add_status_effect')
+def add_status_effect(state, data):
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    if not data.get('name'):
+        return None, 'Effect name is required'
+    # Stored with the action so replays rebuild the same effect
+    data.setdefault('applied_at', datetime.utcnow().isoformat())
+    effect = {
+        'name': data['name'],
+        'duration': data.get('duration'),
+        'source': data.get('source'),
+        'applied_at': data['applied_at']
+    }
+    return [player_change(player, 'status_effects', player['status_effects'] + [effect])], None
+
+
+@action_type('remove_status_effect')
+def remove_status_effect(state, data):
+    player = find_player(state, data.get('player_id'))
+    if player is None:
+        return None, 'Player not found'
+    effects = [e for e in player['status_effects'] if e['name'] != data.get('name')]
+    if len(effects) == len(player['status_effects']):
+        return None, 'Player does not have that effect'
+    return [player_change(player, 'status_effects', effects)], None
+
+
+@action_type('advance_phase')
+def advance_phase(state, data):
+    info = state['game_info']
+    if info['status'] == 'night':
+        # A new day gives every player their votes back, as in Player.reset_votes
+        votes = [
+            player_change(player, 'votes_remaining', 1 if player['is_alive'] else dead_votes(state))
+            for player in state['players']
+        ]
+        return [
+            game_change(state, 'status', 'day'),
+            game_change(state, 'day_number', info['day_number'] + 1)
+        ] + votes, None
+    if info['status'] == 'day':
+        return [game_change(state, 'status', 'night'), game_change(state, 'phase', info['phase'] + 1)], None
+    return None, 'Only games in progress can advance'
+
+
+def replay_action(state, action_type, data):
+    """Re-run a recorded action on a snapshot in place. Returns its changes, [] if it no longer applies"""
+    builder = ACTION_TYPES.get(action_type)
+    if builder is None:
+        return []
+    changes, error = builder(state, data)
+    if error:
+        return []
+    apply_changes(state, changes)
+    return changes
+
+
+def apply_changes(state, changes):
+    """Apply recorded changes to a snapshot in place"""
+    for change in changes:
+        if change['target'] == 'game':
+            state['game_info'][change['field']] = change['after']
+        else:
+            player = find_player(state, change['id'])
+            if player is not None:
+                player[change['field']] = change['after']
+
+
+def read_field(state, key):
+    """Get the value of a (target, id, field) key from a snapshot"""
+    target, target_id, field = key
+    if target == 'game':
+        return state['game_info'].get(field)
+    player = find_player(state, target_id)
+    return player.get(field) if player else None
+
+
+def write_fields(game, values):
+    """Write {(target, id, field): value} onto a game and its players"""
+    players = {player.id: player for player in game.players}
+    for (target, target_id, field), value in values.items():
+        if target == 'game':
+            setattr(game, field, value)
+            continue
+        player = players.get(target_id)
+        if player is None:
+            continue
+        if field in PLAYER_SETTERS:
+            getattr(player, PLAYER_SETTERS[field])(value)
+        else:
+            setattr(player, field, value)
+
+
+class ActionLog:
+    """Records host actions and undoes or redoes them by replay"""
+
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the log to a Flask app and read its configuration"""
+        app.config.setdefault('ACTION_SNAPSHOT_INTERVAL', 50)  # actions between replay snapshots
+        self.app = app
+        app.extensions['action_log'] = self
+
+    @property
+    def snapshot_interval(self):
+        return self.app.config['ACTION_SNAPSHOT_INTERVAL'] if self.app else 50
+
+    def perform(self, game, action_type, data, performed_by):
+        """Validate, apply and record an action. Returns (action, error)"""
+        from src.models.game import Game
+        from src.models.game_state import GameAction, GameState
+
+        builder = ACTION_TYPES.get(action_type)
+        if builder is None:
+            return None, f'Unknown action type: {action_type}'
+
+        game = Game.load_with_roster(game.id)
+        state = build_snapshot(game)
+        changes, error = builder(state, data)
+        if error:
+            return None, error
+
+        sequence = GameAction.next_sequence(game.id)
+        last_snapshot = db.session.query(db.func.max(GameState.action_sequence)).filter(
+            GameState.game_id == game.id
+        ).scalar()
+        if last_snapshot is None or sequence - 1 - last_snapshot >= self.snapshot_interval:
+            self._add_snapshot(game, state, sequence - 1, performed_by)
+
+        action = GameAction(
+            game_id=game.id,
+            action_type=action_type,
+            performed_by=performed_by,
+            phase=game.phase,
+            day_number=game.day_number,
+            sequence=sequence
+        )
+        action.set_action_data(data)
+        action.set_changes(changes)
+        write_fields(game, {(c['target'], c['id'], c['field']): c['after'] for c in changes})
+
+        db.session.add(action)
+        db.session.commit()
+        return action, None
+
+    def checkpoint(self, game, created_by):
+        """Snapshot a game after a change made outside the log, such as loading a save"""
+        from src.models.game_state import GameAction
+
+        self._add_snapshot(game, build_snapshot(game), GameAction.next_sequence(game.id) - 1, created_by)
+        db.session.commit()
+
+    def undo(self, game, action, reason=''):
+        """Undo an action. Returns (changes written, error)"""
+        return self._set_undone(game, action, True, reason)
+
+    def redo(self, game, action):
+        """Redo an undone action. Returns (changes written, error)"""
+        return self._set_undone(game, action, False, None)
+
+    def rebuild(self, game_id, sequence=None):
+        """Get the game state after action ``sequence`` (default: the latest)"""
+        from src.models.game_state import GameState
+
+        query = GameState.query.filter(GameState.game_id == game_id, GameState.action_sequence.isnot(None))
+        if sequence is not None:
+            query = query.filter(GameState.action_sequence <= sequence)
+        snapshot = query.order_by(GameState.action_sequence.desc()).first()
+        if snapshot is None:
+            return None
+        state, _ = self._replay(snapshot, until=sequence)
+        return state
+
+    def _set_undone(self, game, action, undone, reason):
+        from src.models.game import Game
+        from src.models.game_state import GameAction, GameState
+
+        if action.sequence is None or action.changes is None:
+            # Bookkeeping actions (loads, undos) change nothing to revert
+            action.is_undone = undone
+            action.undo_reason = reason
+            db.session.commit()
+            return [], None
+
+        load_after = GameAction.query.filter(
+            GameAction.game_id == game.id,
+            GameAction.action_type == 'load_state',
+            GameAction.sequence > action.sequence
+        ).first()
+        if load_after is not None:
+            return None, 'Actions from before a saved state was loaded cannot be changed'
+
+        snapshot = GameState.query.filter(
+            GameState.game_id == game.id,
+            GameState.action_sequence < action.sequence
+        ).order_by(GameState.action_sequence.desc()).first()
+        if snapshot is None:
+            return None, 'No snapshot to replay from'
+
+        action.is_undone = undone
+        action.undo_reason = reason
+        state, touched = self._replay(snapshot)
+        game = Game.load_with_roster(game.id)
+        current = build_snapshot(game)
+        changes = [
+            {'target': key[0], 'id': key[1], 'field': key[2],
+             'before': read_field(current, key), 'after': read_field(state, key)}
+            for key in touched if read_field(state, key) != read_field(current, key)
+        ]
+        write_fields(game, {(c['target'], c['id'], c['field']): c['after'] for c in changes})
+        db.session.commit()
+        return changes, None
+
+    def _replay(self, snapshot, until=None):
+        """Replay the actions after a snapshot. Returns (state, touched field keys)"""
+        from src.models.game_state import GameAction
+
+        query = GameAction.query.filter(
+            GameAction.game_id == snapshot.game_id,
+            GameAction.sequence > snapshot.action_sequence,
+            GameAction.changes.isnot(None)
+        )
+        if until is not None:
+            query = query.filter(GameAction.sequence <= until)
+
+        state = snapshot.get_state_data()
+        touched = set()
+        for action in query.order_by(GameAction.sequence):
+            # Fields the action touched when recorded, so undoing it restores them
+            touched.update((c['target'], c['id'], c['field']) for c in action.get_changes())
+            if not action.is_undone:
+                changes = replay_action(state, action.action_type, action.get_action_data())
+                touched.update((c['target'], c['id'], c['field']) for c in changes)
+        return state, touched
+
+    def _add_snapshot(self, game, state, action_sequence, created_by):
+        from src.models.game_state import GameState
+
+        snapshot = GameState(
+            game_id=game.id,
+            state_name=f'Checkpoint after action {action_sequence}',
+            created_by=created_by,
+            is_auto_save=True,
+            phase=game.phase,
+            day_number=game.day_number,
+            action_sequence=action_sequence
+        )
+        snapshot.set_state_data(state)
+        db.session.add(snapshot)
+
+
+# Process-wide action log, bound to the app in main.py
+action_log = ActionLog()
@@ -0,0 +1,170 @@
+"""Incremental, compressed auto-saves written by a background worker.
+
+``auto_saver.save(game)`` takes a compact snapshot of the game in the
+calling request (seats, role ids, abilities and effects rather than full
+role and script dictionaries) and queues it. A worker thread then diffs
+it against the previous auto-save of the same game and stores only the
+changes, compressed. Every ``AUTO_SAVE_CHECKPOINT_INTERVAL`` saves, and
+for the first save a process makes for a game, a full checkpoint is
+stored instead, so rebuilding a save never replays more than that many
+deltas (see ``GameState.get_state_data``).
+
+The previous snapshot of each game is kept in memory, so the worker never
+reads saves back. Queued saves are lost if the process exits before the
+worker writes them; ``wait()`` blocks until the queue is empty.
+"""
+import queue
+import threading
+from datetime import datetime
+
+from src.models.user import db
+
+
+def build_snapshot(game):
+    """Get the compact state of a game that auto-saves record"""
+    players = []
+    for player in sorted(game.players, key=lambda p: p.position):
+        players.append({
+            'id': player.id,
+            'user_id': player.user_id,
+            'username': player.username,
+            'position': player.position,
+            'role_id': player.role_id,
+            'is_alive': player.is_alive,
+            'votes_remaining': player.votes_remaining,
+            'died_at': player.died_at.isoformat() if player.died_at else None,
+            'abilities_used': player.get_abilities_used(),
+            'status_effects': player.get_status_effects(),
+            'notes': player.notes
+        })
+
+    return {
+        'game_info': {
+            'id': game.id,
+            'phase': game.phase,
+            'day_number': game.day_number,
+            'status': game.status,
+            'settings': game.get_settings()
+        },
+        'players': players,
+        'script_id': game.script_id,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+class AutoSaver:
+    """Queue of auto-saves and the worker that writes them"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._last = {}  # game_id -> previous save of that game, see _write
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # each save diffs against the one written before it
+        self._worker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the saver to a Flask app and read its configuration"""
+        app.config.setdefault('AUTO_SAVE_ASYNC', True)  # False writes saves inside the request
+        app.config.setdefault('AUTO_SAVE_CHECKPOINT_INTERVAL', 10)  # deltas between full checkpoints
+        self.app = app
+        app.extensions['auto_saver'] = self
+
+    def save(self, game, state_name=None, created_by=None, wait=False):
+        """Snapshot a game and queue its auto-save.
+
+        Returns the GameState when the save was written straight away
+        (``wait``, or ``AUTO_SAVE_ASYNC`` off) and None when it was queued.
+        """
+        job = {
+            'game_id': game.id,
+            'state_name': state_name or f"Auto-save {game.phase} Day {game.day_number}",
+            'created_by': created_by or game.host_id,
+            'phase': game.phase,
+            'day_number': game.day_number,
+            'snapshot': build_snapshot(game)
+        }
+
+        if wait or self.app is None or not self.app.config['AUTO_SAVE_ASYNC']:
+            return self._write(job)
+
+        self._ensure_worker()
+        self._queue.put(job)
+        return None
+
+    def wait(self):
+        """Block until every queued auto-save has been written"""
+        self._queue.join()
+
+    def forget(self, game_id):
+        """Make the next auto-save of a game a full checkpoint"""
+        with self._lock:
+            self._last.pop(game_id, None)
+
+    def _write(self, job):
+        with self._write_lock:
+            return self._write_locked(job)
+
+    def _write_locked(self, job):
+        from src.models.game_state import GameState, diff_snapshots, players_summary
+
+        snapshot = job['snapshot']
+        with self._lock:
+            last = self._last.get(job['game_id'])
+
+        interval = self.app.config['AUTO_SAVE_CHECKPOINT_INTERVAL'] if self.app else 0
+        if last is None or last['deltas'] >= interval:
+            data = snapshot
+            checkpoint_id = None
+        else:
+            data = diff_snapshots(last['snapshot'], snapshot)
+            data.update(delta=True, checkpoint_id=last['checkpoint_id'], timestamp=snapshot['timestamp'])
+            checkpoint_id = last['checkpoint_id']
+
+        game_state = GameState(
+            game_id=job['game_id'],
+            state_name=job['state_name'],
+            created_by=job['created_by'],
+            is_auto_save=True,
+            phase=job['phase'],
+            day_number=job['day_number']
+        )
+        game_state.set_state_data(data, summary=players_summary(snapshot))
+        try:
+            db.session.add(game_state)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            self.forget(job['game_id'])
+            raise
+
+        with self._lock:
+            self._last[job['game_id']] = {
+                'snapshot': snapshot,
+                'checkpoint_id': checkpoint_id or game_state.id,
+                'deltas': last['deltas'] + 1 if checkpoint_id else 0
+            }
+        return game_state
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name='auto-saver', daemon=True)
+                self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                with self.app.app_context():
+                    self._write(job)
+            except Exception as e:
+                print(f"Error writing auto-save for game {job['game_id']}: {e}")
+            finally:
+                self._queue.task_done()
+
+
+# Process-wide auto-saver, bound to the app in main.py
+auto_saver = AutoSaver()
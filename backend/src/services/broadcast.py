@@ -0,0 +1,295 @@
+"""Server-authored game change broadcasts.
+
+After a change is committed, routes emit a small ``game_delta`` message to
+the ``game_<id>`` room instead of clients re-fetching the whole game.
+Every delta carries a per-game sequence number and the broadcaster's
+epoch. A client that sees a gap in ``seq`` (or a new ``epoch`` after the
+delta history was lost) emits ``resync`` and receives either the missed
+deltas from a short history or a full snapshot.
+
+Sequence numbers, the epoch and the history live in a delta store chosen
+by ``BROADCAST_STORE_URL``. With ``redis://`` every worker on the message
+queue numbers a game's deltas from the same counter and answers resyncs
+from the same history, so clients connected to different workers see one
+sequence. ``memory://`` shares one store between the broadcasters of a
+process (tests), and no URL keeps everything in this worker, which is
+only correct with a single worker.
+"""
+import json
+import secrets
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class MemoryDeltaStore:
+    """Sequence numbers and recent deltas kept in this process"""
+
+    _shared = {}  # memory:// URL -> store shared by every broadcaster using it
+    _shared_lock = threading.Lock()
+
+    def __init__(self, history_size=256):
+        self.epoch = secrets.token_hex(4)
+        self.history_size = history_size
+        self._seq = {}
+        self._history = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, url, history_size=256):
+        """Get the store every broadcaster with this memory:// URL uses"""
+        with cls._shared_lock:
+            store = cls._shared.get(url)
+            if store is None:
+                store = cls._shared[url] = cls(history_size)
+            return store
+
+    def append(self, game_id, build):
+        """Number the next delta of a game with ``build(seq)`` and keep it"""
+        with self._lock:
+            seq = self._seq.get(game_id, 0) + 1
+            self._seq[game_id] = seq
+            delta = build(seq)
+            history = self._history.get(game_id)
+            if history is None:
+                history = self._history[game_id] = deque(maxlen=self.history_size)
+            history.append(delta)
+        return delta
+
+    def current_seq(self, game_id):
+        return self._seq.get(game_id, 0)
+
+    def since(self, game_id, seq):
+        with self._lock:
+            current = self._seq.get(game_id, 0)
+            if seq >= current:
+                return []
+            history = list(self._history.get(game_id, ()))
+        if not history or history[0]['seq'] > seq + 1:
+            return None
+        return [delta for delta in history if delta['seq'] > seq]
+
+    def forget(self, game_id):
+        with self._lock:
+            self._history.pop(game_id, None)
+
+
+class RedisDeltaStore:
+    """Sequence numbers and recent deltas shared by every worker through Redis.
+
+    The counter is an INCR per game and the history a sorted set scored by
+    seq and capped at ``history_size``, so deltas stored out of order by
+    concurrent workers still come back in order.
+    """
+
+    EPOCH_KEY = 'broadcast:epoch'
+    TTL = 86400  # seconds a quiet game's counter and history are kept
+
+    def __init__(self, url, history_size=256):
+        import redis
+
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.5)
+        self.history_size = history_size
+        # The first worker sets the epoch; a new one means Redis lost the history
+        self.redis.set(self.EPOCH_KEY, secrets.token_hex(4), nx=True)
+        self.epoch = self.redis.get(self.EPOCH_KEY).decode()
+
+    @staticmethod
+    def _keys(game_id):
+        return f'broadcast:seq:{game_id}', f'broadcast:history:{game_id}'
+
+    def append(self, game_id, build):
+        seq_key, history_key = self._keys(game_id)
+        seq = self.redis.incr(seq_key)
+        delta = build(seq)
+        pipe = self.redis.pipeline()
+        pipe.zadd(history_key, {json.dumps(delta): seq})
+        pipe.zremrangebyrank(history_key, 0, -self.history_size - 1)
+        pipe.expire(seq_key, self.TTL)
+        pipe.expire(history_key, self.TTL)
+        pipe.execute()
+        return delta
+
+    def current_seq(self, game_id):
+        return int(self.redis.get(self._keys(game_id)[0]) or 0)
+
+    def since(self, game_id, seq):
+        current = self.current_seq(game_id)
+        if seq >= current:
+            return []
+        deltas = [json.loads(value) for value in
+                  self.redis.zrangebyscore(self._keys(game_id)[1], f'({seq}', current)]
+        # Missing entries were trimmed, or are still being stored by another worker
+        if [delta['seq'] for delta in deltas] != list(range(seq + 1, current + 1)):
+            return None
+        return deltas
+
+    def forget(self, game_id):
+        self.redis.delete(self._keys(game_id)[1])
+
+
+def delta_store(url, history_size=256):
+    """Get the delta store for a BROADCAST_STORE_URL"""
+    if url and url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisDeltaStore(url, history_size)
+    if url and url.startswith('memory://'):
+        return MemoryDeltaStore.shared(url, history_size)
+    return MemoryDeltaStore(history_size)
+
+
+# Private player fields and the delta that tells their owner to refetch
+PRIVATE_FIELDS = {
+    'role_id': 'role_changed',
+    'status_effects': 'status_effect',
+    'abilities_used': 'abilities_changed',
+}
+
+
+class GameBroadcaster:
+    """Emits sequenced state diffs to game rooms"""
+
+    def __init__(self, app=None, socketio=None):
+        self.socketio = None
+        self.store = MemoryDeltaStore()
+        if app is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio):
+        """Bind the broadcaster to a Flask app and its SocketIO server"""
+        app.config.setdefault('BROADCAST_HISTORY_SIZE', 256)  # deltas kept per game for resync
+        app.config.setdefault('BROADCAST_STORE_URL', None)  # shared seq/history store, see module docs
+        self.store = delta_store(app.config['BROADCAST_STORE_URL'], app.config['BROADCAST_HISTORY_SIZE'])
+        self.socketio = socketio
+        app.extensions['broadcaster'] = self
+
+    @property
+    def epoch(self):
+        return self.store.epoch
+
+    def emit(self, game_id, change_type, data):
+        """Record a change and send it to everyone in the game room"""
+        def build(seq):
+            return {
+                'game_id': game_id,
+                'epoch': self.epoch,
+                'seq': seq,
+                'type': change_type,
+                'data': data,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+
+        try:
+            delta = self.store.append(game_id, build)
+        except Exception as e:
+            # The change is already committed; a delta without a seq makes
+            # clients resync instead of failing the request
+            print(f"Error recording delta for game {game_id}: {e}")
+            delta = build(None)
+
+        if self.socketio is not None:
+            self.socketio.emit('game_delta', delta, room=f'game_{game_id}')
+        return delta
+
+    def emit_changes(self, game, changes):
+        """Send the deltas for recorded field changes (host actions, undo, redo).
+
+        Field values come from ``game`` after the change was committed.
+        Roles, status effects and abilities are private, so their deltas
+        only name the player, who refetches their own seat.
+        """
+        deltas = []
+        if any(change['target'] == 'game' for change in changes):
+            deltas.append(self.emit(game.id, 'phase_advanced', {
+                'status': game.status,
+                'phase': game.phase,
+                'day_number': game.day_number
+            }))
+
+        players = {player.id: player for player in game.players}
+        fields = {}
+        for change in changes:
+            if change['target'] == 'player' and change['id'] in players:
+                fields.setdefault(change['id'], set()).add(change['field'])
+
+        votes = []
+        for player_id, changed in fields.items():
+            player = players[player_id]
+            if 'is_alive' in changed:
+                if player.is_alive:
+                    deltas.append(self.emit(game.id, 'player_revived', {
+                        'player_id': player_id,
+                        'votes_remaining': player.votes_remaining
+                    }))
+                else:
+                    # Dead players' roles are public, as in Player.to_dict
+                    role = player.role
+                    deltas.append(self.emit(game.id, 'player_died', {
+                        'player_id': player_id,
+                        'died_at': player.died_at.isoformat() if player.died_at else None,
+                        'votes_remaining': player.votes_remaining,
+                        'role': {'id': role.id, 'name': role.name, 'team': role.team} if role else None
+                    }))
+            elif 'votes_remaining' in changed:
+                votes.append({'player_id': player_id, 'votes_remaining': player.votes_remaining})
+            for field, change_type in PRIVATE_FIELDS.items():
+                if field in changed:
+                    deltas.append(self.emit(game.id, change_type, {'player_id': player_id}))
+
+        if votes:
+            deltas.append(self.emit(game.id, 'votes_changed', {'players': votes}))
+        return deltas
+
+    def emit_operations(self, operations):
+        """Send the deltas for a committed batch of live game votes and nominations.
+
+        Registered with ``live_games.on_flush``. Each game whose votes were
+        in the batch also gets a ``vote_tally`` delta counted from the
+        stored votes, so it never includes a vote that is not yet committed.
+        """
+        from src.models.game import Game
+        from src.services.vote_tally import VoteTally, show_vote_counts
+
+        deltas = []
+        tallies = {}
+        for op in operations:
+            if op['op'] == 'vote':
+                deltas.append(self.emit(op['game_id'], 'vote_cast', {
+                    'voter_id': op['voter_id'],
+                    'target_id': op['target_id'],
+                    'vote_type': op['vote_type'],
+                    'votes_remaining': op['votes_remaining']
+                }))
+                tallies[op['game_id']] = op['day_number']
+            elif op['op'] == 'nominate':
+                deltas.append(self.emit(op['game_id'], 'nomination', {
+                    'nominator_id': op['nominator_id'],
+                    'nominee_id': op['nominee_id'],
+                    'day_number': op['day_number'],
+                    'timestamp': op['timestamp']
+                }))
+
+        for game_id, day_number in tallies.items():
+            game = Game.load_with_roster(game_id)
+            if game is None or game.status != 'day' or game.day_number != day_number:
+                continue  # The day is over; its tally no longer changes
+            tally = VoteTally.load(game_id, day_number)
+            deltas.append(self.emit(game_id, 'vote_tally', tally.to_dict(
+                game.get_alive_count(), include_counts=show_vote_counts(game.get_settings())
+            )))
+        return deltas
+
+    def current_seq(self, game_id):
+        """Get the sequence number of the latest delta for a game"""
+        return self.store.current_seq(game_id)
+
+    def since(self, game_id, seq):
+        """Get the deltas after ``seq``, or None if some are no longer kept"""
+        return self.store.since(game_id, seq)
+
+    def forget(self, game_id):
+        """Drop the history of a game that has ended"""
+        self.store.forget(game_id)
+
+
+# Process-wide broadcaster, bound to the app in main.py
+broadcaster = GameBroadcaster()
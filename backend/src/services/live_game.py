@@ -0,0 +1,469 @@
+"""In-process engine for games that are currently being played.
+
+Games in the ``night`` or ``day`` phase are held in memory as plain Python
+objects. Votes and nominations are validated and applied to those objects
+immediately and queued for persistence; a background flusher writes the
+queue to the database in batched commits. Every queued operation is first
+appended to an on-disk journal so that anything applied but not yet
+flushed when the process dies is replayed by ``recover()`` on start-up.
+
+The engine is per-process, so a live game must be served by one worker.
+Routes that change a game outside the engine call ``release()`` first so
+the cached copy never goes stale. Callbacks registered with ``on_flush()``
+see each batch once it has been committed, which is when votes and
+nominations are announced to the game room.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+
+from flask import has_app_context
+from src.models.user import db
+from src.services.vote_tally import VoteTally
+
+ACTIVE_STATUSES = ('night', 'day')
+
+
+class LivePlayer:
+    """In-memory seat of an active game"""
+
+    __slots__ = ('id', 'user_id', 'username', 'position', 'is_alive', 'votes_remaining')
+
+    def __init__(self, player):
+        self.id = player.id
+        self.user_id = player.user_id
+        self.username = player.username
+        self.position = player.position
+        self.is_alive = player.is_alive
+        self.votes_remaining = player.votes_remaining
+
+    def can_vote(self):
+        """Check if player can vote"""
+        return self.votes_remaining > 0
+
+
+class LiveGame:
+    """In-memory copy of an active game and its players"""
+
+    def __init__(self, game):
+        self.id = game.id
+        self.host_id = game.host_id
+        self.status = game.status
+        self.phase = game.phase
+        self.day_number = game.day_number
+        self.settings = game.get_settings()
+        self.players = {p.id: LivePlayer(p) for p in game.players}
+        self.players_by_user = {p.user_id: p for p in self.players.values()}
+        self.nominations = game.get_nominations()
+        self.nominators = {n['nominator_id'] for n in self.nominations}
+        self.tally = VoteTally.load(game.id, game.day_number)
+
+    def get_player(self, player_id):
+        """Get a seat by player id"""
+        return self.players.get(player_id)
+
+    def player_for_user(self, user_id):
+        """Get the seat belonging to a user"""
+        return self.players_by_user.get(user_id)
+
+    def alive_count(self):
+        """Get number of alive players"""
+        return sum(1 for p in self.players.values() if p.is_alive)
+
+    def get_tally(self, include_counts=True):
+        """Get today's running vote tally as dictionary"""
+        return self.tally.to_dict(self.alive_count(), include_counts=include_counts)
+
+    def overlay(self, data):
+        """Apply unflushed in-memory state onto a serialized Game.to_dict payload"""
+        for player_data in data.get('players', []):
+            player = self.players.get(player_data['id'])
+            if player:
+                player_data['is_alive'] = player.is_alive
+                player_data['votes_remaining'] = player.votes_remaining
+        if 'nominations' in data:
+            data['nominations'] = list(self.nominations)
+        data['alive_count'] = self.alive_count()
+        return data
+
+
+class LiveGameEngine:
+    """Registry of active games with write-behind persistence"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._games = {}
+        self._pending = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flusher = None
+        self._flush_callbacks = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the engine to a Flask app and read its configuration"""
+        app.config.setdefault('LIVE_GAME_FLUSH_INTERVAL', 0.5)  # seconds, 0 = write-through
+        app.config.setdefault('LIVE_GAME_FLUSH_BATCH', 200)  # flush early once this many ops queue up
+        app.config.setdefault('LIVE_GAME_JOURNAL', None)  # path of the crash-recovery journal
+        self.app = app
+        app.extensions['live_games'] = self
+
+    @property
+    def journal_path(self):
+        return self.app.config['LIVE_GAME_JOURNAL'] if self.app else None
+
+    def get(self, game_id):
+        """Get the live copy of an active game, loading it on first use"""
+        with self._lock:
+            live_game = self._games.get(game_id)
+            if live_game is None:
+                from src.models.game import Game
+
+                game = Game.load_with_roster(game_id)
+                if not game or game.status not in ACTIVE_STATUSES:
+                    return None
+                live_game = LiveGame(game)
+                self._games[game_id] = live_game
+            return live_game
+
+    def on_flush(self, callback):
+        """Call ``callback(operations)`` after each batch is committed"""
+        self._flush_callbacks.append(callback)
+
+    def peek(self, game_id):
+        """Get the live copy of a game only if it is already loaded"""
+        return self._games.get(game_id)
+
+    def release(self, game_id):
+        """Flush pending writes and drop a game from memory"""
+        self.flush()
+        with self._lock:
+            self._games.pop(game_id, None)
+
+    def cast_vote(self, game_id, voter_id, target_id=None, vote_type='execution'):
+        """Apply a vote in memory and queue it. Returns (vote_dict, error)"""
+        with self._lock:
+            live_game = self.get(game_id)
+            if not live_game or live_game.status != 'day':
+                return None, 'Voting is only allowed during day phase'
+
+            voter = live_game.get_player(voter_id)
+            if not voter or not voter.can_vote():
+                return None, 'You have no votes remaining'
+
+            target = live_game.get_player(target_id) if target_id else None
+            voter.votes_remaining -= 1
+            if vote_type == 'execution':
+                live_game.tally.add(target_id)
+
+            vote = {
+                'id': None,  # Assigned when the vote is flushed
+                'game_id': game_id,
+                'voter_id': voter.id,
+                'voter_username': voter.username,
+                'target_id': target_id,
+                'target_username': target.username if target else None,
+                'vote_type': vote_type,
+                'day_number': live_game.day_number,
+                'is_valid': True,
+                'cast_at': datetime.utcnow().isoformat()
+            }
+            write_through = self._enqueue(dict(vote, op='vote', votes_remaining=voter.votes_remaining))
+        if write_through:
+            self.flush()
+        return vote, None
+
+    def nominate(self, game_id, nominator_id, nominee_id):
+        """Apply a nomination in memory and queue it. Returns (nominations, error)"""
+        with self._lock:
+            live_game = self.get(game_id)
+            if not live_game or live_game.status != 'day':
+                return None, 'Nominations are only allowed during day phase'
+
+            nominator = live_game.get_player(nominator_id)
+            nominee = live_game.get_player(nominee_id)
+            if not nominator:
+                return None, 'You are not in this game'
+            if not nominee:
+                return None, 'Invalid target player'
+            if not nominator.is_alive:
+                return None, 'Dead players cannot nominate'
+            if not nominee.is_alive:
+                return None, 'Cannot nominate dead players'
+            if nominee.id == nominator.id:
+                return None, 'Cannot nominate yourself'
+            if nominator.id in live_game.nominators:
+                return None, 'You have already nominated someone today'
+
+            nomination = {
+                'id': None,  # Assigned when the nomination is flushed
+                'nominator_id': nominator.id,
+                'nominee_id': nominee.id,
+                'day_number': live_game.day_number,
+                'timestamp': datetime.utcnow().isoformat()
+            }
+            live_game.nominations.append(nomination)
+            live_game.nominators.add(nominator.id)
+
+            write_through = self._enqueue({
+                'op': 'nominate',
+                'game_id': game_id,
+                'nominator_id': nominator.id,
+                'nominator_username': nominator.username,
+                'nominee_id': nominee.id,
+                'nominee_username': nominee.username,
+                'day_number': live_game.day_number,
+                'timestamp': nomination['timestamp']
+            })
+            nominations = list(live_game.nominations)
+        if write_through:
+            self.flush()
+        return nominations, None
+
+    def flush(self):
+        """Write all queued operations to the database in one commit"""
+        if self.app is not None and not has_app_context():
+            with self.app.app_context():
+                return self.flush()
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._rotate_journal()
+            if not batch:
+                return 0
+
+            try:
+                persist_operations(batch)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._pending[:0] = batch
+                raise
+
+            self._discard_rotated_journal()
+
+            # Still under _flush_lock, so batches are announced in commit order
+            for callback in self._flush_callbacks:
+                try:
+                    callback(batch)
+                except Exception as e:
+                    # The batch is committed; a failed announcement must not re-queue it
+                    print(f"Error announcing flushed live game operations: {e}")
+            return len(batch)
+
+    def recover(self):
+        """Replay journaled operations that were not flushed before a crash"""
+        path = self.journal_path
+        if not path:
+            return 0
+
+        operations = []
+        for journal in (path + '.flushing', path):
+            operations.extend(_read_journal(journal))
+
+        try:
+            if operations:
+                persist_operations(operations, replay=True)
+                db.session.commit()
+        except Exception as e:
+            # Keep the operations for inspection instead of failing every start-up
+            db.session.rollback()
+            failed = f"{path}.failed-{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
+            with open(failed, 'w') as journal:
+                journal.writelines(json.dumps(op) + '\n' for op in operations)
+            print(f"Could not replay live game journal, moved to {failed}: {e}")
+            operations = []
+
+        for journal in (path + '.flushing', path):
+            if os.path.exists(journal):
+                os.remove(journal)
+        return len(operations)
+
+    def _enqueue(self, operation):
+        # Called with _lock held. Returns True when the caller must flush
+        # once it has released _lock: flush() takes _flush_lock before
+        # _lock, so flushing from here could deadlock with release().
+        self._append_to_journal(operation)
+        self._pending.append(operation)
+
+        interval = self.app.config['LIVE_GAME_FLUSH_INTERVAL'] if self.app else 0
+        if not interval:
+            return True
+
+        self._ensure_flusher()
+        if len(self._pending) >= self.app.config['LIVE_GAME_FLUSH_BATCH']:
+            self._wakeup.set()
+        return False
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._run_flusher, name='live-game-flusher', daemon=True)
+            self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wakeup.wait(self.app.config['LIVE_GAME_FLUSH_INTERVAL'])
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing live games: {e}")
+
+    def _append_to_journal(self, operation):
+        path = self.journal_path
+        if not path:
+            return
+        with open(path, 'a') as journal:
+            journal.write(json.dumps(operation) + '\n')
+            journal.flush()
+            os.fsync(journal.fileno())
+
+    def _rotate_journal(self):
+        # Move the live journal aside so new operations land in a fresh file
+        # while this batch commits. A leftover .flushing file means the last
+        # flush failed; its batch was re-queued, so keep appending to it.
+        path = self.journal_path
+        if not path or not os.path.exists(path):
+            return
+        rotated = path + '.flushing'
+        if os.path.exists(rotated):
+            with open(path) as src, open(rotated, 'a') as dst:
+                dst.write(src.read())
+            os.remove(path)
+        else:
+            os.replace(path, rotated)
+
+    def _discard_rotated_journal(self):
+        path = self.journal_path
+        if path and os.path.exists(path + '.flushing'):
+            os.remove(path + '.flushing')
+
+
+def _read_journal(path):
+    operations = []
+    if not os.path.exists(path):
+        return operations
+    with open(path) as journal:
+        for line in journal:
+            try:
+                operations.append(json.loads(line))
+            except ValueError:
+                # A torn final line from a crash mid-write
+                continue
+    return operations
+
+
+def vote_key(game_id, day_number, voter_id, target_id, cast_at):
+    """Identify a vote, so a journal replay can tell which votes were already committed"""
+    return game_id, day_number, voter_id, target_id, cast_at
+
+
+def persist_operations(operations, replay=False):
+    """Add the database writes for a batch of engine operations to the session.
+
+    With ``replay`` (journal recovery) operations that were already
+    committed, because the process died after a flush committed but before
+    its journal was discarded, are skipped.
+    """
+    from src.models.player import Player
+    from src.models.vote import Vote, Nomination
+
+    votes_remaining = {}
+    nominations = []
+
+    committed_votes = set()
+    votes = [op for op in operations if op['op'] == 'vote']
+    if replay and votes:
+        committed_votes = {vote_key(*row) for row in db.session.query(
+            Vote.game_id, Vote.day_number, Vote.voter_id, Vote.target_id, Vote.cast_at
+        ).filter(
+            Vote.game_id.in_({op['game_id'] for op in votes}),
+            Vote.day_number.in_({op['day_number'] for op in votes})
+        )}
+
+    for op in operations:
+        if op['op'] == 'vote':
+            cast_at = datetime.fromisoformat(op['cast_at'])
+            key = vote_key(op['game_id'], op['day_number'], op['voter_id'], op['target_id'], cast_at)
+            if key in committed_votes:
+                votes_remaining[op['voter_id']] = op['votes_remaining']
+                continue
+            committed_votes.add(key)
+            db.session.add(Vote(
+                game_id=op['game_id'],
+                voter_id=op['voter_id'],
+                target_id=op['target_id'],
+                vote_type=op['vote_type'],
+                day_number=op['day_number'],
+                cast_at=cast_at
+            ))
+            db.session.add(_log_entry(op['game_id'], 'vote_cast', {
+                'voter_id': op['voter_id'],
+                'voter_username': op['voter_username'],
+                'target_id': op['target_id'],
+                'target_username': op['target_username'],
+                'vote_type': op['vote_type'],
+                'day_number': op['day_number']
+            }, op['day_number'], cast_at))
+            votes_remaining[op['voter_id']] = op['votes_remaining']
+
+        elif op['op'] == 'nominate':
+            nominations.append(op)
+
+    # Later operations supersede earlier ones, so only the final values are written
+    if votes_remaining:
+        db.session.execute(db.update(Player), [
+            {'id': player_id, 'votes_remaining': remaining}
+            for player_id, remaining in votes_remaining.items()
+        ])
+    if nominations:
+        # A journal replay may include nominations that were already
+        # committed; skip those instead of tripping the uniqueness constraint
+        existing = {tuple(row) for row in db.session.query(
+            Nomination.game_id, Nomination.day_number, Nomination.nominator_id
+        ).filter(
+            Nomination.game_id.in_({op['game_id'] for op in nominations}),
+            Nomination.day_number.in_({op['day_number'] for op in nominations})
+        )}
+        for op in nominations:
+            key = (op['game_id'], op['day_number'], op['nominator_id'])
+            if key in existing:
+                continue
+            existing.add(key)
+            nominated_at = datetime.fromisoformat(op['timestamp'])
+            db.session.add(Nomination(
+                game_id=op['game_id'],
+                day_number=op['day_number'],
+                nominator_id=op['nominator_id'],
+                nominee_id=op['nominee_id'],
+                nominated_at=nominated_at
+            ))
+            db.session.add(_log_entry(op['game_id'], 'player_nominated', {
+                'nominator_id': op['nominator_id'],
+                'nominator_username': op['nominator_username'],
+                'nominee_id': op['nominee_id'],
+                'nominee_username': op['nominee_username'],
+                'day_number': op['day_number']
+            }, op['day_number'], nominated_at))
+
+
+def _log_entry(game_id, event_type, event_data, day_number, timestamp):
+    from src.models.vote import GameLog
+
+    log_entry = GameLog(
+        game_id=game_id,
+        event_type=event_type,
+        day_number=day_number,
+        timestamp=timestamp
+    )
+    log_entry.set_event_data(event_data)
+    return log_entry
+
+
+# Process-wide engine, bound to the app in main.py
+live_games = LiveGameEngine()
@@ -0,0 +1,67 @@
+"""Socket.IO message queue selection.
+
+With a message queue every backend worker subscribes to the same pub/sub
+channel, so an emit to ``game_<id>`` from any worker reaches clients
+connected to every other worker. ``redis://`` (and ``rediss://``) URLs
+use Redis; ``memory://`` relays emits between the SocketIO servers of
+one process, so tests can stand up several "workers" without Redis.
+
+Delta sequence numbers and resync history are shared through the
+broadcaster's store (``BROADCAST_STORE_URL``, the queue URL by default),
+not through the queue. Games held by the live game engine are still
+owned by a single worker, so the load balancer must route a game's HTTP
+requests consistently.
+"""
+import pickle
+import threading
+
+import socketio
+
+
+class InMemoryManager(socketio.Manager):
+    """Client manager that relays emits to every server in this process.
+
+    Each SocketIO server created with the same channel registers here, and
+    an emit on any of them is delivered to the matching clients of all of
+    them, the way a Redis queue would deliver it to every worker. Delivery
+    is synchronous, and unlike a pub/sub manager it works with the
+    Flask-SocketIO test client.
+    """
+
+    _peers = {}
+    _peers_lock = threading.Lock()
+
+    def __init__(self, url='memory://', channel='flask-socketio'):
+        super().__init__()
+        self.channel = channel
+        with self._peers_lock:
+            self._peers.setdefault(channel, []).append(self)
+
+    def emit(self, event, data, namespace, room=None, skip_sid=None, callback=None, to=None, **kwargs):
+        with self._peers_lock:
+            peers = [peer for peer in self._peers.get(self.channel, ()) if peer.server is not None]
+        for peer in peers:
+            if peer is self:
+                super().emit(event, data, namespace, room=room, skip_sid=skip_sid,
+                             callback=callback, to=to, **kwargs)
+            else:
+                # Round-trip through pickle like the Redis manager does, so
+                # unserializable payloads fail here rather than in production
+                socketio.Manager.emit(peer, event, pickle.loads(pickle.dumps(data)), namespace,
+                                      room=room, to=to, **kwargs)
+
+    def close(self):
+        """Stop relaying emits to and from this manager"""
+        with self._peers_lock:
+            peers = self._peers.get(self.channel, [])
+            if self in peers:
+                peers.remove(self)
+
+
+def socketio_queue_options(url, channel='flask-socketio'):
+    """Get the SocketIO keyword arguments for a message queue URL"""
+    if not url:
+        return {}
+    if url.startswith('memory://'):
+        return {'client_manager': InMemoryManager(url, channel=channel)}
+    return {'message_queue': url, 'channel': channel}
@@ -0,0 +1,194 @@
+"""Opt-in per-request query, timing and size instrumentation.
+
+When ``METRICS_ENABLED`` is set, every request records how many SQL
+statements it ran, the time spent in the database and in JSON
+serialization, its total duration and its response size. Totals and
+histograms per route are exposed in the Prometheus text format at
+``/metrics``; with ``METRICS_DEBUG_HEADERS`` (on by default in debug mode)
+each response also carries ``X-DB-Queries`` and ``Server-Timing``
+headers so the numbers show up in browser dev tools.
+
+Metrics are kept per process; each worker is scraped separately.
+"""
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds its serialization time to the current request"""
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context():
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g.metrics_serialize_time = g.get('metrics_serialize_time', 0.0) + time.perf_counter() - started
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class RouteStats:
+    """Aggregated measurements for one route"""
+
+    def __init__(self):
+        self.statuses = {}
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.response_bytes = 0
+
+
+class RequestMetrics:
+    """Collects per-route request metrics and serves them at /metrics"""
+
+    def __init__(self, app=None):
+        self.routes = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Install the instrumentation if METRICS_ENABLED is set"""
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('METRICS_DEBUG_HEADERS', app.debug)
+        app.extensions['request_metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        self.debug_headers = app.config['METRICS_DEBUG_HEADERS']
+
+        @event.listens_for(Engine, 'before_cursor_execute')
+        def _before_query(conn, cursor, statement, parameters, context, executemany):
+            if has_request_context():
+                conn.info['metrics_query_start'] = time.perf_counter()
+
+        @event.listens_for(Engine, 'after_cursor_execute')
+        def _after_query(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.pop('metrics_query_start', None)
+            if has_request_context() and started is not None:
+                g.metrics_queries = g.get('metrics_queries', 0) + 1
+                g.metrics_db_time = g.get('metrics_db_time', 0.0) + time.perf_counter() - started
+
+    def add_collector(self, collector):
+        """Add a callable returning extra Prometheus text lines to /metrics"""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    def _start_request(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+
+        duration = time.perf_counter() - started
+        queries = g.get('metrics_queries', 0)
+        db_time = g.get('metrics_db_time', 0.0)
+        serialize_time = g.get('metrics_serialize_time', 0.0)
+        size = 0 if response.is_streamed else response.calculate_content_length() or 0
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        with self._lock:
+            stats = self.routes.get((request.method, route))
+            if stats is None:
+                stats = self.routes[(request.method, route)] = RouteStats()
+            stats.statuses[response.status_code] = stats.statuses.get(response.status_code, 0) + 1
+            stats.duration.observe(duration)
+            stats.queries.observe(queries)
+            stats.db_time += db_time
+            stats.serialize_time += serialize_time
+            stats.response_bytes += size
+
+        if self.debug_headers:
+            response.headers['X-DB-Queries'] = str(queries)
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_time * 1000:.2f};desc="{queries} queries", '
+                f'serialize;dur={serialize_time * 1000:.2f}, '
+                f'total;dur={duration * 1000:.2f}'
+            )
+        return response
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def header(name, kind, description):
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, labels, hist):
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.total}')
+            lines.append(f'{name}_sum{{{labels}}} {hist.sum}')
+            lines.append(f'{name}_count{{{labels}}} {hist.total}')
+
+        with self._lock:
+            routes = sorted(self.routes.items())
+            labelled = [(f'method="{method}",route="{route}"', stats) for (method, route), stats in routes]
+
+            header('botc_http_requests_total', 'counter', 'HTTP requests by route and status')
+            for labels, stats in labelled:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'botc_http_requests_total{{{labels},status="{status}"}} {count}')
+
+            header('botc_http_request_duration_seconds', 'histogram', 'Request duration')
+            for labels, stats in labelled:
+                histogram('botc_http_request_duration_seconds', labels, stats.duration)
+
+            header('botc_db_queries_per_request', 'histogram', 'SQL statements per request')
+            for labels, stats in labelled:
+                histogram('botc_db_queries_per_request', labels, stats.queries)
+
+            for name, attribute, description in (
+                ('botc_db_time_seconds_total', 'db_time', 'Time spent executing SQL'),
+                ('botc_serialization_seconds_total', 'serialize_time', 'Time spent serializing JSON'),
+                ('botc_response_bytes_total', 'response_bytes', 'Response body bytes (streamed responses excluded)'),
+            ):
+                header(name, 'counter', description)
+                for labels, stats in labelled:
+                    lines.append(f'{name}{{{labels}}} {getattr(stats, attribute)}')
+
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        """Serve the metrics to Prometheus"""
+        return self.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+# Process-wide request metrics, bound to the app in main.py
+request_metrics = RequestMetrics()
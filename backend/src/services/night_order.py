@@ -0,0 +1,153 @@
+"""Night-order sheets for scripts and live games.
+
+A script's first-night and other-night wake sequences are compiled once
+from its role index (so they are cached with it and rebuilt whenever the
+script or its roles change) and serialized once per compilation. A live
+game's sheet keeps only the entries whose character is held by an alive
+player, with those players attached, and is built from one query over
+the game's seats.
+
+Sheets show who holds which role, so games only push a
+``night_order_changed`` signal carrying the new sheet's ETag. The host
+fetches the sheet itself.
+"""
+import hashlib
+import json
+import threading
+
+from flask import current_app
+
+from src.models.user import db
+from src.services.role_catalog import role_catalog
+
+NIGHTS = ('first_night', 'other_night')
+
+
+def night_entry(role, night):
+    """Get one role's line on a night sheet"""
+    return {
+        'role_id': role['id'],
+        'character_id': role['character_id'],
+        'name': role['name'],
+        'team': role['team'],
+        'order': role[night],
+        'reminder': role[f'{night}_reminder'] or ''
+    }
+
+
+def _etag(body):
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+class NightOrder:
+    """A script's compiled wake sequences"""
+
+    def __init__(self, script_id, version, first_night, other_night):
+        self.script_id = script_id
+        self.version = version
+        self.first_night = tuple(first_night)
+        self.other_night = tuple(other_night)
+        self._body = None
+
+    @staticmethod
+    def build(index):
+        """Compile the night order of a script from its role index"""
+        roles = [role_catalog.get(role_id) for role_ids in index.role_ids_by_team.values() for role_id in role_ids]
+        roles = [role for role in roles if role]
+        sequences = {}
+        for night in NIGHTS:
+            waking = sorted((role for role in roles if (role[night] or 0) > 0), key=lambda r: (r[night], r['name']))
+            sequences[night] = [night_entry(role, night) for role in waking]
+        return NightOrder(index.script_id, index.version, sequences['first_night'], sequences['other_night'])
+
+    def to_dict(self):
+        """Convert to dictionary for API responses"""
+        return {
+            'script_id': self.script_id,
+            'version': self.version,
+            'first_night': list(self.first_night),
+            'other_night': list(self.other_night)
+        }
+
+    def body(self):
+        """Get the memoized serialized sheet and its ETag"""
+        if self._body is None:
+            body = current_app.json.dumps(self.to_dict()).encode() + b'\n'
+            self._body = (body, _etag(body))
+        return self._body
+
+    def for_seats(self, seats):
+        """Filter the sheet to the characters alive players hold.
+
+        ``seats`` are (player_id, username, position, role_id, is_alive) rows.
+        """
+        holders = {}
+        for player_id, username, position, role_id, is_alive in seats:
+            if is_alive and role_id is not None:
+                holders.setdefault(role_id, []).append({'id': player_id, 'username': username, 'position': position})
+
+        sheet = {'script_id': self.script_id, 'version': self.version}
+        for night in NIGHTS:
+            sheet[night] = [
+                dict(entry, players=holders[entry['role_id']])
+                for entry in getattr(self, night) if entry['role_id'] in holders
+            ]
+        return sheet
+
+
+class NightOrderService:
+    """Builds live game sheets and signals hosts when they change"""
+
+    def __init__(self, app=None):
+        self._sent = {}  # game_id -> ETag of the last sheet signalled
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the service with a Flask app"""
+        app.extensions['night_orders'] = self
+
+    def for_game(self, game):
+        """Get a live game's sheet and its ETag"""
+        from src.models.user import User
+        from src.models.player import Player
+
+        if not game.script:
+            return None, None
+
+        seats = db.session.execute(
+            db.select(Player.id, User.username, Player.position, Player.role_id, Player.is_alive)
+            .join(User, User.id == Player.user_id)
+            .where(Player.game_id == game.id)
+            .order_by(Player.position)
+        ).all()
+        sheet = game.script.role_index().night_order().for_seats(seats)
+        sheet.update(
+            game_id=game.id,
+            current='first_night' if game.day_number == 0 else 'other_night'
+        )
+        return sheet, _etag(json.dumps(sheet, sort_keys=True).encode())
+
+    def notify(self, game):
+        """Signal the game room if the game's sheet changed since the last signal"""
+        from src.services.broadcast import broadcaster
+
+        sheet, etag = self.for_game(game)
+        if sheet is None:
+            return False
+        with self._lock:
+            if self._sent.get(game.id) == etag:
+                return False
+            self._sent[game.id] = etag
+        broadcaster.emit(game.id, 'night_order_changed', {'etag': etag})
+        return True
+
+    def forget(self, game_id):
+        """Drop what is remembered about a finished game"""
+        with self._lock:
+            self._sent.pop(game_id, None)
+
+
+# Process-wide night order service, bound to the app in main.py
+night_orders = NightOrderService()
@@ -0,0 +1,126 @@
+"""Password hashing on a bounded worker pool.
+
+Hashing or checking a password costs tens of milliseconds of CPU. The
+work runs on a pool of ``PASSWORD_HASH_WORKERS`` threads (or processes,
+with ``PASSWORD_HASH_POOL=process``), which bounds how many hashes run
+at once so a burst of logins cannot take every core. The calling request
+still blocks until its job is done. At most ``PASSWORD_HASH_MAX_PENDING``
+jobs may be queued or running; beyond that ``PasswordHasherBusy`` is
+raised so the route can answer 503 instead of piling up requests.
+
+New hashes use ``PASSWORD_HASH_METHOD``. A stored hash made with other
+parameters still verifies, and ``needs_rehash`` tells the login route to
+replace it.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already pending"""
+
+
+class PasswordHasher:
+    """Runs password hashing and checking on a worker pool"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._method_prefix = None
+        self.pending = 0  # jobs queued or running
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0  # time requests spent waiting on jobs, queueing included
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the hasher to a Flask app and read its configuration"""
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt')
+        app.config.setdefault('PASSWORD_HASH_POOL', 'thread')  # or 'process'
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_MAX_PENDING', 64)
+        self.app = app
+        self.shutdown()
+        self._method_prefix = None
+        app.extensions['password_hasher'] = self
+
+        metrics = app.extensions.get('request_metrics')
+        if metrics is not None:
+            metrics.add_collector(self.render_metrics)
+
+    @property
+    def method(self):
+        return self.app.config['PASSWORD_HASH_METHOD'] if self.app else 'scrypt'
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Check whether a stored hash was made with other parameters than new hashes"""
+        if self._method_prefix is None:
+            # Let werkzeug fill in the method's default parameters
+            self._method_prefix = self._run(generate_password_hash, '', self.method, 1).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefix
+
+    def shutdown(self):
+        """Stop the pool; it is started again on the next job"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    def _run(self, function, *args):
+        with self._lock:
+            limit = self.app.config['PASSWORD_HASH_MAX_PENDING'] if self.app else 64
+            if self.pending >= limit:
+                self.rejected += 1
+                raise PasswordHasherBusy('Too many password checks in progress')
+            self.pending += 1
+            if self._pool is None:
+                self._pool = self._create_pool()
+            pool = self._pool
+
+        started = time.perf_counter()
+        try:
+            return pool.submit(function, *args).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.wait_seconds += time.perf_counter() - started
+
+    def _create_pool(self):
+        workers = self.app.config['PASSWORD_HASH_WORKERS'] if self.app else 2
+        if self.app and self.app.config['PASSWORD_HASH_POOL'] == 'process':
+            return ProcessPoolExecutor(max_workers=workers)
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hasher')
+
+    def render_metrics(self):
+        """Get the hasher's metrics as Prometheus text lines"""
+        with self._lock:
+            values = (
+                ('botc_password_hash_pending', 'gauge', 'Password hashing jobs queued or running', self.pending),
+                ('botc_password_hash_jobs_total', 'counter', 'Password hashing jobs finished', self.completed),
+                ('botc_password_hash_rejected_total', 'counter', 'Password hashing jobs refused as busy',
+                 self.rejected),
+                ('botc_password_hash_seconds_total', 'counter', 'Time requests spent waiting for password hashing',
+                 self.wait_seconds),
+            )
+        lines = []
+        for name, kind, description, value in values:
+            lines.extend((f'# HELP {name} {description}', f'# TYPE {name} {kind}', f'{name} {value}'))
+        return lines
+
+
+# Process-wide password hasher, bound to the app in main.py
+password_hasher = PasswordHasher()
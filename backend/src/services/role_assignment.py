@@ -0,0 +1,226 @@
+"""Role assignment for starting games.
+
+``assign_roles`` picks the roles a script puts in play for a set of seats
+and deals them out, without touching the database, so the same code
+serves ``start_game`` and bulk simulations. ``apply_assignments`` then
+writes any number of assignments (across games) in one bulk UPDATE.
+
+Given the same script, seats, strategy and seed the result is always the
+same, so a game's setup can be reproduced from the seed in its log.
+Evil roles are picked first; setup roles such as the Baron then shift the
+outsider/townsfolk split before the good roles are picked.
+"""
+import random
+
+from src.models.user import db
+from src.services.role_catalog import role_catalog
+
+# Outsider count changes made by setup roles, by character id
+SETUP_OUTSIDER_SHIFTS = {
+    'baron': 2,
+    'fang_gu': 1,
+    'vigormortis': -1,
+}
+
+# Attempts at picking evil roles whose setup shift the script can satisfy
+EVIL_PICK_ATTEMPTS = 20
+
+
+class RandomStrategy:
+    """Uniformly random roles and seats"""
+
+    def choose(self, role_ids, count, rng):
+        """Choose ``count`` of ``role_ids``"""
+        return rng.sample(role_ids, count)
+
+    def seat(self, role_ids, seats, rng):
+        """Deal roles to seats, returning {player_id: role_id}"""
+        role_ids = list(role_ids)
+        rng.shuffle(role_ids)
+        return dict(zip(seats, role_ids))
+
+
+class WeightedStrategy(RandomStrategy):
+    """Favour roles with higher weights. Unlisted roles weigh 1"""
+
+    def __init__(self, weights=None):
+        self.weights = self.parse_weights(weights)
+
+    @staticmethod
+    def parse_weights(weights):
+        """Read {role_id: weight} as stored in game settings JSON.
+
+        Keys and values may be strings ("12": "2"); entries that are not
+        numbers are ignored, so a bad setting falls back to weight 1.
+        """
+        if not isinstance(weights, dict):
+            return {}
+        parsed = {}
+        for role_id, weight in weights.items():
+            try:
+                parsed[int(role_id)] = float(weight)
+            except (TypeError, ValueError):
+                continue
+        return parsed
+
+    def choose(self, role_ids, count, rng):
+        # Weighted sampling without replacement: keep the largest u ** (1 / w)
+        keyed = []
+        for role_id in role_ids:
+            weight = self.weights.get(role_id, 1)
+            key = rng.random() ** (1 / weight) if weight > 0 else 0.0
+            keyed.append((key, role_id))
+        keyed.sort(reverse=True)
+        return [role_id for _, role_id in keyed[:count]]
+
+
+class AvoidRepeatsStrategy(RandomStrategy):
+    """Avoid giving players a role they had in one of their recent games"""
+
+    def __init__(self, recent_roles=None):
+        self.recent_roles = recent_roles or {}
+
+    def seat(self, role_ids, seats, rng):
+        assignments = super().seat(role_ids, seats, rng)
+
+        # Roles are tracked by the seat first dealt them, so duplicates stay apart
+        def fresh(seat, slot):
+            return assignments[slot] not in self.recent_roles.get(seat, ())
+
+        holder = {slot: slot for slot in seats if fresh(slot, slot)}
+        held = {seat: seat for seat in holder}
+
+        def claim(seat, visited):
+            # Take a fresh role, moving its holder on to another fresh role if needed
+            for slot in seats:
+                if slot in visited or not fresh(seat, slot):
+                    continue
+                visited.add(slot)
+                if slot not in holder or claim(holder[slot], visited):
+                    holder[slot] = seat
+                    held[seat] = slot
+                    return True
+            return False
+
+        # Re-deal repeats along chains of swaps; a repeat only remains when
+        # no deal gives every player a fresh role
+        for seat in seats:
+            if seat not in held:
+                claim(seat, set())
+
+        leftover = iter(slot for slot in seats if slot not in holder)
+        return {seat: assignments[held[seat] if seat in held else next(leftover)] for seat in seats}
+
+
+STRATEGIES = {
+    'random': RandomStrategy,
+    'weighted': WeightedStrategy,
+    'avoid_repeats': AvoidRepeatsStrategy,
+}
+
+
+def register_strategy(name, strategy_class):
+    """Make a strategy class available by name"""
+    STRATEGIES[name] = strategy_class
+
+
+def get_strategy(name, **options):
+    """Create a strategy by name, or None if it is unknown"""
+    strategy_class = STRATEGIES.get(name)
+    if strategy_class is None:
+        return None
+    return strategy_class(**options) if options else strategy_class()
+
+
+def setup_outsider_shift(role_ids):
+    """Get the total outsider count change caused by setup roles"""
+    shift = 0
+    for role_id in role_ids:
+        role = role_catalog.get(role_id)
+        if role and role['setup']:
+            shift += SETUP_OUTSIDER_SHIFTS.get(role['character_id'], 0)
+    return shift
+
+
+def assign_roles(index, distribution, seats, seed=None, strategy=None):
+    """Pick and deal roles for a game.
+
+    ``index`` is the script's ScriptRoleIndex, ``distribution`` the team
+    counts for the player count and ``seats`` the player ids in seat order.
+    Returns ({player_id: role_id}, error).
+    """
+    rng = random.Random(seed)
+    strategy = strategy or RandomStrategy()
+    available = {team: sorted(role_ids) for team, role_ids in index.role_ids_by_team.items()}
+
+    if len(seats) != sum(distribution.values()):
+        return None, 'Player count does not match the role distribution'
+    for team in ('minion', 'demon'):
+        if len(available[team]) < distribution[team]:
+            return None, f'The script does not have enough {team} roles'
+
+    # Pick evil roles until the setup shift they cause can be satisfied
+    for attempt in range(EVIL_PICK_ATTEMPTS + 1):
+        if attempt == EVIL_PICK_ATTEMPTS:
+            # Give up on setup roles altogether
+            plain = [role_id for role_id in available['minion'] if not setup_outsider_shift([role_id])]
+            if len(plain) < distribution['minion']:
+                return None, 'No combination of evil roles fits this script'
+            minions = strategy.choose(plain, distribution['minion'], rng)
+            demons = strategy.choose(
+                [role_id for role_id in available['demon'] if not setup_outsider_shift([role_id])] or available['demon'],
+                distribution['demon'], rng
+            )
+        else:
+            demons = strategy.choose(available['demon'], distribution['demon'], rng)
+            minions = strategy.choose(available['minion'], distribution['minion'], rng)
+
+        shift = setup_outsider_shift(demons + minions)
+        outsiders = max(0, distribution['outsider'] + shift)
+        townsfolk = distribution['townsfolk'] + distribution['outsider'] - outsiders
+        if 0 <= townsfolk <= len(available['townsfolk']) and outsiders <= len(available['outsider']):
+            break
+    else:
+        return None, 'No combination of roles fits this script'
+
+    selected = (
+        demons + minions
+        + strategy.choose(available['outsider'], outsiders, rng)
+        + strategy.choose(available['townsfolk'], townsfolk, rng)
+    )
+    return strategy.seat(selected, list(seats), rng), None
+
+
+def recent_roles_by_player(players, games=5):
+    """Get {player_id: set(role_ids)} of each player's roles in their last few games"""
+    from src.models.player import Player
+
+    user_ids = {player.user_id: player.id for player in players}
+    game_ids = {player.game_id for player in players}
+    ranked = db.select(
+        Player.user_id,
+        Player.role_id,
+        db.func.row_number().over(partition_by=Player.user_id, order_by=Player.joined_at.desc()).label('rank')
+    ).where(
+        Player.user_id.in_(list(user_ids)),
+        Player.game_id.notin_(list(game_ids)),
+        Player.role_id.isnot(None)
+    ).subquery()
+    rows = db.session.execute(
+        db.select(ranked.c.user_id, ranked.c.role_id).where(ranked.c.rank <= games)
+    )
+
+    recent = {}
+    for user_id, role_id in rows:
+        recent.setdefault(user_ids[user_id], set()).add(role_id)
+    return recent
+
+
+def apply_assignments(assignments):
+    """Write {player_id: role_id} assignments in a single bulk UPDATE"""
+    from src.models.player import Player
+
+    if assignments:
+        db.session.execute(db.update(Player), [
+            {'id': player_id, 'role_id': role_id} for player_id, role_id in assignments.items()
+        ])
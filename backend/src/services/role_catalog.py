@@ -0,0 +1,145 @@
+"""In-memory catalog of role reference data.
+
+Roles are seeded once and almost never change, so the catalog loads them
+all on first use, keeps each role's dictionary (with its JSON columns
+already parsed) keyed by id and ``character_id``, and memoizes the
+serialized ``GET /api/roles`` bodies together with their ETags.
+
+Snapshots are never modified after they are built; a committed change to
+any Role replaces the whole snapshot on the next read. Only the process
+that made the change sees it immediately; other workers reload their
+snapshot once it is ``ROLE_CATALOG_TTL`` seconds old.
+"""
+import hashlib
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.role import Role
+
+ROLE_TEAMS = ('townsfolk', 'outsider', 'minion', 'demon')
+
+
+def _etag(body):
+    return hashlib.sha1(body).hexdigest()[:20]
+
+
+class RoleSnapshot:
+    """An immutable view of every role at one point in time"""
+
+    def __init__(self, roles):
+        self.roles = tuple(role.to_dict() for role in sorted(roles, key=lambda r: (r.team, r.name)))
+        self.by_id = {role['id']: role for role in self.roles}
+        self.by_character_id = {role['character_id']: role for role in self.roles}
+        self._bodies = {}
+
+    def body(self, key, build):
+        """Get a memoized ``(body, etag)`` pair, serializing it on first use"""
+        cached = self._bodies.get(key)
+        if cached is None:
+            body = current_app.json.dumps(build()).encode() + b'\n'
+            cached = self._bodies.setdefault(key, (body, _etag(body)))
+        return cached
+
+
+class RoleCatalog:
+    """Process-wide cache of role dictionaries and serialized role lists"""
+
+    def __init__(self, app=None):
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._ttl = 60
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Invalidate the catalog whenever a role change is committed"""
+        app.config.setdefault('ROLE_CATALOG_TTL', 60)  # seconds before re-reading the roles
+        self._ttl = app.config['ROLE_CATALOG_TTL']
+        app.extensions['role_catalog'] = self
+
+        # Session events are global, so listen only once however many apps bind the catalog
+        for name, listener in (('after_flush', self._track_role_changes),
+                               ('after_commit', self._invalidate_on_commit),
+                               ('after_rollback', self._forget_on_rollback)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    def _track_role_changes(self, session, flush_context):
+        changed = session.new | session.dirty | session.deleted
+        if any(isinstance(obj, Role) for obj in changed):
+            session.info['roles_changed'] = True
+
+    def _invalidate_on_commit(self, session):
+        if session.info.pop('roles_changed', False):
+            self.invalidate()
+
+    def _forget_on_rollback(self, session):
+        session.info.pop('roles_changed', None)
+
+    @property
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or self._expires_at <= time.monotonic():
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None or self._expires_at <= time.monotonic():
+                    snapshot = self._replace()
+        return snapshot
+
+    def load(self):
+        """Rebuild the catalog from the database"""
+        with self._lock:
+            snapshot = self._replace()
+        return len(snapshot.roles)
+
+    def invalidate(self):
+        """Drop the catalog so the next read reloads it"""
+        self._snapshot = None
+
+    def _replace(self):
+        snapshot = self._snapshot = RoleSnapshot(Role.query.all())
+        self._expires_at = time.monotonic() + self._ttl
+        return snapshot
+
+    def get(self, role_id):
+        """Get a role dictionary by id, or None. Do not modify the result"""
+        return self.snapshot.by_id.get(role_id)
+
+    def get_by_character_id(self, character_id):
+        """Get a role dictionary by official character id, or None"""
+        return self.snapshot.by_character_id.get(character_id)
+
+    def role_body(self, role_id):
+        """Get the serialized ``GET /api/roles/<id>`` body and ETag, or None"""
+        snapshot = self.snapshot
+        role = snapshot.by_id.get(role_id)
+        if role is None:
+            return None
+        return snapshot.body(('role', role_id), lambda: {'role': role})
+
+    def list_body(self, team=None, is_official=None):
+        """Get the serialized ``GET /api/roles`` body and ETag for a filter"""
+        snapshot = self.snapshot
+
+        def build():
+            roles = [
+                role for role in snapshot.roles
+                if (team is None or role['team'] == team)
+                and (is_official is None or role['is_official'] == is_official)
+            ]
+            return {
+                'roles': roles,
+                'roles_by_team': {t: [role for role in roles if role['team'] == t] for t in ROLE_TEAMS},
+                'total_count': len(roles)
+            }
+
+        return snapshot.body(('list', team, is_official), build)
+
+
+# Process-wide role catalog, bound to the app in main.py
+role_catalog = RoleCatalog()
@@ -0,0 +1,132 @@
+"""Per-script role index and player-count feasibility table.
+
+Distribution and start-game checks used to walk every ``ScriptRole`` and
+lazy-load its role once per team. The index groups a script's role ids by
+team (teams come from the role catalog, so no Role rows are loaded) and
+records which player counts the script can fill, so those checks become
+dictionary lookups.
+
+Indexes are cached per script and dropped when a commit touches a
+Script, ScriptRole or Role in this process. Other workers pick up the
+change when their entry expires after ``SCRIPT_INDEX_TTL`` seconds.
+"""
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.role import Role
+from src.models.script import Script, ScriptRole, PLAYER_COUNT_DISTRIBUTIONS
+from src.services.role_catalog import ROLE_TEAMS, role_catalog
+
+
+class ScriptRoleIndex:
+    """Roles of one script grouped by team, with feasible player counts"""
+
+    def __init__(self, script_id, role_ids_by_team, version=None):
+        self.script_id = script_id
+        self.version = version
+        self.role_ids_by_team = {team: tuple(role_ids_by_team.get(team, ())) for team in ROLE_TEAMS}
+        self.counts = {team: len(ids) for team, ids in self.role_ids_by_team.items()}
+        self.feasible = {
+            player_count: all(self.counts[team] >= needed for team, needed in distribution.items())
+            for player_count, distribution in PLAYER_COUNT_DISTRIBUTIONS.items()
+        }
+        self._night_order = None
+
+    @staticmethod
+    def build(script):
+        """Index a script's roles by team"""
+        role_ids_by_team = {}
+        for script_role in script.script_roles:
+            role = role_catalog.get(script_role.role_id)
+            team = role['team'] if role else script_role.role.team
+            role_ids_by_team.setdefault(team, []).append(script_role.role_id)
+        return ScriptRoleIndex(script.id, role_ids_by_team, version=script.version)
+
+    def can_support(self, player_count):
+        """Check if the script has enough roles of each team for a player count"""
+        return self.feasible.get(player_count, False)
+
+    def night_order(self):
+        """Get the script's compiled night order, building it on first use"""
+        if self._night_order is None:
+            from src.services.night_order import NightOrder
+
+            self._night_order = NightOrder.build(self)
+        return self._night_order
+
+
+class ScriptIndexCache:
+    """Process-wide cache of script role indexes"""
+
+    def __init__(self, app=None):
+        self._entries = {}
+        self._ttl = 60
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Drop cached indexes whenever a script or role change is committed"""
+        app.config.setdefault('SCRIPT_INDEX_TTL', 60)  # seconds before re-reading a script's roles
+        self._ttl = app.config['SCRIPT_INDEX_TTL']
+        app.extensions['script_indexes'] = self
+
+        # Session events are global, so listen only once however many apps bind the cache
+        for name, listener in (('after_flush', self._track_script_changes),
+                               ('after_commit', self._invalidate_on_commit),
+                               ('after_rollback', self._forget_on_rollback)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    def _track_script_changes(self, session, flush_context):
+        changed = session.new | session.dirty | session.deleted
+        for obj in changed:
+            if isinstance(obj, Role):
+                session.info['scripts_changed'] = None  # every script
+                return
+            if isinstance(obj, (Script, ScriptRole)):
+                script_id = obj.id if isinstance(obj, Script) else obj.script_id
+                scripts = session.info.setdefault('scripts_changed', set())
+                if scripts is not None:
+                    scripts.add(script_id)
+
+    def _invalidate_on_commit(self, session):
+        if 'scripts_changed' in session.info:
+            scripts = session.info.pop('scripts_changed')
+            if scripts is None:
+                self.clear()
+            else:
+                for script_id in scripts:
+                    self.invalidate(script_id)
+
+    def _forget_on_rollback(self, session):
+        session.info.pop('scripts_changed', None)
+
+    def get(self, script):
+        """Get the role index of a script, building it if needed"""
+        entry = self._entries.get(script.id)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        index = ScriptRoleIndex.build(script)
+        with self._lock:
+            self._entries[script.id] = (index, now + self._ttl)
+        return index
+
+    def invalidate(self, script_id):
+        """Drop the cached index of one script"""
+        with self._lock:
+            self._entries.pop(script_id, None)
+
+    def clear(self):
+        """Drop every cached index"""
+        with self._lock:
+            self._entries.clear()
+
+
+# Process-wide script index cache, bound to the app in main.py
+script_indexes = ScriptIndexCache()
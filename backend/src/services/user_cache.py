@@ -0,0 +1,155 @@
+"""Short-lived cache of the identities ``require_auth`` checks.
+
+Every authenticated request needs the session user's id, username and
+``is_active`` flag, and nothing else. Those are kept in a small
+in-process LRU for ``USER_CACHE_TTL`` seconds, with an optional Redis
+tier (``USER_CACHE_REDIS_URL``) shared by every worker, so a client
+polling once a second costs one user lookup per TTL rather than one per
+request.
+
+Committing a change to a User (profile update, password change,
+deactivation, deletion) drops that user from this worker's LRU and from
+Redis. Other workers' LRUs can still hold the old identity until their
+entry expires, so the TTL bounds how long a deactivated account keeps
+working elsewhere.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.user import db, User
+
+# What request.current_user holds for routes behind require_auth
+CachedUser = namedtuple('CachedUser', ('id', 'username', 'is_active'))
+
+
+class UserCache:
+    """Identity cache with an in-process LRU and an optional Redis tier"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.redis = None
+        self._entries = OrderedDict()  # user_id -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind the cache to a Flask app and invalidate users on commit"""
+        app.config.setdefault('USER_CACHE_TTL', 10)  # seconds an identity is trusted; 0 disables
+        app.config.setdefault('USER_CACHE_SIZE', 10000)  # identities kept per worker
+        app.config.setdefault('USER_CACHE_REDIS_URL', None)
+        self.app = app
+        app.extensions['user_cache'] = self
+
+        url = app.config['USER_CACHE_REDIS_URL']
+        if url and not url.startswith('memory://'):
+            import redis
+
+            self.redis = redis.Redis.from_url(url, socket_timeout=0.5)
+
+        # Session events are global, so listen only once however many apps bind the cache
+        for name, listener in (('after_flush', self._track_user_changes),
+                               ('after_commit', self._invalidate_on_commit),
+                               ('after_rollback', self._forget_on_rollback)):
+            if not event.contains(Session, name, listener):
+                event.listen(Session, name, listener)
+
+    def _track_user_changes(self, session, flush_context):
+        changed = session.new | session.dirty | session.deleted
+        user_ids = {obj.id for obj in changed if isinstance(obj, User) and obj.id is not None}
+        if user_ids:
+            session.info.setdefault('changed_user_ids', set()).update(user_ids)
+
+    def _invalidate_on_commit(self, session):
+        for user_id in session.info.pop('changed_user_ids', ()):
+            self.invalidate(user_id)
+
+    def _forget_on_rollback(self, session):
+        session.info.pop('changed_user_ids', None)
+
+    @property
+    def ttl(self):
+        return self.app.config['USER_CACHE_TTL'] if self.app else 0
+
+    def get(self, user_id):
+        """Get a user's identity, or None if there is no such user"""
+        ttl = self.ttl
+        if ttl <= 0:
+            return self._load(user_id)
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(user_id)
+                    return entry[1]
+                del self._entries[user_id]
+
+        user = self._from_redis(user_id)
+        if user is None:
+            user = self._load(user_id)
+            if user is None:
+                return None
+            self._to_redis(user, ttl)
+        self._remember(user, now + ttl)
+        return user
+
+    def invalidate(self, user_id):
+        """Drop a user's identity from this worker and from Redis"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._key(user_id))
+            except Exception as e:
+                print(f"Error invalidating cached user {user_id}: {e}")
+
+    def clear(self):
+        """Drop every identity held by this worker"""
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, user_id):
+        row = db.session.execute(
+            db.select(User.id, User.username, User.is_active).where(User.id == user_id)
+        ).first()
+        return CachedUser(*row) if row else None
+
+    def _remember(self, user, expires_at):
+        with self._lock:
+            self._entries[user.id] = (expires_at, user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.app.config['USER_CACHE_SIZE']:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _key(user_id):
+        return f'user_cache:{user_id}'
+
+    def _from_redis(self, user_id):
+        if self.redis is None:
+            return None
+        try:
+            value = self.redis.get(self._key(user_id))
+        except Exception as e:
+            print(f"Error reading cached user {user_id}: {e}")
+            return None
+        return CachedUser(*json.loads(value)) if value else None
+
+    def _to_redis(self, user, ttl):
+        if self.redis is None:
+            return
+        try:
+            self.redis.set(self._key(user.id), json.dumps(list(user)), ex=max(1, int(ttl)))
+        except Exception as e:
+            print(f"Error caching user {user.id}: {e}")
+
+
+# Process-wide identity cache, bound to the app in main.py
+user_cache = UserCache()
@@ -0,0 +1,85 @@
+"""Running vote counts for the current day of a live game.
+
+Counts only ever go up during a day, so the leading nominee and whether
+the lead is tied can be maintained in O(1) per vote. The execution
+threshold (half the living players, rounded up) is applied when the
+tally is read, since deaths change it independently of votes.
+"""
+from src.models.user import db
+
+
+def show_vote_counts(settings):
+    """Check the house rule that controls whether players see vote counts"""
+    return settings.get('house_rules', {}).get('show_vote_counts', False)
+
+
+class VoteTally:
+    """Incremental per-nominee vote counts for one day"""
+
+    def __init__(self, day_number):
+        self.day_number = day_number
+        self.counts = {}
+        self.total_votes = 0
+        self.leader_id = None
+        self.leader_votes = 0
+        self.tied = False
+
+    @staticmethod
+    def load(game_id, day_number):
+        """Build a tally from the votes already stored for a day"""
+        from src.models.vote import Vote
+
+        tally = VoteTally(day_number)
+        rows = db.session.query(Vote.target_id, db.func.count(Vote.id)).filter(
+            Vote.game_id == game_id,
+            Vote.day_number == day_number,
+            Vote.vote_type == 'execution',
+            Vote.is_valid == True,
+            Vote.target_id.isnot(None)
+        ).group_by(Vote.target_id)
+
+        for nominee_id, votes in rows:
+            tally.add(nominee_id, votes)
+        return tally
+
+    def add(self, nominee_id, votes=1):
+        """Count votes for a nominee. Abstentions (None) are ignored"""
+        if nominee_id is None:
+            return
+        count = self.counts.get(nominee_id, 0) + votes
+        self.counts[nominee_id] = count
+        self.total_votes += votes
+
+        if count > self.leader_votes:
+            self.leader_id = nominee_id
+            self.leader_votes = count
+            self.tied = False
+        elif count == self.leader_votes and nominee_id != self.leader_id:
+            self.tied = True
+
+    @staticmethod
+    def threshold_for(alive_count):
+        """Votes needed to put a player on the block"""
+        return (alive_count + 1) // 2
+
+    def on_the_block(self, alive_count):
+        """Get the nominee who would be executed, or None"""
+        if self.tied or self.leader_votes < self.threshold_for(alive_count):
+            return None
+        return self.leader_id
+
+    def to_dict(self, alive_count, include_counts=True):
+        """Convert tally to dictionary"""
+        data = {
+            'day_number': self.day_number,
+            'alive_count': alive_count,
+            'threshold': self.threshold_for(alive_count),
+            'on_the_block': self.on_the_block(alive_count)
+        }
+        if include_counts:
+            data['total_votes'] = self.total_votes
+            data['counts'] = [
+                {'nominee_id': nominee_id, 'votes': votes}
+                for nominee_id, votes in sorted(self.counts.items(), key=lambda item: -item[1])
+            ]
+        return data
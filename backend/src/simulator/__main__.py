@@ -0,0 +1,56 @@
+"""Run simulated games from the command line.
+
+    python -m src.simulator --games 1000 --players 5-15 --seed 1 --json
+"""
+import argparse
+import contextlib
+import json
+import sys
+
+from src.simulator.runner import Simulation, create_simulation_app
+
+
+def parse_player_counts(value):
+    """Parse "7" or "5-15" into a range of player counts"""
+    low, _, high = value.partition('-')
+    return range(int(low), int(high or low) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate Blood on the Clocktower games with bots')
+    parser.add_argument('--games', type=int, default=100, help='games to play per script')
+    parser.add_argument('--players', type=parse_player_counts, default=range(5, 16), help='player count or range, e.g. 5-15')
+    parser.add_argument('--script', action='append', dest='scripts', help='script name (repeatable, default: all)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for reproducible runs')
+    parser.add_argument('--insight', type=float, default=0.3, help='how strongly good bots suspect evil players')
+    parser.add_argument('--strategy', default='random', help='role assignment strategy')
+    parser.add_argument('--database', default='sqlite://', help='database URI (default: in-memory SQLite)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_simulation_app(args.database)
+    report = Simulation(app, seed=args.seed, insight=args.insight, strategy=args.strategy).run(
+        args.games, args.players, args.scripts
+    )
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['games']} games in {report['elapsed_seconds']}s "
+          f"({report['games_per_second']} games/s, {report['queries_per_game']} queries/game)")
+    for name, stats in report['scripts'].items():
+        print(f"  {name}: good {stats['good_win_rate']:.1%}, evil {stats['evil_win_rate']:.1%}, "
+              f"draw {stats['draw_rate']:.1%}, {stats['avg_days']} days, {stats['avg_executions']} executions")
+    print('Queries per game by player count:')
+    for player_count, stats in report['by_player_count'].items():
+        print(f"  {player_count:>2} players: {stats['avg_queries']} avg, {stats['max_queries']} max")
+    print('Most frequent statements:')
+    for entry in report['top_statements']:
+        print(f"  {entry['count']:>7}  {entry['statement']}")
+
+
+if __name__ == '__main__':
+    main()
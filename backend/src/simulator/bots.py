@@ -0,0 +1,82 @@
+"""Scripted players for simulated games.
+
+Evil bots know who is evil and push good players onto the block. Good
+bots act on a private suspicion score per player: random noise, plus
+``insight`` for players who really are evil, so raising ``insight``
+models a better informed town.
+"""
+
+
+class Bot:
+    """Decisions for one simulated player"""
+
+    nominate_rate = 0.6
+
+    def __init__(self, player, rng):
+        self.player = player
+        self.rng = rng
+
+    def nominate(self, candidates):
+        """Pick a player to nominate today, or None; a plain bot never nominates"""
+        return None
+
+    def votes_for(self, nominee):
+        """Decide whether to vote to execute a nominee; a plain bot votes no"""
+        return False
+
+    def choose_target(self, candidates):
+        """Pick a player for a night or day ability"""
+        return self.rng.choice(candidates) if candidates else None
+
+
+class GoodBot(Bot):
+    """A townsfolk or outsider voting on noisy suspicions"""
+
+    def __init__(self, player, rng, players, insight=0.3):
+        super().__init__(player, rng)
+        self.insight = insight
+        self.suspicion = {
+            other.id: rng.random() + (insight if other.is_evil() else 0)
+            for other in players if other.id != player.id
+        }
+
+    def nominate(self, candidates):
+        candidates = [p for p in candidates if p.id != self.player.id]
+        if not candidates or self.rng.random() > self.nominate_rate:
+            return None
+        return max(candidates, key=lambda p: self.suspicion[p.id])
+
+    def votes_for(self, nominee):
+        if nominee.id == self.player.id:
+            return False
+        return self.suspicion[nominee.id] > 0.5 + self.insight / 2
+
+    def choose_target(self, candidates):
+        candidates = [p for p in candidates if p.id != self.player.id]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda p: self.suspicion[p.id])
+
+
+class EvilBot(Bot):
+    """A minion or demon who knows the evil team"""
+
+    def nominate(self, candidates):
+        good = [p for p in candidates if p.is_good()]
+        if not good or self.rng.random() > self.nominate_rate:
+            return None
+        return self.rng.choice(good)
+
+    def votes_for(self, nominee):
+        return nominee.is_good()
+
+    def choose_target(self, candidates):
+        good = [p for p in candidates if p.is_good()]
+        return self.rng.choice(good) if good else None
+
+
+def make_bot(player, rng, players, insight=0.3):
+    """Create the bot that plays a seat"""
+    if player.is_evil():
+        return EvilBot(player, rng)
+    return GoodBot(player, rng, players, insight=insight)
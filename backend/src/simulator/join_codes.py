@@ -0,0 +1,166 @@
+"""Benchmark join code allocation against a large games table.
+
+    python -m src.simulator.join_codes --games 1000000 --allocate 2000 --json
+
+``--games`` historical games are bulk-inserted, ``--open`` of them still
+in progress and the rest ended. Then ``--allocate`` new games are created
+three ways, each committed like ``POST /api/games``:
+
+* ``lookup``: the old allocator, one SELECT per candidate code, with every
+  historical game still holding its code;
+* ``insert_retry``: ``Game.add_with_join_code`` on the same table;
+* ``insert_retry_recycled``: the same after ended games released their
+  codes, so only open games occupy the code space.
+"""
+import argparse
+import contextlib
+import json
+import random
+import sys
+import time
+
+from src.models.user import db
+from src.models.game import ENDED_STATUSES, JOIN_CODE_ALPHABET, JOIN_CODE_LENGTH, Game, retired_join_code
+from src.simulator.runner import QueryCounter, Simulation, create_simulation_app
+
+INSERT_BATCH = 50000
+
+
+def populate(host_id, games, open_games, rng):
+    """Bulk-insert historical games that all still hold a live join code"""
+    codes = set()
+    while len(codes) < games:
+        codes.add(''.join(rng.choices(JOIN_CODE_ALPHABET, k=JOIN_CODE_LENGTH)))
+    codes = list(codes)
+
+    table = Game.__table__
+    for start in range(0, games, INSERT_BATCH):
+        db.session.execute(table.insert(), [
+            {
+                'host_id': host_id,
+                'join_code': code,
+                'status': 'night' if start + i < open_games else 'completed',
+                'settings': '{}'
+            }
+            for i, code in enumerate(codes[start:start + INSERT_BATCH])
+        ])
+    db.session.commit()
+
+
+def release_all(batch_size=INSERT_BATCH):
+    """Retire the codes of every ended game with bulk updates"""
+    table = Game.__table__
+    ids = [row.id for row in db.session.execute(
+        db.select(table.c.id).where(table.c.status.in_(ENDED_STATUSES))
+    )]
+    for start in range(0, len(ids), batch_size):
+        db.session.execute(
+            table.update().where(table.c.id == db.bindparam('game_id')).values(join_code=db.bindparam('code')),
+            [{'game_id': game_id, 'code': retired_join_code(game_id)} for game_id in ids[start:start + batch_size]]
+        )
+    db.session.commit()
+    return len(ids)
+
+
+def lookup_join_code():
+    """The old allocator: draw candidates until a SELECT finds none taken"""
+    draws = 0
+    while True:
+        draws += 1
+        code = Game.generate_join_code()
+        if not Game.query.filter_by(join_code=code).first():
+            return code, draws
+
+
+def allocate(host_id, count, strategy, counter):
+    """Create ``count`` games with a strategy and measure them"""
+    samples, extra_draws = [], 0
+    queries_before = counter.total
+    for _ in range(count):
+        started = time.perf_counter()
+        if strategy == 'lookup':
+            code, draws = lookup_join_code()
+            game = Game(host_id=host_id, join_code=code)
+            db.session.add(game)
+            extra_draws += draws - 1
+        else:
+            game = Game(host_id=host_id)
+            first_code = game.join_code
+            game.add_with_join_code()
+            extra_draws += game.join_code != first_code
+        db.session.commit()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    return {
+        'mean_ms': round(sum(samples) / count, 3),
+        'p99_ms': round(samples[min(count - 1, int(count * 0.99))], 3),
+        'queries_per_game': round((counter.total - queries_before) / count, 2),
+        'redraws': extra_draws
+    }
+
+
+def occupied_codes():
+    return db.session.query(db.func.count(Game.id)).filter(~Game.join_code.startswith('-')).scalar()
+
+
+def run_benchmark(app, games=1000000, open_games=1000, count=2000, seed=None):
+    """Populate ``games`` historical games and time ``count`` allocations per strategy"""
+    rng = random.Random(seed)
+    space = len(JOIN_CODE_ALPHABET) ** JOIN_CODE_LENGTH
+    report = {'config': {'games': games, 'open': open_games, 'allocate': count, 'code_space': space}}
+
+    with app.app_context():
+        host_id = Simulation(app).bot_users(1)[0]
+        counter = QueryCounter(db.engine)
+
+        started = time.perf_counter()
+        populate(host_id, games, min(open_games, games), rng)
+        report['populate_seconds'] = round(time.perf_counter() - started, 3)
+
+        for strategy in ('lookup', 'insert_retry'):
+            occupied = occupied_codes()
+            report[strategy] = dict(allocate(host_id, count, strategy, counter), occupied_codes=occupied,
+                                    collision_chance=occupied / space)
+
+        started = time.perf_counter()
+        report['released'] = release_all()
+        report['release_seconds'] = round(time.perf_counter() - started, 3)
+
+        occupied = occupied_codes()
+        report['insert_retry_recycled'] = dict(allocate(host_id, count, 'insert_retry', counter),
+                                               occupied_codes=occupied, collision_chance=occupied / space)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark join code allocation')
+    parser.add_argument('--games', type=int, default=1000000, help='historical games in the table')
+    parser.add_argument('--open', type=int, default=1000, help='historical games still in progress')
+    parser.add_argument('--allocate', type=int, default=2000, help='new games to create per strategy')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for reproducible runs')
+    parser.add_argument('--database', default='sqlite://', help='database URI (default: in-memory SQLite)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_simulation_app(args.database)
+    report = run_benchmark(app, args.games, args.open, args.allocate, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Inserted {args.games} games in {report['populate_seconds']}s; "
+          f"released {report['released']} codes in {report['release_seconds']}s")
+    for name in ('lookup', 'insert_retry', 'insert_retry_recycled'):
+        result = report[name]
+        print(f"  {name}: {result['mean_ms']} ms mean, {result['p99_ms']} ms p99, "
+              f"{result['queries_per_game']} queries/game, {result['redraws']} redraws, "
+              f"{result['occupied_codes']} codes in use")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Benchmark the action log: record, rebuild, undo and redo.
+
+    python -m src.simulator.replay --actions 500 --players 10 --json
+
+A game is played with ``--actions`` random host actions through the
+action log, then the state after the last action is rebuilt and an early,
+a middle and the last action are undone and redone, each ``--repeat``
+times. The rebuild is timed with replay snapshots every ``--interval``
+actions and, for comparison, replaying everything from the first
+snapshot. Every rebuild is checked against the game in the database.
+"""
+import argparse
+import contextlib
+import json
+import random
+import sys
+import time
+
+from src.models.user import db
+from src.models.game import Game
+from src.models.game_state import GameAction, GameState
+from src.models.script import Script
+from src.services.action_log import action_log
+from src.services.auto_save import build_snapshot
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+
+def random_action(state, rng):
+    """Pick an action type and data for the current state"""
+    players = state['players']
+    player = rng.choice(players)
+    choice = rng.random()
+    if choice < 0.05:
+        return 'advance_phase', {}
+    if choice < 0.35:
+        return ('revive_player' if not player['is_alive'] else 'kill_player'), {'player_id': player['id']}
+    if choice < 0.55:
+        return 'set_votes', {'player_id': player['id'], 'votes_remaining': rng.randint(0, 2)}
+    if choice < 0.8 or not player['status_effects']:
+        return 'add_status_effect', {'player_id': player['id'], 'name': rng.choice(('poisoned', 'drunk', 'protected'))}
+    return 'remove_status_effect', {'player_id': player['id'], 'name': player['status_effects'][0]['name']}
+
+
+def timed(repeat, function):
+    """Run a function ``repeat`` times, returning (last result, mean ms, max ms)"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, round(sum(samples) / len(samples), 3), round(max(samples), 3)
+
+
+def comparable(state):
+    """Strip the parts of a snapshot that are not replayed"""
+    return {
+        'game_info': {key: state['game_info'][key] for key in ('status', 'phase', 'day_number')},
+        'players': [
+            (p['id'], p['is_alive'], p['role_id'], p['votes_remaining'], [e['name'] for e in p['status_effects']])
+            for p in state['players']
+        ]
+    }
+
+
+def run_benchmark(app, actions=500, players=10, interval=50, repeat=20, seed=None):
+    """Record ``actions`` actions in one game and time rebuilds, undos and redos"""
+    rng = random.Random(seed)
+    app.config['ACTION_SNAPSHOT_INTERVAL'] = interval
+    report = {'config': {'actions': actions, 'players': players, 'interval': interval, 'repeat': repeat}}
+
+    with app.app_context():
+        script = Script.query.filter_by(name='Trouble Brewing').first()
+        user_ids = Simulation(app).bot_users(players)
+        game = GameSimulator(script, user_ids, rng).setup(players)
+        game.start_game()
+        db.session.commit()
+        game_id, host_id = game.id, game.host_id
+
+        started = time.perf_counter()
+        recorded = []
+        while len(recorded) < actions:
+            game = Game.load_with_roster(game_id)
+            action_type, data = random_action(build_snapshot(game), rng)
+            action, error = action_log.perform(game, action_type, data, host_id)
+            if action is not None:
+                recorded.append(action.sequence)
+        elapsed = time.perf_counter() - started
+        report['record'] = {
+            'total_seconds': round(elapsed, 3),
+            'mean_ms': round(elapsed * 1000 / actions, 3),
+            'snapshots': GameState.query.filter(GameState.game_id == game_id,
+                                                GameState.action_sequence.isnot(None)).count()
+        }
+
+        expected = comparable(build_snapshot(Game.load_with_roster(game_id)))
+        state, mean_ms, max_ms = timed(repeat, lambda: action_log.rebuild(game_id))
+        report['rebuild_latest'] = {'mean_ms': mean_ms, 'max_ms': max_ms, 'matches': comparable(state) == expected}
+
+        # The same rebuild without intermediate snapshots replays every action
+        first = GameState.query.filter(GameState.game_id == game_id, GameState.action_sequence.isnot(None)) \
+            .order_by(GameState.action_sequence).first()
+        state, mean_ms, max_ms = timed(repeat, lambda: action_log._replay(first)[0])
+        report['rebuild_from_start'] = {'mean_ms': mean_ms, 'max_ms': max_ms, 'matches': comparable(state) == expected}
+
+        report['undo_redo'] = {}
+        for label, sequence in (('first', recorded[0]), ('middle', recorded[len(recorded) // 2]),
+                                ('last', recorded[-1])):
+            action = GameAction.query.filter_by(game_id=game_id, sequence=sequence).first()
+            undo_samples, redo_samples = [], []
+            for _ in range(repeat):
+                game = db.session.get(Game, game_id)
+                started = time.perf_counter()
+                action_log.undo(game, action, 'benchmark')
+                undo_samples.append((time.perf_counter() - started) * 1000)
+                started = time.perf_counter()
+                action_log.redo(game, action)
+                redo_samples.append((time.perf_counter() - started) * 1000)
+            report['undo_redo'][label] = {
+                'sequence': sequence,
+                'undo_mean_ms': round(sum(undo_samples) / repeat, 3),
+                'redo_mean_ms': round(sum(redo_samples) / repeat, 3),
+                'restored': comparable(build_snapshot(Game.load_with_roster(game_id))) == expected,
+            }
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark action log replay, undo and redo')
+    parser.add_argument('--actions', type=int, default=500, help='actions to record')
+    parser.add_argument('--players', type=int, default=10, help='players in the game (5-15)')
+    parser.add_argument('--interval', type=int, default=50, help='actions between replay snapshots')
+    parser.add_argument('--repeat', type=int, default=20, help='times to repeat each measurement')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for reproducible runs')
+    parser.add_argument('--database', default='sqlite://', help='database URI (default: in-memory SQLite)')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        app = create_simulation_app(args.database)
+        action_log.init_app(app)
+    report = run_benchmark(app, args.actions, args.players, args.interval, args.repeat, args.seed)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    record = report['record']
+    print(f"Recorded {args.actions} actions in {record['total_seconds']}s "
+          f"({record['mean_ms']} ms each, {record['snapshots']} snapshots)")
+    for name in ('rebuild_latest', 'rebuild_from_start'):
+        result = report[name]
+        print(f"  {name}: {result['mean_ms']} ms mean, {result['max_ms']} ms max, matches: {result['matches']}")
+    for label, result in report['undo_redo'].items():
+        print(f"  undo/redo {label} action (#{result['sequence']}): {result['undo_mean_ms']} / "
+              f"{result['redo_mean_ms']} ms, restored: {result['restored']}")
+
+
+if __name__ == '__main__':
+    main()
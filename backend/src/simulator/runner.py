@@ -0,0 +1,300 @@
+"""Drive synthetic games through the models without HTTP.
+
+Each simulated game is created, filled with bot players, given roles by
+the role assignment engine and played night/day through the Game,
+Player, Nomination, Vote and GameLog models until ``check_win_condition``
+reports a winner. Every SQL statement is counted so that changes which
+add queries per game (or per player) show up in the report.
+
+The rules are a small subset of Trouble Brewing: the Imp kills each
+night after the first, the Monk protects, the Soldier is safe, the
+Slayer shoots once, the Scarlet Woman inherits a dead Imp, and executing
+the Saint loses the game for good.
+"""
+import random
+import re
+import time
+from collections import Counter
+
+from flask import Flask
+from sqlalchemy import event
+
+from src.models.user import db, User
+from src.models.game import Game
+from src.models.player import Player
+from src.models.script import Script
+from src.models.vote import Vote, GameLog
+from src.models.schema import upgrade_schema, seed_default_data
+from src.services.role_assignment import assign_roles, apply_assignments, get_strategy
+from src.services.role_catalog import role_catalog
+from src.services.script_index import script_indexes
+from src.services.vote_tally import VoteTally
+from src.simulator.bots import make_bot
+
+
+def create_simulation_app(database_uri='sqlite://'):
+    """Create a bare app with a seeded database, in memory by default"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    role_catalog.init_app(app)
+    script_indexes.init_app(app)
+
+    with app.app_context():
+        upgrade_schema()
+        seed_default_data()
+        role_catalog.load()
+    return app
+
+
+class QueryCounter:
+    """Counts SQL statements, grouped by the start of their text"""
+
+    def __init__(self, engine):
+        self.total = 0
+        self.statements = Counter()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        self.statements[re.sub(r'\s+', ' ', statement)[:80]] += 1
+
+
+class GameSimulator:
+    """Plays one game at a time with bots"""
+
+    def __init__(self, script, user_ids, rng, insight=0.3, max_days=20, strategy='random'):
+        self.script = script
+        self.user_ids = user_ids
+        self.rng = rng
+        self.insight = insight
+        self.max_days = max_days
+        self.strategy = get_strategy(strategy)
+
+    def run(self, player_count):
+        """Play a game to the end and return its result"""
+        game = self.setup(player_count)
+        players = list(game.seating.seats)
+        bots = {p.id: make_bot(p, self.rng, players, self.insight) for p in players}
+        result = {'players': player_count, 'days': 0, 'executions': 0, 'night_deaths': 0}
+
+        game.start_game()
+        GameLog.log_event(game.id, 'game_started', {'player_count': player_count, 'script_id': self.script.id})
+        winner = None
+
+        while winner is None and game.day_number < self.max_days:
+            winner = self.play_night(game, bots, result)
+            if winner:
+                break
+            game.advance_phase()
+            result['days'] = game.day_number
+            winner = self.play_day(game, bots, result)
+            if winner is None:
+                game.advance_phase()
+
+        game.end_game(winner or 'draw')
+        GameLog.log_event(game.id, 'game_ended', {'winner': game.winner}, day_number=game.day_number)
+        db.session.commit()
+
+        result['winner'] = game.winner
+        return result
+
+    def setup(self, player_count):
+        """Create a started-ready game with roles dealt"""
+        game = Game(host_id=self.user_ids[0], script_id=self.script.id)
+        game.add_with_join_code()
+
+        players = [
+            Player(game_id=game.id, user_id=user_id, position=position, is_ready=True)
+            for position, user_id in enumerate(self.user_ids[:player_count])
+        ]
+        db.session.add_all(players)
+        db.session.flush()
+
+        seats = [player.id for player in players]
+        distribution = self.script.calculate_distribution(player_count)
+        assignments, error = assign_roles(self.script.role_index(), distribution, seats,
+                                          seed=self.rng.random(), strategy=self.strategy)
+        if error:
+            raise ValueError(error)
+        apply_assignments(assignments)
+        db.session.commit()
+
+        return Game.load_with_roster(game.id)
+
+    def kill(self, game, player, cause, result):
+        """Kill a player, passing the Imp on to a Scarlet Woman if needed"""
+        alive_before = game.get_alive_count()
+        player.kill(cause)
+        GameLog.log_event(game.id, 'death', {'player_id': player.id, 'cause': cause}, day_number=game.day_number)
+
+        if player.role.character_id == 'imp' and alive_before >= 5:
+            heir = next((p for p in game.get_alive_players() if p.role.character_id == 'scarlet_woman'), None)
+            if heir is not None:
+                heir.role = player.role
+        return game.check_win_condition()
+
+    def play_night(self, game, bots, result):
+        """Resolve night abilities. The Imp does not kill on the first night"""
+        if game.day_number == 0:
+            return None
+
+        alive = game.get_alive_players()
+        protected = None
+        monk = next((p for p in alive if p.role.character_id == 'monk'), None)
+        if monk is not None:
+            protected = bots[monk.id].choose_target([p for p in alive if p.id != monk.id])
+
+        imp = next((p for p in alive if p.role.character_id == 'imp'), None)
+        if imp is None:
+            return game.check_win_condition()
+        target = bots[imp.id].choose_target(alive)
+        if target is None or target is protected or target.role.character_id == 'soldier':
+            return None
+
+        result['night_deaths'] += 1
+        return self.kill(game, target, 'demon', result)
+
+    def play_day(self, game, bots, result):
+        """Nominate, vote and execute"""
+        for player in game.players:
+            player.reset_votes()
+
+        # The Slayer takes their shot on the first day
+        slayer = next((p for p in game.get_alive_players() if p.role.character_id == 'slayer'), None)
+        if slayer is not None and not slayer.has_used_ability('slay'):
+            slayer.add_ability_used('slay', game.day_number)
+            target = bots[slayer.id].choose_target(game.get_alive_players())
+            if target is not None and target.role.team == 'demon':
+                winner = self.kill(game, target, 'slayer', result)
+                if winner:
+                    return winner
+
+        tally = VoteTally(game.day_number)
+        nominated = set()
+        for nominator in game.get_alive_players():
+            candidates = [p for p in game.get_alive_players() if p.id not in nominated]
+            nominee = bots[nominator.id].nominate(candidates)
+            if nominee is None:
+                continue
+            nominated.add(nominee.id)
+            game.add_nomination(nominator.id, nominee.id)
+
+            for voter in game.players:
+                if voter.can_vote() and bots[voter.id].votes_for(nominee):
+                    voter.cast_vote(nominee.id)
+                    db.session.add(Vote(game_id=game.id, voter_id=voter.id, target_id=nominee.id,
+                                        vote_type='execution', day_number=game.day_number))
+                    tally.add(nominee.id)
+
+        executed = tally.on_the_block(game.get_alive_count())
+        if executed is None:
+            return None
+
+        player = next(p for p in game.players if p.id == executed)
+        result['executions'] += 1
+        GameLog.log_event(game.id, 'execution', {'player_id': player.id}, day_number=game.day_number)
+        if player.role.character_id == 'saint':
+            player.kill('execution')
+            return 'evil'
+        return self.kill(game, player, 'execution', result)
+
+
+class Simulation:
+    """Runs many games and aggregates throughput, query and win statistics"""
+
+    def __init__(self, app, seed=None, insight=0.3, max_days=20, strategy='random'):
+        self.app = app
+        self.rng = random.Random(seed)
+        self.insight = insight
+        self.max_days = max_days
+        self.strategy = strategy
+
+    def bot_users(self, count):
+        """Get or create the bot user accounts and return their ids"""
+        users = User.query.filter(User.username.like('sim_bot_%')).order_by(User.id).all()
+        for i in range(len(users), count):
+            user = User(username=f'sim_bot_{i}', email=f'sim_bot_{i}@simulator.invalid', password_hash='!')
+            db.session.add(user)
+            users.append(user)
+        db.session.commit()
+        return [user.id for user in users[:count]]
+
+    def run(self, games, player_counts=range(5, 16), script_names=None):
+        """Simulate ``games`` games per script, cycling through the player counts"""
+        player_counts = list(player_counts)
+        report = {'games': 0, 'elapsed': 0.0, 'scripts': {}, 'by_player_count': {}}
+
+        with self.app.app_context():
+            counter = QueryCounter(db.engine)
+            query = Script.query.order_by(Script.id)
+            if script_names:
+                query = query.filter(Script.name.in_(script_names))
+            scripts = [s for s in query if any(s.can_support_player_count(n) for n in player_counts)]
+            user_ids = self.bot_users(max(player_counts))
+            started = time.perf_counter()
+
+            for script in scripts:
+                simulator = GameSimulator(script, user_ids, self.rng, self.insight, self.max_days, self.strategy)
+                counts = [n for n in player_counts if script.can_support_player_count(n)]
+                stats = report['scripts'][script.name] = {
+                    'games': 0, 'winners': Counter(), 'days': 0, 'executions': 0, 'night_deaths': 0
+                }
+                for i in range(games):
+                    player_count = counts[i % len(counts)]
+                    before = counter.total
+                    result = simulator.run(player_count)
+                    queries = counter.total - before
+
+                    stats['games'] += 1
+                    stats['winners'][result['winner']] += 1
+                    for key in ('days', 'executions', 'night_deaths'):
+                        stats[key] += result[key]
+                    per_count = report['by_player_count'].setdefault(player_count, {'games': 0, 'queries': []})
+                    per_count['games'] += 1
+                    per_count['queries'].append(queries)
+
+            report['elapsed'] = time.perf_counter() - started
+            report['games'] = sum(stats['games'] for stats in report['scripts'].values())
+            report['queries'] = counter.total
+            report['top_statements'] = counter.statements.most_common(10)
+
+        return summarize(report)
+
+
+def summarize(report):
+    """Turn raw counters into the JSON-friendly report"""
+    games = report['games']
+    scripts = {}
+    for name, stats in report['scripts'].items():
+        played = stats['games'] or 1
+        scripts[name] = {
+            'games': stats['games'],
+            'good_win_rate': round(stats['winners']['good'] / played, 4),
+            'evil_win_rate': round(stats['winners']['evil'] / played, 4),
+            'draw_rate': round(stats['winners']['draw'] / played, 4),
+            'avg_days': round(stats['days'] / played, 2),
+            'avg_executions': round(stats['executions'] / played, 2),
+            'avg_night_deaths': round(stats['night_deaths'] / played, 2),
+        }
+
+    by_player_count = {}
+    for player_count, stats in sorted(report['by_player_count'].items()):
+        queries = sorted(stats['queries'])
+        by_player_count[player_count] = {
+            'games': stats['games'],
+            'avg_queries': round(sum(queries) / len(queries), 1),
+            'max_queries': queries[-1],
+        }
+
+    return {
+        'games': games,
+        'elapsed_seconds': round(report['elapsed'], 3),
+        'games_per_second': round(games / report['elapsed'], 1) if report['elapsed'] else None,
+        'queries': report['queries'],
+        'queries_per_game': round(report['queries'] / games, 1) if games else None,
+        'scripts': scripts,
+        'by_player_count': by_player_count,
+        'top_statements': [{'statement': s, 'count': c} for s, c in report['top_statements']],
+    }
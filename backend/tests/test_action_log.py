@@ -0,0 +1,111 @@
+"""Regression tests for replay-based undo in the action log."""
+import contextlib
+import io
+import random
+
+import pytest
+
+from src.models.user import db
+from src.models.game import Game
+from src.models.script import Script
+from src.services.action_log import action_log
+from src.services.live_game import live_games
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+
+@pytest.fixture
+def game():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    action_log.init_app(app)
+    live_games.init_app(app)
+    app.config['LIVE_GAME_FLUSH_INTERVAL'] = 0
+    with app.app_context():
+        script = Script.query.filter_by(name='Trouble Brewing').first()
+        user_ids = Simulation(app).bot_users(7)
+        game = GameSimulator(script, user_ids, random.Random(1)).setup(7)
+        game.start_game()
+        db.session.commit()
+        yield game
+        db.session.remove()
+
+
+def perform(game, action_type, **data):
+    # As the actions route does, so the live engine never holds stale seats
+    live_games.release(game.id)
+    action, error = action_log.perform(game, action_type, data, game.host_id)
+    assert error is None, error
+    return action
+
+
+def effects(game, player_id):
+    game = Game.load_with_roster(game.id)
+    player = next(p for p in game.players if p.id == player_id)
+    return [effect['name'] for effect in player.get_status_effects()]
+
+
+def test_undo_removes_effect_carried_by_later_action(game):
+    player_id = game.players[0].id
+    poisoned = perform(game, 'add_status_effect', player_id=player_id, name='poisoned')
+    perform(game, 'add_status_effect', player_id=player_id, name='drunk')
+
+    assert action_log.undo(game, poisoned)[1] is None
+    assert effects(game, player_id) == ['drunk']
+
+    assert action_log.redo(game, poisoned)[1] is None
+    assert effects(game, player_id) == ['poisoned', 'drunk']
+
+
+def test_undo_first_of_two_phase_advances(game):
+    start = (game.status, game.day_number, game.phase)
+    first = perform(game, 'advance_phase')
+    perform(game, 'advance_phase')
+
+    assert action_log.undo(game, first)[1] is None
+    game = db.session.get(Game, game.id)
+    assert (game.status, game.day_number) == ('day', start[1] + 1)
+    assert game.phase == start[2]
+
+
+def player(game, player_id):
+    game = Game.load_with_roster(game.id)
+    return next(p for p in game.players if p.id == player_id)
+
+
+def test_players_can_vote_again_on_day_two(game):
+    voter_id, target_id = game.players[0].id, game.players[1].id
+    perform(game, 'advance_phase')
+    assert live_games.cast_vote(game.id, voter_id, target_id)[1] is None
+    assert live_games.cast_vote(game.id, voter_id, target_id)[1] == 'You have no votes remaining'
+
+    perform(game, 'advance_phase')
+    perform(game, 'advance_phase')
+    assert db.session.get(Game, game.id).status == 'day'
+    assert live_games.cast_vote(game.id, voter_id, target_id)[1] is None
+
+
+def test_new_day_follows_dead_vote_house_rule(game):
+    game.set_settings(dict(game.get_settings(), house_rules={'allow_dead_vote': False}))
+    db.session.commit()
+    dead_id = game.players[0].id
+    perform(game, 'kill_player', player_id=dead_id)
+    perform(game, 'advance_phase')
+    assert player(game, dead_id).votes_remaining == 0
+    assert player(game, game.players[1].id).votes_remaining == 1
+
+
+def test_kill_and_revive_match_player_model(game):
+    player_id = game.players[0].id
+    kill = perform(game, 'kill_player', player_id=player_id)
+    killed = player(game, player_id)
+    assert (killed.is_alive, killed.votes_remaining) == (False, 1)
+    assert killed.died_at is not None
+
+    assert action_log.undo(game, kill)[1] is None
+    restored = player(game, player_id)
+    assert (restored.is_alive, restored.died_at) == (True, None)
+
+    assert action_log.redo(game, kill)[1] is None
+    perform(game, 'revive_player', player_id=player_id)
+    revived = player(game, player_id)
+    assert (revived.is_alive, revived.died_at, revived.votes_remaining) == (True, None, 1)
@@ -0,0 +1,141 @@
+"""Game deltas across several workers sharing a message queue.
+
+Each "worker" is a Flask app with its own SocketIO server and
+broadcaster. The memory:// tests always run; the Redis tests run when
+TEST_REDIS_URL points at a Redis server they may write to.
+"""
+import os
+import time
+import uuid
+
+import pytest
+import socketio
+from flask import Flask
+from flask_socketio import SocketIO, join_room
+
+from src.services.broadcast import GameBroadcaster
+from src.services.message_queue import socketio_queue_options
+
+REDIS_URL = os.environ.get('TEST_REDIS_URL')
+needs_redis = pytest.mark.skipif(not REDIS_URL, reason='TEST_REDIS_URL is not set')
+
+
+def make_worker(queue_url, channel, store_url):
+    app = Flask(f'worker-{uuid.uuid4().hex[:6]}')
+    app.config['BROADCAST_STORE_URL'] = store_url
+    socketio = SocketIO(app, **socketio_queue_options(queue_url, channel=channel))
+
+    @socketio.on('join_game')
+    def join_game(data):
+        join_room(f"game_{data['game_id']}")
+
+    broadcaster = GameBroadcaster(app, socketio)
+    client = socketio.test_client(app)
+    client.emit('join_game', {'game_id': 1})
+    return app, broadcaster, client
+
+
+def received(client, count, timeout=5):
+    """Collect ``count`` game deltas, waiting for queue delivery"""
+    deltas = []
+    deadline = time.monotonic() + timeout
+    while len(deltas) < count and time.monotonic() < deadline:
+        deltas.extend(m['args'][0] for m in client.get_received() if m['name'] == 'game_delta')
+        time.sleep(0.02)
+    return deltas
+
+
+def workers(queue_url, store_url):
+    channel = f'test-{uuid.uuid4().hex}'
+    return make_worker(queue_url, channel, store_url), make_worker(queue_url, channel, store_url)
+
+
+def check_one_sequence(first, second):
+    (app1, broadcaster1, client1), (app2, broadcaster2, client2) = first, second
+    for i in range(4):
+        app, broadcaster = (app1, broadcaster1) if i % 2 == 0 else (app2, broadcaster2)
+        with app.app_context():
+            broadcaster.emit(1, 'player_ready', {'i': i})
+
+    for client in (client1, client2):
+        deltas = received(client, 4)
+        assert [delta['seq'] for delta in deltas] == [1, 2, 3, 4]
+        assert {delta['epoch'] for delta in deltas} == {broadcaster1.epoch}
+
+    assert broadcaster1.epoch == broadcaster2.epoch
+    assert [delta['data']['i'] for delta in broadcaster2.since(1, 1)] == [1, 2, 3]
+    assert broadcaster1.since(1, 4) == []
+
+
+def test_memory_queue_workers_share_one_sequence():
+    store_url = f'memory://{uuid.uuid4().hex}'
+    check_one_sequence(*workers('memory://', store_url))
+
+
+def test_history_trimmed_past_resync_point_asks_for_snapshot():
+    store_url = f'memory://{uuid.uuid4().hex}'
+    (app, broadcaster, _), _ = workers('memory://', store_url)
+    broadcaster.store.history_size = 2
+    with app.app_context():
+        for i in range(4):
+            broadcaster.emit(1, 'player_ready', {'i': i})
+    assert broadcaster.since(1, 1) is None
+    assert [delta['seq'] for delta in broadcaster.since(1, 2)] == [3, 4]
+
+
+def redis_worker(channel):
+    """A Socket.IO server on the Redis queue with one client in game 1's room.
+
+    The Flask-SocketIO test client refuses pub/sub queues, so the client
+    is registered with the manager directly and its packets captured.
+    """
+    server = socketio.Server(client_manager=socketio.RedisManager(REDIS_URL, channel=channel))
+    sent = []
+    server._send_eio_packet = lambda eio_sid, pkt: sent.append(socketio.packet.Packet(encoded_packet=pkt.data).data)
+    server.manager_initialized = True
+    server.manager.initialize()  # starts the queue listener
+    sid = server.manager.connect('eio-client', '/')
+    server.manager.enter_room(sid, '/', 'game_1')
+
+    app = Flask(f'worker-{uuid.uuid4().hex[:6]}')
+    app.config['BROADCAST_STORE_URL'] = REDIS_URL
+    return GameBroadcaster(app, server), sent
+
+
+def redis_workers():
+    channel = f'test-{uuid.uuid4().hex}'
+    first, second = redis_worker(channel), redis_worker(channel)
+    time.sleep(0.5)  # let both listeners subscribe
+    first[0].store.redis.delete(*first[0].store._keys(1))
+    return first, second
+
+
+def delivered(sent, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(sent) < count and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return [data[1] for data in sent if data[0] == 'game_delta']
+
+
+@needs_redis
+def test_redis_queue_delivers_to_both_workers():
+    (broadcaster, sent1), (_, sent2) = redis_workers()
+    broadcaster.socketio.emit('game_delta', {'seq': 1}, room='game_1')
+    assert delivered(sent1, 1) == [{'seq': 1}]
+    assert delivered(sent2, 1) == [{'seq': 1}]
+
+
+@needs_redis
+def test_redis_workers_share_one_sequence():
+    (broadcaster1, sent1), (broadcaster2, sent2) = redis_workers()
+    for i in range(4):
+        (broadcaster1 if i % 2 == 0 else broadcaster2).emit(1, 'player_ready', {'i': i})
+
+    for sent in (sent1, sent2):
+        deltas = delivered(sent, 4)
+        assert [delta['seq'] for delta in deltas] == [1, 2, 3, 4]
+        assert {delta['epoch'] for delta in deltas} == {broadcaster1.epoch}
+
+    assert broadcaster1.epoch == broadcaster2.epoch
+    assert [delta['data']['i'] for delta in broadcaster2.since(1, 1)] == [1, 2, 3]
+    assert broadcaster1.since(1, 4) == []
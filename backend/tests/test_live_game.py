@@ -0,0 +1,138 @@
+"""Write-behind persistence and journal recovery of the live game engine.
+
+Each test uses its own engine with a long flush interval, so queued
+votes stay in memory until a test flushes them, and a journal in
+pytest's tmp_path.
+"""
+import contextlib
+import io
+import random
+import shutil
+
+import pytest
+
+from src.models.user import db
+from src.models.player import Player
+from src.models.script import Script
+from src.models.vote import Vote, Nomination
+from src.services.broadcast import GameBroadcaster
+from src.services.live_game import LiveGameEngine
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    app.config['LIVE_GAME_FLUSH_INTERVAL'] = 3600
+    app.config['LIVE_GAME_JOURNAL'] = str(tmp_path / 'live_games.journal')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def game(app):
+    script = Script.query.filter_by(name='Trouble Brewing').first()
+    user_ids = Simulation(app).bot_users(7)
+    game = GameSimulator(script, user_ids, random.Random(1)).setup(7)
+    game.start_game()
+    game.advance_phase()
+    db.session.commit()
+    return game
+
+
+def vote_rows(game):
+    db.session.expire_all()
+    return [(v.voter_id, v.target_id) for v in Vote.query.filter_by(game_id=game.id).order_by(Vote.id)]
+
+
+def votes_remaining(game):
+    db.session.expire_all()
+    return {p.id: p.votes_remaining for p in Player.query.filter_by(game_id=game.id)}
+
+
+def test_flush_then_crash_replays_unflushed_votes_once(app, game):
+    live = LiveGameEngine(app)
+    first, second, third = (p.id for p in game.players[:3])
+    target = game.players[4].id
+
+    live.cast_vote(game.id, first, target)
+    assert live.flush() == 1
+
+    # Committed, but the process dies before the journal is discarded
+    journal = app.config['LIVE_GAME_JOURNAL']
+    live.cast_vote(game.id, second, target)
+    shutil.copy(journal, journal + '.copy')
+    live.flush()
+    shutil.move(journal + '.copy', journal + '.flushing')
+
+    # Journaled but never flushed
+    live.cast_vote(game.id, third, target)
+    assert vote_rows(game) == [(first, target), (second, target)]
+
+    # A restarted process starts with an empty engine and the journal
+    assert LiveGameEngine(app).recover() == 2
+    assert vote_rows(game) == [(first, target), (second, target), (third, target)]
+    assert votes_remaining(game)[third] == 0
+
+
+def test_second_recover_adds_no_duplicate_votes(app, game):
+    live = LiveGameEngine(app)
+    voters = [p.id for p in game.players[:3]]
+    target = game.players[4].id
+    for voter in voters:
+        live.cast_vote(game.id, voter, target)
+    live.nominate(game.id, voters[0], target)
+
+    journal = app.config['LIVE_GAME_JOURNAL']
+    shutil.copy(journal, journal + '.copy')
+    assert LiveGameEngine(app).recover() == 4
+
+    # Dying again before the journal is removed replays it a second time
+    shutil.move(journal + '.copy', journal)
+    assert LiveGameEngine(app).recover() == 4
+
+    assert vote_rows(game) == [(voter, target) for voter in voters]
+    assert Nomination.query.filter_by(game_id=game.id).count() == 1
+    assert all(votes_remaining(game)[voter] == 0 for voter in voters)
+
+
+def test_release_flushes_before_direct_writes(app, game):
+    live = LiveGameEngine(app)
+    voter, target = game.players[0].id, game.players[4].id
+    live.cast_vote(game.id, voter, target)
+    assert vote_rows(game) == []
+
+    live.release(game.id)
+    assert vote_rows(game) == [(voter, target)]
+    assert live.peek(game.id) is None
+
+    # A direct write, as the host actions do, is seen by the next live copy
+    player = db.session.get(Player, voter)
+    player.votes_remaining = 1
+    db.session.commit()
+
+    assert live.get(game.id).get_player(voter).votes_remaining == 1
+    vote, error = live.cast_vote(game.id, voter, target)
+    assert error is None and vote['voter_id'] == voter
+
+
+def test_votes_are_broadcast_only_once_committed(app, game):
+    live = LiveGameEngine(app)
+    broadcaster = GameBroadcaster(app, None)
+    stored_when_announced = []
+    live.on_flush(lambda batch: stored_when_announced.append(len(vote_rows(game))))
+    live.on_flush(broadcaster.emit_operations)
+
+    voter, target = game.players[0].id, game.players[4].id
+    live.cast_vote(game.id, voter, target)
+    live.nominate(game.id, voter, target)
+    assert broadcaster.current_seq(game.id) == 0
+
+    live.flush()
+    assert stored_when_announced == [1]
+    deltas = broadcaster.since(game.id, 0)
+    assert [delta['type'] for delta in deltas] == ['vote_cast', 'nomination', 'vote_tally']
+    assert deltas[0]['data']['votes_remaining'] == 0
+    assert deltas[2]['data']['threshold'] == 4 and 'counts' not in deltas[2]['data']
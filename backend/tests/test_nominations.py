@@ -0,0 +1,103 @@
+"""One nomination per player per day, and the old current_nominations column."""
+import contextlib
+import io
+import json
+import random
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from src.models.user import db
+from src.models.game import Game
+from src.models.script import Script
+from src.models.vote import Nomination, migrate_legacy_nominations
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+
+@pytest.fixture
+def game():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        script = Script.query.filter_by(name='Trouble Brewing').first()
+        game = GameSimulator(script, Simulation(app).bot_users(7), random.Random(1)).setup(7)
+        game.start_game()
+        game.advance_phase()
+        db.session.commit()
+        yield game
+        db.session.remove()
+
+
+def seats(game):
+    return [p.id for p in game.players]
+
+
+def test_second_nomination_on_the_same_day_is_rejected(game):
+    first, second, third = seats(game)[:3]
+    game.add_nomination(first, second)
+    db.session.commit()
+    assert game.has_nominated_today(first)
+
+    game.add_nomination(first, third)
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+    assert game.get_nominations()[0]['nominee_id'] == second
+
+
+def test_players_nominate_again_the_next_day(game):
+    first, second, third = seats(game)[:3]
+    game.add_nomination(first, second)
+    db.session.commit()
+
+    game.advance_phase()
+    assert game.get_nominations() == []
+    game.advance_phase()
+    assert not game.has_nominated_today(first)
+    game.add_nomination(first, third)
+    db.session.commit()
+
+    assert [n['nominee_id'] for n in game.get_nominations()] == [third]
+    assert Nomination.query.filter_by(game_id=game.id).count() == 2
+
+
+def add_legacy_column(nominations_by_game):
+    db.session.execute(db.text("ALTER TABLE game ADD COLUMN current_nominations TEXT DEFAULT '[]'"))
+    for game_id, nominations in nominations_by_game.items():
+        db.session.execute(db.text("UPDATE game SET current_nominations = :value WHERE id = :id"),
+                           {'value': nominations, 'id': game_id})
+    db.session.commit()
+
+
+def test_current_nominations_become_rows_for_the_current_day(game):
+    first, second, third, fourth = seats(game)[:4]
+    add_legacy_column({game.id: json.dumps([
+        {'nominator_id': first, 'nominee_id': second, 'timestamp': '2025-01-01T12:00:00'},
+        {'nominator_id': third, 'nominee_id': fourth, 'timestamp': '2025-01-01T12:05:00'},
+        # The column never stopped a player nominating twice
+        {'nominator_id': first, 'nominee_id': fourth, 'timestamp': '2025-01-01T12:10:00'},
+    ])})
+
+    assert migrate_legacy_nominations() == 1
+    db.session.expire_all()
+    game = db.session.get(Game, game.id)
+    assert [(n['nominator_id'], n['nominee_id'], n['day_number'], n['timestamp'])
+            for n in game.get_nominations()] == [
+        (first, second, 1, '2025-01-01T12:00:00'),
+        (third, fourth, 1, '2025-01-01T12:05:00'),
+    ]
+    assert game.has_nominated_today(third)
+    assert db.session.execute(db.text("SELECT current_nominations FROM game")).scalar() == '[]'
+    assert migrate_legacy_nominations() == 0
+
+
+def test_unreadable_current_nominations_are_kept(game):
+    add_legacy_column({game.id: '[{"nominator_id": 1'})
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert migrate_legacy_nominations() == 0
+    assert Nomination.query.count() == 0
+    assert db.session.execute(db.text("SELECT current_nominations FROM game")).scalar() == '[{"nominator_id": 1'
+
+
+def test_databases_without_the_column_are_skipped(game):
+    assert migrate_legacy_nominations() == 0
@@ -0,0 +1,94 @@
+"""Moving status effects and used abilities out of the old player JSON columns."""
+import contextlib
+import io
+import json
+import random
+
+import pytest
+
+from src.models.user import db
+from src.models.player import Player, PlayerStatusEffect, PlayerAbilityUse, migrate_legacy_player_json
+from src.models.script import Script
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+EFFECTS = [
+    {'name': 'poisoned', 'duration': 1, 'source': 'Poisoner', 'applied_at': '2025-01-01T01:00:00'},
+    {'name': 'drunk', 'duration': None, 'source': None, 'applied_at': '2025-01-01T01:05:00'},
+]
+ABILITIES = [{'ability': 'slay', 'night': 2, 'timestamp': '2025-01-02T12:00:00'}]
+
+
+@pytest.fixture
+def players():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        script = Script.query.filter_by(name='Trouble Brewing').first()
+        game = GameSimulator(script, Simulation(app).bot_users(5), random.Random(1)).setup(5)
+        # A database from before the side tables still has the JSON columns
+        for column in ('status_effects', 'abilities_used'):
+            db.session.execute(db.text(f"ALTER TABLE player ADD COLUMN {column} TEXT DEFAULT '[]'"))
+        db.session.commit()
+        yield [p.id for p in game.players]
+        db.session.remove()
+
+
+def set_legacy(player_id, status_effects='[]', abilities_used='[]'):
+    db.session.execute(db.text(
+        "UPDATE player SET status_effects = :effects, abilities_used = :abilities WHERE id = :id"
+    ), {'effects': status_effects, 'abilities': abilities_used, 'id': player_id})
+    db.session.commit()
+
+
+def legacy_columns(player_id):
+    return tuple(db.session.execute(db.text(
+        "SELECT status_effects, abilities_used FROM player WHERE id = :id"
+    ), {'id': player_id}).one())
+
+
+def migrated(player_id):
+    db.session.expire_all()
+    player = db.session.get(Player, player_id)
+    return player.get_status_effects(), player.get_abilities_used()
+
+
+def test_json_columns_become_side_table_rows(players):
+    set_legacy(players[0], json.dumps(EFFECTS), json.dumps(ABILITIES))
+    set_legacy(players[1], abilities_used=json.dumps(ABILITIES))
+
+    assert migrate_legacy_player_json() == 2
+    assert migrated(players[0]) == (EFFECTS, ABILITIES)
+    assert migrated(players[1]) == ([], ABILITIES)
+    assert migrated(players[2]) == ([], [])
+    assert legacy_columns(players[0]) == ('[]', '[]')
+
+    game_id = db.session.get(Player, players[0]).game_id
+    assert {e.game_id for e in PlayerStatusEffect.query} == {game_id}
+    assert [p.id for p in Player.with_status_effect(game_id, 'poisoned')] == [players[0]]
+
+
+def test_second_run_adds_nothing(players):
+    set_legacy(players[0], json.dumps(EFFECTS), json.dumps(ABILITIES))
+    migrate_legacy_player_json()
+
+    assert migrate_legacy_player_json() == 0
+    assert PlayerStatusEffect.query.count() == 2
+    assert PlayerAbilityUse.query.count() == 1
+
+
+def test_unreadable_columns_are_kept(players):
+    set_legacy(players[0], '[{"name": "poisoned"', json.dumps(ABILITIES))
+    set_legacy(players[1], json.dumps(EFFECTS[:1]))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert migrate_legacy_player_json() == 1
+    assert migrated(players[0]) == ([], [])
+    assert legacy_columns(players[0]) == ('[{"name": "poisoned"', json.dumps(ABILITIES))
+    assert migrated(players[1])[0] == EFFECTS[:1]
+
+
+def test_databases_without_the_columns_are_skipped():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        assert migrate_legacy_player_json() == 0
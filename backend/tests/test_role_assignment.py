@@ -0,0 +1,128 @@
+"""Seeded role dealing, setup outsider shifts and the built-in strategies."""
+import contextlib
+import io
+import random
+from collections import Counter
+
+import pytest
+
+from src.models.user import db
+from src.models.role import Role
+from src.models.script import Script, PLAYER_COUNT_DISTRIBUTIONS
+from src.services.role_assignment import assign_roles, get_strategy, AvoidRepeatsStrategy, WeightedStrategy
+from src.services.role_catalog import role_catalog
+from src.services.script_index import ScriptRoleIndex
+from src.simulator.runner import create_simulation_app
+
+
+@pytest.fixture
+def roles():
+    """Role ids by character id, with two setup demons from outside Trouble Brewing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        for character_id, name in (('fang_gu', 'Fang Gu'), ('vigormortis', 'Vigormortis')):
+            db.session.add(Role(character_id=character_id, name=name, edition='experimental',
+                                team='demon', ability='', setup=True))
+        db.session.commit()
+        role_catalog.load()
+        yield {role.character_id: role.id for role in Role.query}
+        db.session.remove()
+
+
+def index(roles, **character_ids):
+    """A script index with the Trouble Brewing good roles and the given evil ones"""
+    teams = {}
+    for role in Role.query.filter(Role.edition == 'trouble-brewing'):
+        teams.setdefault(role.team, []).append(role.id)
+    for team, ids in character_ids.items():
+        teams[team] = [roles[character_id] for character_id in ids]
+    return ScriptRoleIndex(0, teams)
+
+
+def teams(assignments):
+    counts = Counter(role_catalog.get(role_id)['team'] for role_id in assignments.values())
+    return {team: counts[team] for team in ('townsfolk', 'outsider', 'minion', 'demon')}
+
+
+def deal(script_index, player_count, seed=1, strategy=None):
+    assignments, error = assign_roles(script_index, PLAYER_COUNT_DISTRIBUTIONS[player_count],
+                                      list(range(100, 100 + player_count)), seed=seed, strategy=strategy)
+    assert error is None, error
+    return assignments
+
+
+@pytest.mark.parametrize('strategy', ['random', 'weighted', 'avoid_repeats'])
+def test_same_seed_deals_the_same_roles(roles, strategy):
+    script_index = Script.query.filter_by(name='Trouble Brewing').first().role_index()
+    first = deal(script_index, 10, seed=42, strategy=get_strategy(strategy))
+    assert deal(script_index, 10, seed=42, strategy=get_strategy(strategy)) == first
+    assert any(deal(script_index, 10, seed=seed, strategy=get_strategy(strategy)) != first for seed in range(5))
+
+
+@pytest.mark.parametrize('minion, demon, outsiders, townsfolk', [
+    ('baron', 'imp', 3, 3),
+    ('poisoner', 'fang_gu', 2, 4),
+    ('poisoner', 'vigormortis', 0, 6),
+])
+def test_setup_roles_shift_outsiders_for_townsfolk(roles, minion, demon, outsiders, townsfolk):
+    # Eight players normally have five townsfolk and one outsider
+    script_index = index(roles, minion=[minion], demon=[demon])
+    for seed in range(5):
+        assert teams(deal(script_index, 8, seed=seed)) == {
+            'townsfolk': townsfolk, 'outsider': outsiders, 'minion': 1, 'demon': 1
+        }
+
+
+def test_outsiders_never_go_below_zero(roles):
+    script_index = index(roles, minion=['poisoner'], demon=['vigormortis'])
+    assert teams(deal(script_index, 7))['townsfolk'] == 5
+
+
+def test_setup_role_is_skipped_when_the_script_cannot_fit_its_shift(roles):
+    # A Baron would need three outsiders and the script only has two
+    script_index = index(roles, outsider=['drunk', 'saint'], minion=['baron', 'poisoner'], demon=['imp'])
+    for seed in range(5):
+        assignments = deal(script_index, 8, seed=seed)
+        assert roles['baron'] not in assignments.values()
+        assert teams(assignments)['outsider'] == 1
+
+
+def test_avoid_repeats_swaps_a_repeated_role_away(roles):
+    seats = [10, 11, 12]
+    dealt = get_strategy('random').seat([1, 2, 3], seats, random.Random(7))
+    repeat_seat = seats[0]
+    strategy = AvoidRepeatsStrategy(recent_roles={repeat_seat: {dealt[repeat_seat]}})
+
+    assignments = strategy.seat([1, 2, 3], seats, random.Random(7))
+    assert assignments[repeat_seat] != dealt[repeat_seat]
+    assert sorted(assignments.values()) == [1, 2, 3]
+
+
+def test_avoid_repeats_finds_a_fresh_role_for_everyone(roles):
+    seats = [10, 11, 12]
+    # Only one deal works, and reaching it from most shuffles takes more than one swap
+    recent = {10: {1, 2}, 11: {2, 3}, 12: {1, 3}}
+    for seed in range(20):
+        assignments = AvoidRepeatsStrategy(recent_roles=recent).seat([1, 2, 3], seats, random.Random(seed))
+        assert assignments == {10: 3, 11: 1, 12: 2}
+
+
+def test_avoid_repeats_still_deals_every_role_when_a_repeat_is_unavoidable(roles):
+    seats = [10, 11, 12]
+    recent = {10: {1, 2, 3}, 11: {1}}
+    assignments = AvoidRepeatsStrategy(recent_roles=recent).seat([1, 2, 3], seats, random.Random(3))
+    assert sorted(assignments.values()) == [1, 2, 3]
+    assert assignments[11] != 1
+
+
+def test_weights_from_settings_json_are_converted_and_bad_entries_ignored():
+    weights = {'3': '2', '4': 0.5, '5': 'heavy', 'baron': 3, '6': None, '7': [1]}
+    assert WeightedStrategy.parse_weights(weights) == {3: 2.0, 4: 0.5}
+    assert WeightedStrategy.parse_weights(['3', '2']) == {}
+
+
+def test_string_weights_still_favour_the_heavier_role():
+    strategy = WeightedStrategy({'1': '1000', '2': 'x'})
+    picks = Counter(strategy.choose([1, 2, 3], 1, random.Random(seed))[0] for seed in range(50))
+    assert picks[1] > 45
@@ -0,0 +1,110 @@
+"""The seating ring against the sort-and-search neighbour lookup it replaced."""
+import contextlib
+import io
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from src.models.user import db
+from src.models.script import Script
+from src.models.seating import SeatingRing
+from src.simulator.runner import GameSimulator, Simulation, create_simulation_app
+
+
+def old_neighbors(players, player_id):
+    """Player.get_neighbors before the ring"""
+    all_players = sorted(players, key=lambda p: p.position)
+    if len(all_players) <= 1:
+        return None, None
+    i = next(i for i, p in enumerate(all_players) if p.id == player_id)
+    return all_players[(i - 1) % len(all_players)], all_players[(i + 1) % len(all_players)]
+
+
+def old_alive_neighbors(players, player_id):
+    """Player.get_alive_neighbors before the ring"""
+    alive = sorted([p for p in players if p.is_alive], key=lambda p: p.position)
+    i = next((i for i, p in enumerate(alive) if p.id == player_id), None)
+    if i is None:
+        return None, None
+    return alive[(i - 1) % len(alive)], alive[(i + 1) % len(alive)]
+
+
+def assert_matches_old_lookup(ring, players):
+    assert ring.alive_count == sum(1 for p in players if p.is_alive)
+    for player in players:
+        assert ring.neighbors(player.id) == old_neighbors(players, player.id)
+        assert ring.alive_neighbors(player.id) == old_alive_neighbors(players, player.id)
+
+
+def seats(count, rng):
+    # Positions with gaps and out of order, as after players leave
+    positions = sorted(rng.sample(range(count * 2), count))
+    players = [SimpleNamespace(id=100 + i, position=position, is_alive=rng.random() < 0.7)
+               for i, position in enumerate(positions)]
+    rng.shuffle(players)
+    return players
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_set_alive_relinks_like_the_old_lookup(seed):
+    rng = random.Random(seed)
+    players = seats(rng.randint(1, 15), rng)
+    ring = SeatingRing(players)
+    assert_matches_old_lookup(ring, players)
+
+    for _ in range(60):
+        player = rng.choice(players)
+        player.is_alive = rng.random() < 0.5
+        ring.set_alive(player.id, player.is_alive)
+        assert_matches_old_lookup(ring, players)
+
+
+def test_last_living_seat_is_its_own_neighbour_and_everyone_can_return():
+    players = [SimpleNamespace(id=i, position=i, is_alive=True) for i in range(4)]
+    ring = SeatingRing(players)
+    for player in players[1:]:
+        player.is_alive = False
+        ring.set_alive(player.id, False)
+    assert ring.alive_neighbors(0) == (players[0], players[0])
+
+    players[0].is_alive = False
+    ring.set_alive(0, False)
+    assert ring.alive_count == 0
+
+    for player in reversed(players):
+        player.is_alive = True
+        ring.set_alive(player.id, True)
+        assert_matches_old_lookup(ring, players)
+
+
+def test_setting_the_same_state_twice_changes_nothing():
+    players = [SimpleNamespace(id=i, position=i, is_alive=True) for i in range(5)]
+    ring = SeatingRing(players)
+    players[2].is_alive = False
+    ring.set_alive(2, False)
+    ring.set_alive(2, False)
+    ring.set_alive(99, False)  # Not seated
+    assert_matches_old_lookup(ring, players)
+
+
+def test_killing_players_relinks_the_games_ring():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        script = Script.query.filter_by(name='Trouble Brewing').first()
+        game = GameSimulator(script, Simulation(app).bot_users(9), random.Random(1)).setup(9)
+        ring = game.seating
+        rng = random.Random(2)
+
+        for player in rng.sample(game.players, 5):
+            player.kill('execution')
+            assert game.seating is ring
+            assert_matches_old_lookup(ring, game.players)
+            assert player.get_alive_neighbors() == {'left': None, 'right': None}
+
+        player.resurrect()
+        assert_matches_old_lookup(game.seating, game.players)
+        left, right = old_alive_neighbors(game.players, player.id)
+        assert player.get_alive_neighbors() == {'left': left, 'right': right}
+        db.session.remove()
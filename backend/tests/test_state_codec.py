@@ -0,0 +1,56 @@
+"""Saved state blobs keep the roles they were written with."""
+import contextlib
+import io
+import json
+import zlib
+
+from src.models.user import db
+from src.models.role import Role
+from src.models.script import ScriptRole
+from src.models.state_codec import HEADER_LENGTH, MAGIC, decode_blob, encode_blob, read_header
+from src.services.role_catalog import role_catalog
+from src.simulator.runner import create_simulation_app
+
+IMP = {'id': 7, 'character_id': 'imp', 'name': 'Imp', 'team': 'demon', 'ability': 'Each night*, choose a player: they die.'}
+
+
+def body(blob):
+    start = len(MAGIC) + HEADER_LENGTH.size
+    (length,) = HEADER_LENGTH.unpack_from(blob, len(MAGIC))
+    return json.loads(zlib.decompress(blob[start + length:]))
+
+
+def test_roles_are_stored_once_and_decoded_without_the_catalog():
+    state = {'players': [{'id': 1, 'role': dict(IMP)}, {'id': 2, 'role': dict(IMP)}]}
+    blob = encode_blob(state, header={'player_count': 2})
+
+    assert list(body(blob)['roles']) == ['7']
+    assert body(blob)['data']['players'][0]['role'] == {'$role': 7}
+    assert read_header(blob) == {'player_count': 2}
+    # No app context: a catalog lookup would fail, so the stored copy was used
+    assert decode_blob(blob) == state
+
+
+def test_editing_a_role_does_not_rewrite_old_saves():
+    with contextlib.redirect_stdout(io.StringIO()):
+        app = create_simulation_app('sqlite://')
+    with app.app_context():
+        role = Role.query.filter_by(character_id='imp').first()
+        saved = role.to_dict()
+        blob = encode_blob({'players': [{'id': 1, 'role': saved}]})
+
+        role.name = 'Renamed'
+        db.session.commit()
+        assert role_catalog.get(role.id)['name'] == 'Renamed'
+        assert decode_blob(blob)['players'][0]['role'] == saved
+
+        ScriptRole.query.filter_by(role_id=role.id).delete()
+        db.session.delete(role)
+        db.session.commit()
+        assert decode_blob(blob)['players'][0]['role'] == saved
+        db.session.remove()
+
+
+def test_unreadable_blob_decodes_to_empty():
+    assert decode_blob(b'not a blob') == {}
+    assert decode_blob(MAGIC + HEADER_LENGTH.pack(2) + b'{}' + b'garbage') == {}
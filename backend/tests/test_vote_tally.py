@@ -0,0 +1,68 @@
+"""Leader, tie and threshold tracking in the running vote tally."""
+from src.services.vote_tally import VoteTally
+
+
+def tally(*targets):
+    tally = VoteTally(day_number=1)
+    for target in targets:
+        tally.add(target)
+    return tally
+
+
+def test_leader_changes_when_overtaken():
+    votes = tally(3, 3, 5)
+    assert (votes.leader_id, votes.leader_votes, votes.tied) == (3, 2, False)
+
+    votes.add(5)
+    assert (votes.leader_id, votes.leader_votes, votes.tied) == (3, 2, True)
+
+    votes.add(5)
+    assert (votes.leader_id, votes.leader_votes, votes.tied) == (5, 3, False)
+
+
+def test_tie_is_broken_by_the_next_vote_for_either_nominee():
+    votes = tally(3, 5)
+    assert votes.tied
+    votes.add(3)
+    assert not votes.tied and votes.leader_id == 3
+
+
+def test_tie_below_the_lead_does_not_count():
+    votes = tally(3, 3, 3, 5, 7, 7)
+    assert not votes.tied
+    assert votes.on_the_block(alive_count=5) == 3
+
+
+def test_abstentions_are_ignored():
+    votes = tally(None, 3, None)
+    assert votes.total_votes == 1
+    assert votes.counts == {3: 1}
+
+
+def test_threshold_is_half_the_living_rounded_up():
+    assert [VoteTally.threshold_for(alive) for alive in (5, 6, 7, 8)] == [3, 3, 4, 4]
+
+
+def test_on_the_block_needs_the_threshold_and_no_tie():
+    votes = tally(3, 3, 3)
+    assert votes.on_the_block(alive_count=7) is None
+    assert votes.on_the_block(alive_count=6) == 3
+
+    votes.add(5, 3)
+    assert votes.on_the_block(alive_count=6) is None
+
+
+def test_deaths_lower_the_threshold_without_new_votes():
+    votes = tally(3, 3)
+    assert votes.on_the_block(alive_count=5) is None
+    assert votes.on_the_block(alive_count=4) == 3
+
+
+def test_to_dict_hides_counts_unless_asked():
+    votes = tally(5, 3, 3)
+    assert votes.to_dict(4, include_counts=False) == {
+        'day_number': 1, 'alive_count': 4, 'threshold': 2, 'on_the_block': 3
+    }
+    data = votes.to_dict(4)
+    assert data['total_votes'] == 3
+    assert data['counts'] == [{'nominee_id': 3, 'votes': 2}, {'nominee_id': 5, 'votes': 1}]
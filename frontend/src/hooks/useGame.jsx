@@ -252,17 +252,30 @@ export function GameProvider({ children }) {
 
   const getGameHistory = async (gameId) => {
     try {
-      const response = await fetch(`${API_BASE}/games/${gameId}/history`, {
-        credentials: 'include'
-      })
+      // The log is paged by id; follow the cursor to get every entry
+      const history = []
+      let after = null
+      while (true) {
+        const query = after ? `?limit=1000&after=${after}` : '?limit=1000'
+        const response = await fetch(`${API_BASE}/games/${gameId}/history${query}`, {
+          credentials: 'include'
+        })
 
-      const data = await response.json()
+        const data = await response.json()
 
-      if (response.ok) {
-        return { success: true, history: data.history }
-      } else {
-        return { success: false, error: data.error }
+        if (!response.ok) {
+          return { success: false, error: data.error }
+        }
+        history.push(...data.history)
+        if (!data.has_more) {
+          break
+        }
+        after = data.next_cursor
       }
+
+      // Votes are logged when they are flushed, so ids can run ahead of timestamps
+      history.sort((a, b) => (a.timestamp || '').localeCompare(b.timestamp || '') || a.id - b.id)
+      return { success: true, history }
     } catch (error) {
       console.error('Failed to get game history:', error)
       return { success: false, error: 'Network error occurred' }
@@ -76,18 +76,27 @@ export function useGameState() {
     setError('')
     
     try {
-      const response = await fetch(`${API_BASE}/games/${gameId}/states`, {
-        method: 'GET',
-        credentials: 'include'
-      })
-
-      const data = await response.json()
+      // The list is paged newest first; follow the cursor to get every save
+      const states = []
+      let before = null
+      while (true) {
+        const query = before ? `?limit=200&before=${before}` : '?limit=200'
+        const response = await fetch(`${API_BASE}/games/${gameId}/states${query}`, {
+          method: 'GET',
+          credentials: 'include'
+        })
 
-      if (data.success) {
-        return { success: true, states: data.states }
-      } else {
-        setError(data.error || 'Failed to get game states')
-        return { success: false, error: data.error }
+        const data = await response.json()
+
+        if (!data.success) {
+          setError(data.error || 'Failed to get game states')
+          return { success: false, error: data.error }
+        }
+        states.push(...data.states)
+        if (!data.has_more) {
+          return { success: true, states }
+        }
+        before = data.next_cursor
       }
     } catch (error) {
       const errorMsg = 'Network error while getting game states'
@@ -240,12 +249,13 @@ export function useGameState() {
     }
   }
 
-  const getUserGameHistory = async (userId) => {
+  const getUserGameHistory = async (userId, before = null) => {
     setLoading(true)
     setError('')
     
     try {
-      const response = await fetch(`${API_BASE}/users/${userId}/game-history`, {
+      const query = before ? `?before=${before}` : ''
+      const response = await fetch(`${API_BASE}/users/${userId}/game-history${query}`, {
         method: 'GET',
         credentials: 'include'
       })
@@ -253,7 +263,13 @@ export function useGameState() {
       const data = await response.json()
 
       if (data.success) {
-        return { success: true, histories: data.histories }
+        return {
+          success: true,
+          histories: data.histories,
+          games: data.games,
+          nextCursor: data.next_cursor,
+          hasMore: data.has_more
+        }
       } else {
         setError(data.error || 'Failed to get user game history')
         return { success: false, error: data.error }